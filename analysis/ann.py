@@ -0,0 +1,281 @@
+# analysis/ann.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from analysis.corpus import iter_db_docs
+from analysis.embeddings import EmbeddingStore, embed, store_dir
+
+NPROBE = int(os.getenv("ANN_NPROBE", "8"))   # listas visitadas por consulta
+BRUTE_FORCE_MAX = 5000                       # por debajo, una sola lista (busqueda exacta)
+TRAIN_SAMPLE = 50_000                        # vectores usados para entrenar los centroides
+KMEANS_ITERS = 12
+RETRAIN_FACTOR = 4                           # reentrena si el indice crece x4 desde el entrenamiento
+
+
+class Hit(NamedTuple):
+    key: str      # clave del EmbeddingStore (DOI o id:<n>)
+    score: float  # coseno
+
+
+def _nlist_for(n: int) -> int:
+    return 1 if n <= BRUTE_FORCE_MAX else int(min(np.sqrt(n), 4096))
+
+
+def _kmeans(X: np.ndarray, k: int, iters: int = KMEANS_ITERS, seed: int = 0) -> np.ndarray:
+    """k-means esferico (vectores normalizados, asignacion por producto punto)."""
+    rng = np.random.default_rng(seed)
+    C = X[rng.choice(len(X), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(X, C)
+        sums = np.zeros_like(C)
+        np.add.at(sums, assign, X)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        sums[empty] = X[rng.choice(len(X), size=int(empty.sum()))]  # re-siembra listas vacias
+        C = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return C.astype(np.float32)
+
+
+def _nearest(X: np.ndarray, C: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    out = np.empty(len(X), dtype=np.int32)
+    for s in range(0, len(X), chunk):
+        out[s:s + chunk] = np.argmax(np.asarray(X[s:s + chunk]) @ C.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """Indice IVF (listas invertidas) sobre los vectores del EmbeddingStore.
+
+    Los vectores no se copian: cada lista guarda filas del memmap del almacen y la
+    busqueda puntua solo las filas de las `nprobe` listas con centroide mas cercano.
+    En disco (data/embeddings/<modelo>/ivf/): centroids.npy, assign.npy (lista de cada
+    fila, -1 = sin indexar) y meta.json. add() asigna filas nuevas sin reentrenar.
+
+    Los escritores (build, add, index_new_papers) se serializan con _update_lock y hacen
+    el trabajo pesado fuera de _lock; search solo espera el intercambio final de listas,
+    claves y meta (_swap).
+    """
+
+    def __init__(self, store: Optional[EmbeddingStore] = None):
+        self.store = store or EmbeddingStore()
+        self.dir = self.store.dir / "ivf"
+        self.centroids: Optional[np.ndarray] = None
+        self.assign = np.empty(0, dtype=np.int32)
+        self.meta: Dict[str, object] = {}
+        self._lists: List[np.ndarray] = []
+        self._keys: List[str] = []
+        self._mtime = 0.0
+        self._lock = threading.RLock()         # lectores vs. intercambio de estado
+        self._update_lock = threading.RLock()  # un escritor a la vez
+
+    # --------- persistencia ----------
+    def exists(self) -> bool:
+        return (self.dir / "meta.json").exists()
+
+    def load(self, store: Optional[EmbeddingStore] = None) -> "IVFIndex":
+        with self._update_lock:
+            meta = json.loads((self.dir / "meta.json").read_text())
+            centroids = np.load(self.dir / "centroids.npy")
+            assign = np.load(self.dir / "assign.npy")
+            self._mtime = (self.dir / "meta.json").stat().st_mtime
+            self._swap(centroids, assign, meta, keys=[], store=store)
+        return self
+
+    def reload_if_changed(self) -> None:
+        """Recarga si otro proceso (p.ej. el ETL) actualizo el indice en disco."""
+        p = self.dir / "meta.json"
+        if not (p.exists() and p.stat().st_mtime != self._mtime):
+            return
+        if not self._update_lock.acquire(blocking=False):
+            return  # hay una actualizacion en curso en este proceso: se recarga en otra consulta
+        try:
+            self.load(EmbeddingStore(self.store.dir.parent, self.store.model))
+        finally:
+            self._update_lock.release()
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for name, arr in (("centroids", self.centroids), ("assign", self.assign)):
+            tmp = self.dir / f"{name}.tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, self.dir / f"{name}.npy")
+        self.meta.update(nlist=int(len(self.centroids)), indexed=int((self.assign >= 0).sum()),
+                         dim=self.store.dim, updated=time.time())
+        tmp = self.dir / "meta.tmp"
+        tmp.write_text(json.dumps(self.meta))
+        os.replace(tmp, self.dir / "meta.json")  # meta al final: marca el indice como completo
+        self._mtime = (self.dir / "meta.json").stat().st_mtime
+
+    def _swap(self, centroids: np.ndarray, assign: np.ndarray, meta: Dict[str, object],
+              keys: Optional[List[str]] = None, store: Optional[EmbeddingStore] = None) -> None:
+        # listas y claves se calculan sin candado; _lock solo cubre el intercambio
+        store = store or self.store
+        order = np.argsort(assign, kind="stable")
+        valid = order[assign[order] >= 0]
+        bounds = np.searchsorted(assign[valid], np.arange(len(centroids) + 1))
+        lists = [valid[bounds[i]:bounds[i + 1]] for i in range(len(centroids))]
+        keys = self._keys if keys is None else keys
+        if len(keys) < store.rows:  # las filas solo se anexan: basta leer las nuevas
+            keys = keys + store.keys(start=len(keys))
+        with self._lock:
+            self.store, self.centroids, self.assign, self.meta = store, centroids, assign, meta
+            self._lists, self._keys = lists, keys
+
+    # --------- construccion / inserciones ----------
+    def build(self, nlist: Optional[int] = None) -> "IVFIndex":
+        with self._update_lock:
+            M = self.store.matrix()
+            n = len(M)
+            if not n:
+                raise ValueError("El almacen de embeddings esta vacio (python analysis/embeddings.py)")
+            nlist = min(nlist or _nlist_for(n), n)
+            if nlist == 1:
+                centroids = np.zeros((1, M.shape[1]), dtype=np.float32)
+                assign = np.zeros(n, dtype=np.int32)
+            else:
+                sample = np.sort(np.random.default_rng(0).choice(n, size=min(n, TRAIN_SAMPLE), replace=False))
+                centroids = _kmeans(np.asarray(M[sample]), nlist)
+                assign = _nearest(M, centroids)
+            meta = {"trained_rows": n, "max_paper_id": self.meta.get("max_paper_id", 0)}
+            self._swap(centroids, assign, meta, keys=[])
+            self.save()
+        return self
+
+    def add(self, rows: Sequence[int]) -> int:
+        """Asigna (o reasigna) filas del almacen a su lista mas cercana y persiste."""
+        with self._update_lock:
+            rows = np.asarray(rows, dtype=np.int64)
+            rows = rows[rows >= 0]
+            if not len(rows):
+                return 0
+            n = self.store.rows
+            # copia: las consultas en curso siguen con el estado anterior hasta _swap
+            assign = np.concatenate([self.assign, np.full(max(0, n - len(self.assign)), -1, np.int32)])
+            trained = int(self.meta.get("trained_rows", 0))
+            if len(self.centroids) == 1:
+                regrow = n > BRUTE_FORCE_MAX
+            else:
+                regrow = n > RETRAIN_FACTOR * trained
+            if regrow:
+                self.build()  # el corpus crecio mucho: nuevos centroides
+                return len(rows)
+            M = self.store.matrix()
+            assign[rows] = _nearest(M[rows], self.centroids) if len(self.centroids) > 1 else 0
+            self._swap(self.centroids, assign, self.meta)
+            self.save()
+            return len(rows)
+
+    # --------- consulta ----------
+    def search(self, q: np.ndarray, k: int = 10, nprobe: int = NPROBE,
+               exclude: Optional[str] = None) -> List[Hit]:
+        with self._lock:
+            if self.centroids is None:
+                return []
+            q = np.asarray(q, dtype=np.float32).ravel()
+            q = q / max(float(np.linalg.norm(q)), 1e-12)
+            probe = np.argsort(-(self.centroids @ q))[:max(1, nprobe)]
+            cand = np.concatenate([self._lists[i] for i in probe]) if len(probe) else np.empty(0, np.int64)
+            if not len(cand):
+                return []
+            cand.sort()  # lectura del memmap en orden de fila
+            scores = np.asarray(self.store.matrix()[cand]) @ q
+            kk = min(len(cand), k + 1)
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            hits = [Hit(self._keys[cand[i]], float(scores[i])) for i in top]
+            return [h for h in hits if h.key != exclude][:k]
+
+    def similar(self, key: str, k: int = 10, nprobe: int = NPROBE) -> List[Hit]:
+        v = self.store.vector(key)
+        return [] if v is None else self.search(v, k, nprobe, exclude=key)
+
+    def search_text(self, text: str, k: int = 10, nprobe: int = NPROBE) -> List[Hit]:
+        return self.search(embed([text], self.store.model)[0], k, nprobe)
+
+
+_index: Optional[IVFIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[IVFIndex]:
+    """Indice compartido del proceso (None si aun no se ha construido)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            if not (store_dir() / "ivf" / "meta.json").exists():
+                return None
+            _index = IVFIndex().load()
+        else:
+            _index.reload_if_changed()
+        return _index
+
+
+def index_new_papers(engine, index: Optional[IVFIndex] = None) -> int:
+    """Embebe e indexa los papers con id mayor al ultimo indexado (lo llama run_etl).
+
+    La marca max_paper_id es segura porque los merges se confirman en orden de id
+    (etl.run_csv_ingest.PAPER_MERGE_LOCK). El embebido no toma el candado de lectura:
+    search/similar siguen respondiendo con el indice anterior mientras tanto.
+    """
+    idx = index or get_index()
+    if idx is None:
+        return 0  # sin indice construido no hay nada que mantener
+    with idx._update_lock:
+        last = int(idx.meta.get("max_paper_id", 0))
+        ids, docs = [], []
+        for pid, d in iter_db_docs(engine, after_id=last, only_with_text=False):
+            ids.append(pid); docs.append(d)
+        if not docs:
+            return 0
+        idx.store.update(docs)
+        idx.meta["max_paper_id"] = max(ids)
+        return idx.add(idx.store.rows_of([d.key for d in docs]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Indice ANN (IVF) sobre los embeddings de paper")
+    ap.add_argument("--build", action="store_true", help="Embebe lo pendiente y (re)entrena el indice")
+    ap.add_argument("--nlist", type=int, default=None)
+    ap.add_argument("--query", default=None, help="Texto a buscar")
+    ap.add_argument("-k", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.build:
+        from etl.db import get_engine
+        eng = get_engine()
+        idx = IVFIndex()
+        docs = list(iter_db_docs(eng, only_with_text=False))
+        stats = idx.store.update(d for _, d in docs)
+        idx.meta["max_paper_id"] = max((pid for pid, _ in docs), default=0)
+        t0 = time.perf_counter()
+        idx.build(args.nlist)
+        print(f"[OK] embeddings {stats}; indice con {len(idx.centroids)} listas en {time.perf_counter() - t0:.1f}s")
+    if args.query:
+        idx = get_index()
+        if idx is None:
+            print("[ERROR] No hay indice: ejecuta con --build")
+            return 1
+        t0 = time.perf_counter()
+        hits = idx.search_text(args.query, args.k)
+        print(f"[OK] {len(hits)} resultados en {(time.perf_counter() - t0) * 1000:.1f} ms")
+        for h in hits:
+            print(f"  {h.score:.4f}  {h.key}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
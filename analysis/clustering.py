@@ -0,0 +1,276 @@
+# analysis/clustering.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.cluster.hierarchy import dendrogram, fcluster, linkage
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from analysis.corpus import CACHE_DIR, Doc
+from analysis.similarity import load_docs
+from etl.fuzzy_dedupe import clean_title
+
+CLUSTER_CACHE = CACHE_DIR / "clustering"
+METHODS = ("single", "complete", "average", "weighted")   # validas con distancia coseno
+REPRESENTATIONS = ("tfidf", "embedding")
+# scipy.linkage copia la matriz condensada a float64 y valida isfinite: ~9 bytes de RAM
+# por par de documentos, ademas de los 4 del memmap float32 (cache de paginas)
+LINKAGE_BYTES_PER_PAIR = 9
+CLUSTER_MEM_MB = float(os.getenv("CLUSTER_MEM_MB", "1024"))  # presupuesto para el linkage
+
+
+def max_direct_for(mem_mb: float) -> int:
+    """Mayor n cuyo linkage cabe en mem_mb (n*(n-1)/2 pares a LINKAGE_BYTES_PER_PAIR)."""
+    return int((2 * mem_mb * 2**20 / LINKAGE_BYTES_PER_PAIR) ** 0.5)
+
+
+# por encima: muestra + asignacion; CLUSTER_MAX_DIRECT es un tope fijo opcional
+MAX_DIRECT = min(int(os.getenv("CLUSTER_MAX_DIRECT", "20000")), max_direct_for(CLUSTER_MEM_MB))
+PARALLEL_MIN_DOCS = 3000
+ASSIGN_CHUNK = 20000
+
+
+def condensed_size(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def _row_offset(i: int, n: int) -> int:
+    # posicion de (i, i+1) en la matriz condensada (mismo orden que scipy.spatial.distance.pdist)
+    return i * n - i * (i + 1) // 2
+
+
+# --------- representacion ----------
+def vectors(docs: Sequence[Doc], representation: str = "tfidf"):
+    """Filas de norma 1: distancia coseno = 1 - X @ X.T."""
+    if representation == "tfidf":
+        vec = TfidfVectorizer(preprocessor=clean_title, stop_words="english", sublinear_tf=True,
+                              min_df=2 if len(docs) > 50 else 1, dtype=np.float32)
+        return vec.fit_transform([f"{d.title} {d.text}" for d in docs]).tocsr()
+    if representation == "embedding":
+        from analysis.embeddings import EmbeddingStore
+        return EmbeddingStore().vectors_for(docs)
+    raise ValueError(f"Representacion invalida: {representation}")
+
+
+# --------- matriz condensada float32 por bloques ----------
+_X = None
+_OUT: Optional[np.memmap] = None
+
+
+def _init_worker(X, path: str, n: int) -> None:
+    global _X, _OUT
+    _X = X
+    _OUT = np.memmap(path, dtype=np.float32, mode="r+", shape=(condensed_size(n),))
+
+
+def _fill_rows(start: int, stop: int) -> None:
+    X, out = _X, _OUT
+    n = X.shape[0]
+    S = X[start:stop] @ X[start:].T
+    S = S.toarray() if sparse.issparse(S) else np.asarray(S)
+    for r, i in enumerate(range(start, stop)):
+        d = 1.0 - S[r, i - start + 1:]
+        np.clip(d, 0.0, 2.0, out=d)
+        off = _row_offset(i, n)
+        out[off:off + n - i - 1] = d
+    out.flush()
+
+
+def _balanced_blocks(n: int, parts: int) -> List[Tuple[int, int]]:
+    """Bloques de filas con una cantidad parecida de celdas (las primeras filas son mas largas)."""
+    work = np.cumsum(np.arange(n - 1, -1, -1, dtype=np.int64))
+    cuts = np.searchsorted(work, np.linspace(0, work[-1], parts + 1)[1:-1])
+    bounds = [0, *sorted(set(int(c) + 1 for c in cuts)), n]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def condensed_distances(X, workers: Optional[int] = None, path: Optional[str | Path] = None,
+                        max_block_cells: int = 20_000_000) -> np.memmap:
+    """Distancias coseno en formato condensado (float32, memmap en disco).
+
+    Las filas se reparten en bloques entre procesos; cada uno escribe su tramo del
+    archivo directamente, sin pasar la matriz por el proceso principal. Sin `path`
+    se usa un temporal, que se borra si el calculo falla (si no, lo borra quien llama).
+    """
+    n = X.shape[0]
+    own = path is None
+    if own:
+        CLUSTER_CACHE.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="dist_", suffix=".f32", dir=CLUSTER_CACHE)
+        os.close(fd)
+    try:
+        out = np.memmap(path, dtype=np.float32, mode="w+", shape=(max(condensed_size(n), 1),))
+        del out
+        procs = workers or os.cpu_count() or 1
+        parts = max(4 * procs, -(-condensed_size(n) // max_block_cells), 1)
+        blocks = _balanced_blocks(n, parts)
+        if n < PARALLEL_MIN_DOCS or procs == 1:
+            _init_worker(X, str(path), n)
+            for b in blocks:
+                _fill_rows(*b)
+        else:
+            with ProcessPoolExecutor(max_workers=procs, initializer=_init_worker,
+                                     initargs=(X, str(path), n)) as pool:
+                for f in [pool.submit(_fill_rows, *b) for b in blocks]:
+                    f.result()
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(condensed_size(n),))
+    except BaseException:
+        if own:
+            Path(path).unlink(missing_ok=True)
+        raise
+
+
+# --------- clustering ----------
+def _cache_key(docs: Sequence[Doc], method: str, representation: str, sample: Optional[int]) -> str:
+    # contenido ademas de la clave: un resumen corregido (o un modelo de embeddings
+    # distinto) cambia los vectores aunque los papers sean los mismos
+    h = hashlib.sha1()
+    for d in docs:
+        for part in (d.key, d.title, d.text):
+            h.update(part.encode("utf-8")); h.update(b"\0")
+    if representation == "embedding":
+        from analysis.embeddings import model_name
+        h.update(model_name().encode("utf-8"))
+    h.update(f"{method}|{representation}|{sample}".encode())
+    return h.hexdigest()[:16]
+
+
+def _assign(X, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(X.shape[0], dtype=np.int32)
+    for s in range(0, X.shape[0], ASSIGN_CHUNK):
+        S = X[s:s + ASSIGN_CHUNK] @ centroids.T
+        out[s:s + ASSIGN_CHUNK] = np.asarray(S).argmax(axis=1)
+    return out
+
+
+def cluster(docs: Sequence[Doc], method: str = "average", representation: str = "tfidf",
+            n_clusters: Optional[int] = None, sample: Optional[int] = None,
+            workers: Optional[int] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """Clustering jerarquico aglomerativo (distancia coseno) de los documentos.
+
+    Con mas de MAX_DIRECT documentos (o sample=m) se agrupa una muestra de m
+    documentos y el resto se asigna al centroide mas cercano de los n_clusters
+    grupos. El linkage se guarda en data/cache/clustering/ por contenido del corpus y parametros
+    (use_cache=False ni lo lee ni lo escribe).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Metodo invalido: {method} (usa {', '.join(METHODS)})")
+    n = len(docs)
+    if n < 2:
+        raise ValueError("Se necesitan al menos 2 documentos")
+    if sample is None and n > MAX_DIRECT:
+        sample = MAX_DIRECT
+    if sample is not None and sample >= n:
+        sample = None
+    keys = [d.key for d in docs]
+
+    if sample is not None:
+        rng = np.random.default_rng(0)
+        idx = np.sort(rng.choice(n, size=sample, replace=False))
+    else:
+        idx = np.arange(n)
+
+    cache_path = CLUSTER_CACHE / f"{_cache_key(docs, method, representation, sample)}.npz"
+    X = None
+    t0 = time.perf_counter()
+    if use_cache and cache_path.exists():
+        Z = np.load(cache_path)["Z"]
+        cached = True
+    else:
+        X = vectors(docs, representation)
+        CLUSTER_CACHE.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix="dist_", suffix=".f32", dir=CLUSTER_CACHE)
+        os.close(fd)
+        dist = None
+        try:
+            dist = condensed_distances(X[idx], workers, path=tmp)
+            Z = linkage(dist, method=method)  # copia float64: ver LINKAGE_BYTES_PER_PAIR
+        finally:
+            dist = None  # suelta el memmap antes de borrar el archivo
+            os.unlink(tmp)
+        if use_cache:
+            np.savez_compressed(cache_path, Z=Z, sample=idx)
+        cached = False
+
+    result: Dict[str, Any] = {
+        "method": method, "representation": representation, "n_docs": n,
+        "n_clustered": len(idx), "sampled": sample is not None, "cached": cached,
+        "keys": keys, "sample_idx": idx, "linkage": Z,
+        "seconds": round(time.perf_counter() - t0, 3), "cache_path": str(cache_path),
+    }
+    if n_clusters:
+        labels_s = fcluster(Z, t=n_clusters, criterion="maxclust") - 1
+        if sample is None:
+            labels = labels_s
+        else:
+            X = X if X is not None else vectors(docs, representation)
+            Xs = X[idx]
+            k = int(labels_s.max()) + 1
+            onehot = sparse.csr_matrix((np.ones(len(idx)), (labels_s, np.arange(len(idx)))), shape=(k, len(idx)))
+            cent = onehot @ Xs
+            cent = cent.toarray() if sparse.issparse(cent) else np.asarray(cent)
+            cent /= np.maximum(np.linalg.norm(cent, axis=1, keepdims=True), 1e-12)
+            labels = _assign(X, cent.astype(np.float32))
+            labels[idx] = labels_s  # la muestra conserva su grupo del dendrograma
+        result["labels"] = labels
+        result["sizes"] = np.bincount(labels).tolist()
+    return result
+
+
+def dendrogram_data(Z: np.ndarray, labels: Optional[Sequence[str]] = None, p: int = 30) -> Dict[str, Any]:
+    """Coordenadas del dendrograma (truncado a p hojas) listas para graficar en la UI."""
+    d = dendrogram(Z, p=p, truncate_mode="lastp" if len(Z) + 1 > p else None, no_plot=True,
+                   labels=list(labels) if labels is not None and len(labels) == len(Z) + 1 else None)
+    return {"icoord": d["icoord"], "dcoord": d["dcoord"], "ivl": d["ivl"], "leaves": d["leaves"]}
+
+
+def export_dendrogram(result: Dict[str, Any], docs: Sequence[Doc], path: str | Path, p: int = 30) -> str:
+    titles = [docs[i].title[:80] for i in result["sample_idx"]]
+    data = dendrogram_data(result["linkage"], titles, p)
+    data.update(method=result["method"], representation=result["representation"],
+                n_docs=result["n_docs"], n_clustered=result["n_clustered"])
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Clustering jerarquico de los resumenes de paper")
+    ap.add_argument("--method", choices=METHODS, default="average")
+    ap.add_argument("--repr", dest="representation", choices=REPRESENTATIONS, default="tfidf")
+    ap.add_argument("--clusters", type=int, default=10)
+    ap.add_argument("--sample", type=int, default=None, help=f"Muestra a agrupar (por defecto si n > {MAX_DIRECT})")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--source", choices=["db", "csv"], default="db")
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--export", default=str(CLUSTER_CACHE / "dendrogram.json"), help="JSON del dendrograma")
+    ap.add_argument("--no-cache", action="store_true")
+    args = ap.parse_args()
+
+    docs = load_docs(args.source, limit=args.limit)
+    res = cluster(docs, args.method, args.representation, args.clusters, args.sample,
+                  args.workers, use_cache=not args.no_cache)
+    out = export_dendrogram(res, docs, args.export)
+    print(f"[OK] {res['n_docs']} documentos ({res['n_clustered']} en el dendrograma, cache={res['cached']}) "
+          f"en {res['seconds']}s; tamaños: {res.get('sizes')}")
+    print(f"[OK] Dendrograma en {out}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+# analysis/corpus.py
+from __future__ import annotations
+
+import csv
+import html
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import inspect, text
+
+# analysis -> repo root
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "data" / "raw"
+CACHE_DIR = ROOT / "data" / "cache"
+
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"\s+")
+
+
+class Doc(NamedTuple):
+    key: str    # doi en minusculas o "id:<paper.id>" / "title:<titulo>"
+    title: str
+    text: str   # resumen sin marcado (JATS/HTML)
+
+
+def plain_text(s: Optional[str]) -> str:
+    """Quita etiquetas <jats:p>... y entidades HTML de un resumen de Crossref/Elsevier."""
+    if not s:
+        return ""
+    return _SPACES.sub(" ", _TAGS.sub(" ", html.unescape(html.unescape(s)))).strip()
+
+
+def doc_key(pid: Optional[int], doi: Optional[str], title: Optional[str]) -> str:
+    doi = (doi or "").strip().lower()
+    return doi or (f"id:{pid}" if pid is not None else f"title:{(title or '').strip().lower()}")
+
+
+def _doc(pid: Optional[int], doi: Optional[str], title: Optional[str], abstract: Optional[str]) -> Doc:
+    return Doc(doc_key(pid, doi, title), title or "", plain_text(abstract))
+
+
+# --------- corpus desde la tabla paper ----------
+def db_state(engine) -> Tuple[int, int]:
+    """(filas, max(id)) de paper: identifica la version del corpus."""
+    with engine.connect() as con:
+        n, max_id = con.execute(text("SELECT count(*), COALESCE(max(id), 0) FROM paper")).one()
+    return int(n), int(max_id)
+
+
+def count_after(engine, after_id: int) -> int:
+    with engine.connect() as con:
+        return int(con.execute(text("SELECT count(*) FROM paper WHERE id > :a"), {"a": after_id}).scalar())
+
+
+def has_abstracts(engine) -> bool:
+    return "abstract" in {c["name"] for c in inspect(engine).get_columns("paper")}
+
+
+def iter_db_docs(engine, after_id: int = 0, chunk: int = 5000,
+                 only_with_text: bool = True) -> Iterator[Tuple[int, Doc]]:
+    """(paper.id, Doc) en orden de id, en streaming. Sin columna abstract el texto queda vacio."""
+    abstract = "abstract" if has_abstracts(engine) else "NULL"
+    where = f"AND {abstract} IS NOT NULL AND {abstract} <> ''" if only_with_text and abstract != "NULL" else ""
+    with engine.connect() as con:
+        res = con.execution_options(stream_results=True).execute(text(f"""
+            SELECT id, doi, title, {abstract} AS abstract FROM paper
+            WHERE id > :after {where} ORDER BY id
+        """), {"after": after_id})
+        while True:
+            rows = res.fetchmany(chunk)
+            if not rows:
+                break
+            for pid, doi, title, ab in rows:
+                yield pid, _doc(pid, doi, title, ab)
+
+
+# --------- corpus desde los CSV combinados ----------
+def csv_files(raw_dir: str | Path = RAW_DIR) -> List[Path]:
+    return sorted(Path(raw_dir).glob("combined_*.csv"))
+
+
+def iter_csv_rows(paths: Sequence[str | Path], seen: Optional[Set[str]] = None,
+                  keep: Optional[Callable[[Dict[str, str]], bool]] = None) -> Iterator[Dict[str, str]]:
+    """Filas de los CSV sin repetir clave (doc_key): los combined se solapan entre corridas.
+
+    Se leen del archivo mas nuevo al mas viejo, asi gana la version mas reciente de cada
+    paper. `seen` (se actualiza) permite saltar claves ya procesadas en otra llamada;
+    keep(fila) filtra antes de marcar la clave como vista.
+    """
+    seen = set() if seen is None else seen
+    for p in sorted(paths, key=lambda p: Path(p).name, reverse=True):
+        with open(p, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                if keep is not None and not keep(r):
+                    continue
+                key = doc_key(None, r.get("doi"), r.get("title"))
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield r
+
+
+def _has_text(r: Dict[str, str]) -> bool:
+    return bool((r.get("abstract") or "").strip())
+
+
+def iter_csv_docs(paths: Sequence[str | Path], only_with_text: bool = True,
+                  seen: Optional[Set[str]] = None) -> Iterator[Doc]:
+    """Un Doc por clave (ver iter_csv_rows); con only_with_text, la version mas nueva con resumen."""
+    for r in iter_csv_rows(paths, seen, keep=_has_text if only_with_text else None):
+        yield _doc(None, r.get("doi"), r.get("title"), r.get("abstract"))
@@ -0,0 +1,263 @@
+# analysis/embeddings.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from analysis.corpus import Doc, csv_files, iter_csv_docs, iter_db_docs
+
+load_dotenv(dotenv_path=ROOT / ".env", override=False)
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_DIR = ROOT / "data" / "embeddings"
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))   # textos por llamada al modelo
+FLUSH_ROWS = 1024                                           # vectores por escritura a disco
+
+EmbedFn = Callable[[Sequence[str]], np.ndarray]
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def model_name() -> str:
+    return os.getenv("EMBEDDING_MODEL") or DEFAULT_MODEL
+
+
+def embed(texts: Sequence[str], model: Optional[str] = None, batch_size: int = BATCH_SIZE) -> np.ndarray:
+    """Embeddings normalizados (float32, filas de norma 1) con sentence-transformers en CPU."""
+    name = model or model_name()
+    with _models_lock:
+        m = _models.get(name)
+        if m is None:
+            from sentence_transformers import SentenceTransformer
+            m = _models[name] = SentenceTransformer(name, device="cpu")
+    return m.encode(list(texts), batch_size=batch_size, normalize_embeddings=True,
+                    convert_to_numpy=True).astype(np.float32, copy=False)
+
+
+def store_dir(root: str | Path | None = None, model: Optional[str] = None) -> Path:
+    """Directorio del almacen de un modelo (no lo crea)."""
+    slug = re.sub(r"[^\w.-]+", "_", model or model_name())
+    return Path(root or os.getenv("EMBEDDINGS_DIR") or DEFAULT_DIR) / slug
+
+
+def doc_text(d: Doc) -> str:
+    """Texto que se embebe: titulo + resumen (solo titulo si no hay resumen)."""
+    return f"{d.title}. {d.text}" if d.text else d.title
+
+
+def _text_hash(s: str) -> bytes:
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest()
+
+
+class EmbeddingStore:
+    """Vectores float32 en un archivo plano mapeado en memoria + indice clave -> fila.
+
+    data/embeddings/<modelo>/vectors.f32   filas x dim, crece por anexado
+    data/embeddings/<modelo>/index.sqlite  clave (DOI o id:<n>) -> fila y hash del texto
+
+    update() solo embebe las claves nuevas o cuyo texto cambio (las cambiadas se
+    reescriben en su misma fila). matrix()/vector() devuelven vistas del memmap, sin
+    copiar: varios procesos lectores comparten las mismas paginas del archivo.
+
+    El commit del indice SQLite (claves y dim) es el punto de confirmacion: al abrir,
+    rows = max(row)+1 y se recortan de vectors.f32 las filas que una caida dejo sin
+    clave. meta.json es solo informativo.
+    """
+
+    def __init__(self, root: str | Path | None = None, model: Optional[str] = None):
+        self.model = model or model_name()
+        self.dir = store_dir(root, self.model)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / "vectors.f32"
+        self.meta_path = self.dir / "meta.json"
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.dir / "index.sqlite"), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS emb (
+                key TEXT PRIMARY KEY,
+                row INTEGER NOT NULL,
+                text_hash BLOB NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+        dim = self.conn.execute("SELECT value FROM store_meta WHERE name = 'dim'").fetchone()
+        if dim is None and self.meta_path.exists():  # almacenes anteriores: dim solo en meta.json
+            dim = (json.loads(self.meta_path.read_text()).get("dim"),)
+        self.dim: Optional[int] = int(dim[0]) if dim and dim[0] is not None else None
+        self.rows: int = self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM emb").fetchone()[0]
+        self._mm: Optional[np.memmap] = None
+        self._truncate()
+
+    def _truncate(self) -> None:
+        # filas anexadas cuyo commit no llego (caida entre el fsync y el indice)
+        if self.dim and self.vectors_path.exists():
+            size = self.rows * self.dim * 4
+            if self.vectors_path.stat().st_size > size:
+                os.truncate(self.vectors_path, size)
+
+    # --------- lectura (sin copia) ----------
+    def matrix(self) -> np.ndarray:
+        """Memmap de solo lectura (rows x dim). Vacio si aun no hay vectores."""
+        if not self.rows or self.dim is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if self._mm is None or self._mm.shape[0] != self.rows:
+            self._mm = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._mm
+
+    def row_of(self, key: str) -> Optional[int]:
+        with self._lock:
+            r = self.conn.execute("SELECT row FROM emb WHERE key = ?", (key,)).fetchone()
+        return r[0] if r else None
+
+    def rows_of(self, keys: Sequence[str]) -> np.ndarray:
+        """Filas de cada clave (-1 si no esta)."""
+        with self._lock:
+            found = dict(self._select("SELECT key, row FROM emb WHERE key IN ({})", keys))
+        return np.array([found.get(k, -1) for k in keys], dtype=np.int64)
+
+    def vector(self, key: str) -> Optional[np.ndarray]:
+        r = self.row_of(key)
+        return None if r is None else self.matrix()[r]
+
+    def keys(self, start: int = 0) -> List[str]:
+        """Claves ordenadas por fila desde `start` (las filas se asignan sin huecos)."""
+        with self._lock:
+            return [k for k, in self.conn.execute("SELECT key FROM emb WHERE row >= ? ORDER BY row", (start,))]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _select(self, sql: str, keys: Sequence[str], chunk: int = 900) -> List[Tuple]:
+        out: List[Tuple] = []
+        for i in range(0, len(keys), chunk):
+            part = list(keys[i:i + chunk])
+            out += self.conn.execute(sql.format(",".join("?" * len(part))), part).fetchall()
+        return out
+
+    # --------- escritura ----------
+    def _write(self, rows: List[int], vecs: np.ndarray) -> None:
+        """Escribe vecs en las filas indicadas (las >= self.rows se anexan en orden)."""
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vecs.shape[1])
+        elif vecs.shape[1] != self.dim:
+            raise ValueError(f"Dimension {vecs.shape[1]} distinta de la del almacen ({self.dim})")
+        rows_a = np.asarray(rows)
+        old = rows_a < self.rows
+        if old.any():
+            mm = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.rows, self.dim))
+            mm[rows_a[old]] = vecs[old]
+            mm.flush(); del mm
+        if (~old).any():
+            with open(self.vectors_path, "ab") as f:
+                f.write(vecs[~old].tobytes())
+                f.flush(); os.fsync(f.fileno())
+            self.rows += int((~old).sum())
+        self._mm = None
+
+    def _save_meta(self) -> None:
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"model": self.model, "dim": self.dim, "rows": self.rows,
+                                   "updated": time.time()}))
+        os.replace(tmp, self.meta_path)
+
+    def update(self, docs: Iterable[Doc], embed_fn: Optional[EmbedFn] = None,
+               batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+        """Embebe solo los docs nuevos o con texto cambiado. Devuelve conteos."""
+        embed_fn = embed_fn or (lambda t: embed(t, self.model, batch_size))
+        stats = {"seen": 0, "new": 0, "changed": 0, "unchanged": 0}
+        it = iter(docs)
+        while True:
+            block = list(islice(it, FLUSH_ROWS))
+            if not block:
+                break
+            block = list({d.key: d for d in block}.values())  # ultima version por clave
+            texts = [doc_text(d) for d in block]
+            hashes = [_text_hash(t) for t in texts]
+            with self._lock:
+                known = {k: (r, h) for k, r, h in
+                         self._select("SELECT key, row, text_hash FROM emb WHERE key IN ({})", [d.key for d in block])}
+            todo, rows = [], []
+            next_row = self.rows
+            for i, d in enumerate(block):
+                stats["seen"] += 1
+                prev = known.get(d.key)
+                if prev is not None and prev[1] == hashes[i]:
+                    stats["unchanged"] += 1
+                    continue
+                if prev is None:
+                    rows.append(next_row); next_row += 1; stats["new"] += 1
+                else:
+                    rows.append(prev[0]); stats["changed"] += 1
+                todo.append(i)
+            if not todo:
+                continue
+            vecs = np.vstack([embed_fn([texts[i] for i in todo[s:s + batch_size]])
+                              for s in range(0, len(todo), batch_size)])
+            with self._lock:
+                # primero los vectores, luego el indice: una caida no deja claves sin vector,
+                # y las filas sobrantes se recortan al abrir (_truncate)
+                self._write(rows, vecs)
+                self.conn.executemany("INSERT OR REPLACE INTO emb (key, row, text_hash) VALUES (?, ?, ?)",
+                                      [(block[i].key, r, hashes[i]) for i, r in zip(todo, rows)])
+                self.conn.execute("INSERT OR REPLACE INTO store_meta (name, value) VALUES ('dim', ?)",
+                                  (str(self.dim),))
+                self.conn.commit()
+                self._save_meta()
+        return stats
+
+    def vectors_for(self, docs: Sequence[Doc], embed_fn: Optional[EmbedFn] = None) -> np.ndarray:
+        """Matriz (len(docs) x dim) en el orden de docs; embebe antes lo que falte."""
+        self.update(docs, embed_fn)
+        rows = self.rows_of([d.key for d in docs])
+        return self.matrix()[rows]  # indexado por lista: copia compacta en el orden pedido
+
+    def close(self) -> None:
+        self._mm = None
+        self.conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Almacen incremental de embeddings (memmap float32)")
+    ap.add_argument("--source", choices=["db", "csv"], default="db")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    store = EmbeddingStore()
+    if args.source == "db":
+        from etl.db import get_engine
+        docs: Iterable[Doc] = (d for _, d in iter_db_docs(get_engine(), only_with_text=False))
+    else:
+        docs = iter_csv_docs(csv_files(), only_with_text=False)
+    if args.limit:
+        docs = islice(docs, args.limit)
+    t0 = time.perf_counter()
+    stats = store.update(docs, batch_size=args.batch_size)
+    print(f"[OK] {stats} en {time.perf_counter() - t0:.1f}s -> {store.rows} vectores "
+          f"(dim={store.dim}) en {store.vectors_path}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+# analysis/keywords.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from analysis.corpus import CACHE_DIR, Doc, count_after, csv_files, db_state, iter_csv_docs, iter_db_docs
+from etl.fuzzy_dedupe import clean_title
+
+KEYWORDS_CACHE = CACHE_DIR / "keywords"
+BATCH_DOCS = 5000          # documentos por matriz dispersa
+EXTRACT_NGRAMS = (1, 3)    # n-gramas candidatos para la extraccion tfidf
+MAX_TERMS = 200000         # tope de terminos extraidos guardados en el estado
+
+# categoria -> variantes (se normalizan con clean_title: sin acentos, guiones ni mayusculas)
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "Generative models": ["generative model", "generative models"],
+    "Prompting": ["prompting", "prompt", "prompts"],
+    "Machine learning": ["machine learning"],
+    "Multimodality": ["multimodality", "multimodal"],
+    "Fine-tuning": ["fine-tuning", "fine tuning", "fine-tuned"],
+    "Training data": ["training data"],
+    "Algorithmic bias": ["algorithmic bias"],
+    "Explainability": ["explainability", "explainable"],
+    "Transparency": ["transparency"],
+    "Ethics": ["ethics", "ethical"],
+    "Privacy": ["privacy"],
+    "Personalization": ["personalization", "personalisation"],
+    "Human-AI interaction": ["human-ai interaction"],
+    "AI literacy": ["ai literacy"],
+    "Co-creation": ["co-creation", "co creation"],
+}
+
+
+def load_keywords(path: str | Path) -> Dict[str, List[str]]:
+    """Archivo de texto: una categoria por linea, variantes separadas por '|'."""
+    out: Dict[str, List[str]] = {}
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        parts = [p.strip() for p in line.split("|") if p.strip()]
+        if parts and not parts[0].startswith("#"):
+            out[parts[0]] = parts
+    return out
+
+
+class KeywordCounter:
+    """Cuenta variantes de palabras clave con una matriz dispersa documentos x variantes.
+
+    Las variantes se agregan por categoria multiplicando por una matriz indicadora
+    (variantes x categorias), sin bucles por documento.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.labels = list(keywords)
+        variants: Dict[str, int] = {}
+        rows, cols = [], []
+        for j, label in enumerate(self.labels):
+            for v in keywords[label]:
+                v = clean_title(v)
+                if v and v not in variants:
+                    variants[v] = len(variants)
+                    rows.append(variants[v]); cols.append(j)
+        max_n = max((len(v.split()) for v in variants), default=1)
+        self.vectorizer = CountVectorizer(vocabulary=variants, ngram_range=(1, max_n),
+                                          preprocessor=clean_title, token_pattern=r"(?u)\b\w+\b")
+        self.to_label = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)),
+                                          shape=(len(variants), len(self.labels)))
+
+    def matrix(self, texts: List[str]) -> sparse.csr_matrix:
+        """Apariciones por documento y categoria (documentos x categorias)."""
+        return (self.vectorizer.transform(texts) @ self.to_label).tocsr()
+
+    def count(self, texts: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(apariciones, documentos con al menos una) por categoria."""
+        X = self.matrix(texts)
+        return np.asarray(X.sum(axis=0)).ravel(), np.asarray((X > 0).sum(axis=0)).ravel()
+
+
+def _tfidf_terms(texts: List[str]) -> Dict[str, List[int]]:
+    """Frecuencia y frecuencia documental de n-gramas candidatos (sin stop words) de un lote."""
+    vec = CountVectorizer(ngram_range=EXTRACT_NGRAMS, stop_words="english", preprocessor=clean_title,
+                          token_pattern=r"(?u)\b[a-z][a-z]+\b")
+    try:
+        X = vec.fit_transform(texts)
+    except ValueError:  # lote sin terminos
+        return {}
+    tf = np.asarray(X.sum(axis=0)).ravel()
+    df = np.asarray((X > 0).sum(axis=0)).ravel()
+    return {t: [int(tf[i]), int(df[i])] for t, i in vec.vocabulary_.items()}
+
+
+def _phrase_terms(texts: List[str], method: str, per_doc: int = 10) -> Dict[str, List[int]]:
+    """Frases extraidas por documento con yake o rake-nltk (opcionales)."""
+    if method == "yake":
+        import yake
+        kw = yake.KeywordExtractor(lan="en", n=3, top=per_doc)
+        extract = lambda t: [k for k, _ in kw.extract_keywords(t)]
+    else:
+        from rake_nltk import Rake
+        rake = Rake()
+        def extract(t: str) -> List[str]:
+            rake.extract_keywords_from_text(t)
+            return rake.get_ranked_phrases()[:per_doc]
+    out: Dict[str, List[int]] = {}
+    for t in texts:
+        for phrase in {clean_title(p) for p in extract(t)} - {""}:
+            c = out.setdefault(phrase, [0, 0]); c[0] += 1; c[1] += 1
+    return out
+
+
+class KeywordStats:
+    """Acumulado (aditivo) de conteos; se guarda en JSON y se actualiza por lotes nuevos."""
+
+    def __init__(self, labels: List[str], extractor: str):
+        self.labels = labels
+        self.extractor = extractor
+        self.n_docs = 0
+        self.kw_count = np.zeros(len(labels), dtype=np.int64)
+        self.kw_docs = np.zeros(len(labels), dtype=np.int64)
+        self.terms: Dict[str, List[int]] = {}   # termino -> [frecuencia, documentos]
+        self.watermark: Any = None              # db: ultimo paper.id; csv: archivos procesados
+        self.doc_keys: List[str] = []           # csv: claves ya contadas (los CSV se solapan)
+        self.rows_seen = 0                      # filas de paper recorridas (con o sin resumen)
+
+    def add(self, counter: KeywordCounter, texts: List[str]) -> None:
+        if not texts:
+            return
+        tf, df = counter.count(texts)
+        self.kw_count += tf; self.kw_docs += df
+        self.n_docs += len(texts)
+        if self.extractor != "none":
+            batch = _tfidf_terms(texts) if self.extractor == "tfidf" else _phrase_terms(texts, self.extractor)
+            for t, (c, d) in batch.items():
+                cur = self.terms.get(t)
+                if cur is None:
+                    self.terms[t] = [c, d]
+                else:
+                    cur[0] += c; cur[1] += d
+            if len(self.terms) > 2 * MAX_TERMS:
+                self._prune()
+
+    def _prune(self) -> None:
+        # conserva los MAX_TERMS con mas documentos (la cola de hapax es aproximada)
+        keep = sorted(self.terms.items(), key=lambda kv: (kv[1][1], kv[1][0]), reverse=True)[:MAX_TERMS]
+        self.terms = dict(keep)
+
+    def keywords(self) -> List[Dict[str, Any]]:
+        n = max(self.n_docs, 1)
+        out = [{"keyword": l, "count": int(c), "docs": int(d), "doc_share": round(float(d) / n, 4)}
+               for l, c, d in zip(self.labels, self.kw_count, self.kw_docs)]
+        return sorted(out, key=lambda r: (-r["count"], r["keyword"]))
+
+    def extracted(self, top_n: int = 20, min_docs: int = 2) -> List[Dict[str, Any]]:
+        n = self.n_docs
+        scored = []
+        for t, (c, d) in self.terms.items():
+            if d < min_docs:
+                continue
+            # tf-idf agregado del corpus (idf suavizado como en sklearn); yake/rake: n documentos
+            score = c * (math.log((1 + n) / (1 + d)) + 1) if self.extractor == "tfidf" else d
+            scored.append((score, t, c, d))
+        scored.sort(reverse=True)
+        return [{"term": t, "score": round(float(s), 3), "count": c, "docs": d} for s, t, c, d in scored[:top_n]]
+
+    # --------- persistencia ----------
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "labels": self.labels, "extractor": self.extractor, "n_docs": self.n_docs,
+            "kw_count": self.kw_count.tolist(), "kw_docs": self.kw_docs.tolist(),
+            "terms": self.terms, "watermark": self.watermark, "rows_seen": self.rows_seen,
+            "doc_keys": self.doc_keys,
+        }, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["KeywordStats"]:
+        try:
+            d = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        st = cls(d["labels"], d["extractor"])
+        st.n_docs = d["n_docs"]
+        st.kw_count = np.array(d["kw_count"], dtype=np.int64)
+        st.kw_docs = np.array(d["kw_docs"], dtype=np.int64)
+        st.terms = d["terms"]; st.watermark = d["watermark"]; st.rows_seen = d.get("rows_seen", 0)
+        st.doc_keys = d.get("doc_keys", [])
+        return st
+
+
+def _batches(docs: Iterable[Doc], size: int = BATCH_DOCS) -> Iterable[List[str]]:
+    it = iter(docs)
+    while True:
+        batch = [d.text for d in islice(it, size)]
+        if not batch:
+            return
+        yield batch
+
+
+def _state_path(source: str, keywords: Dict[str, List[str]], extractor: str) -> Path:
+    cfg = json.dumps([source, keywords, extractor, EXTRACT_NGRAMS], sort_keys=True, ensure_ascii=False)
+    return KEYWORDS_CACHE / f"{source}_{hashlib.sha1(cfg.encode('utf-8')).hexdigest()[:12]}.json"
+
+
+def analyze(source: str = "db", keywords: Optional[Dict[str, List[str]]] = None, extractor: str = "tfidf",
+            top_n: int = 20, engine=None, raw_dir: str | Path | None = None,
+            refresh: bool = False) -> Dict[str, Any]:
+    """Frecuencias de palabras clave (+ terminos extraidos) sobre los resumenes del corpus.
+
+    source: "db" (tabla paper) o "csv" (data/raw/combined_*.csv). El estado se guarda
+    en data/cache/keywords/ por corpus y configuracion; en la siguiente llamada solo se
+    procesan los papers con id mayor al ultimo visto (o los CSV nuevos). Si paper
+    perdio filas (borrados) se recalcula todo.
+    extractor: tfidf (vectorizado) | yake | rake | none.
+    """
+    if extractor not in ("tfidf", "yake", "rake", "none"):
+        raise ValueError(f"extractor invalido: {extractor}")
+    keywords = keywords or DEFAULT_KEYWORDS
+    counter = KeywordCounter(keywords)
+    path = _state_path(source, keywords, extractor)
+    st = None if refresh else KeywordStats.load(path)
+    incremental = st is not None
+
+    if source == "db":
+        if engine is None:
+            from etl.db import get_engine
+            engine = get_engine()
+        n_rows, max_id = db_state(engine)
+        last = int(st.watermark or 0) if st else 0
+        # solo anexos: las filas vistas + las nuevas deben sumar el total actual
+        if st is not None and st.rows_seen + count_after(engine, last) != n_rows:
+            st, incremental, last = None, False, 0
+        if st is None:
+            st = KeywordStats(counter.labels, extractor)
+        before = st.n_docs
+        if max_id > last:
+            for batch in _batches(d for _, d in iter_db_docs(engine, after_id=last)):
+                st.add(counter, batch)
+            st.watermark, st.rows_seen = max_id, n_rows
+        new_docs = st.n_docs - before
+        version = {"source": "db", "rows": n_rows, "max_id": max_id}
+    elif source == "csv":
+        files = csv_files(raw_dir) if raw_dir else csv_files()
+        names = [p.name for p in files]
+        seen = set(st.watermark or []) if st else set()
+        # se borraron CSV, o estado anterior sin claves (contaba repetidos): recalcular
+        if st is not None and (not seen <= set(names) or (seen and not st.doc_keys)):
+            st, incremental, seen = None, False, set()
+        if st is None:
+            st = KeywordStats(counter.labels, extractor)
+        pending = [p for p in files if p.name not in seen]
+        before = st.n_docs
+        # un paper repetido en varios CSV (o ya contado en una corrida anterior) cuenta una vez
+        keys = set(st.doc_keys)
+        for batch in _batches(iter_csv_docs(pending, seen=keys)):
+            st.add(counter, batch)
+        st.doc_keys = sorted(keys)
+        st.watermark = sorted(seen | {p.name for p in pending})
+        new_docs = st.n_docs - before
+        version = {"source": "csv", "files": len(names), "last": names[-1] if names else None}
+    else:
+        raise ValueError(f"source invalido: {source} (usa db o csv)")
+
+    st.save(path)
+    return {
+        "version": version,
+        "n_docs": st.n_docs,
+        "new_docs": new_docs,
+        "incremental": incremental,
+        "keywords": st.keywords(),
+        "extracted": st.extracted(top_n) if extractor != "none" else [],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Frecuencia de palabras clave en los resumenes del corpus")
+    ap.add_argument("--source", choices=["db", "csv"], default="db")
+    ap.add_argument("--keywords-file", default=None, help="Categorias (una por linea, variantes con '|')")
+    ap.add_argument("--extractor", choices=["tfidf", "yake", "rake", "none"], default="tfidf")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--refresh", action="store_true", help="Ignora el estado guardado y recalcula")
+    args = ap.parse_args()
+
+    kws = load_keywords(args.keywords_file) if args.keywords_file else None
+    res = analyze(args.source, kws, args.extractor, args.top, refresh=args.refresh)
+    print(f"[OK] {res['n_docs']} resumenes ({res['new_docs']} nuevos, incremental={res['incremental']})")
+    for r in res["keywords"]:
+        print(f"  {r['keyword']:<24} {r['count']:>7} apariciones  {r['docs']:>6} docs")
+    if res["extracted"]:
+        print("Terminos extraidos:")
+        for r in res["extracted"]:
+            print(f"  {r['term']:<40} {r['score']:>10}  ({r['docs']} docs)")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
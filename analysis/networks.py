@@ -0,0 +1,370 @@
+# analysis/networks.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sqlalchemy import text
+
+from analysis.corpus import CACHE_DIR, has_abstracts, plain_text
+from analysis.keywords import DEFAULT_KEYWORDS, KeywordCounter
+
+NETWORK_CACHE = CACHE_DIR / "networks"
+KINDS = ("coauthor", "coword")
+MAX_AUTHORS_PER_PAPER = int(os.getenv("NETWORK_MAX_AUTHORS", "50"))  # mas autores: sin aristas (hiperautoria)
+BETWEENNESS_K = int(os.getenv("NETWORK_BETWEENNESS_K", "256"))       # fuentes muestreadas para betweenness
+LOUVAIN_MAX_EDGES = 1_000_000                                        # por encima: propagacion de etiquetas
+VIEW_MAX_NODES = 300
+KEEP_OLD_SECONDS = 600                                               # versiones viejas que un lector aun puede abrir
+
+_SPACES = re.compile(r"\s+")
+
+
+def author_names(authors: Optional[str]) -> List[str]:
+    """Separa la cadena "A; B; C" de item_to_row/entry_to_row (sin repetidos)."""
+    out: Dict[str, str] = {}
+    for a in (authors or "").split(";"):
+        a = _SPACES.sub(" ", a).strip().strip(",")
+        if a:
+            out.setdefault(a.casefold(), a)
+    return list(out.values())
+
+
+class CoGraph:
+    """Grafo de co-ocurrencia (autores o palabras clave) con adyacencia dispersa.
+
+    Cada lote de papers se convierte en una matriz de incidencia B (papers x nodos) y
+    se suma B.T @ B a la adyacencia, que crece con los nodos nuevos sin reconstruirse.
+    La diagonal guarda el numero de papers de cada nodo. En disco
+    (data/cache/networks/<tipo>/): cada save escribe adjacency.npz y nodes.json en un
+    directorio nuevo v<version>_<sufijo>/ y luego reemplaza meta.json, que apunta a el
+    ("data"). Ese reemplazo es el unico punto de cambio: un lector nunca mezcla la matriz
+    de una version con las etiquetas de otra, aunque la UI y la pasada posterior a la
+    carga guarden a la vez (gana la ultima, completa).
+    """
+
+    def __init__(self, kind: str, root: str | Path = NETWORK_CACHE):
+        if kind not in KINDS:
+            raise ValueError(f"Tipo de red invalido: {kind} (usa {', '.join(KINDS)})")
+        self.kind = kind
+        self.dir = Path(root) / kind
+        self.labels: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.adj = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.meta: Dict[str, Any] = {"max_paper_id": 0, "papers": 0, "skipped": 0, "version": 0}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    # --------- persistencia ----------
+    def exists(self) -> bool:
+        return (self.dir / "meta.json").exists()
+
+    def load(self) -> "CoGraph":
+        self.meta = json.loads((self.dir / "meta.json").read_text())
+        data = self.dir / self.meta["data"] if "data" in self.meta else self.dir  # sin "data": formato anterior
+        self.labels = json.loads((data / "nodes.json").read_text(encoding="utf-8"))
+        self._index = {l.casefold(): i for i, l in enumerate(self.labels)}
+        self.adj = sparse.load_npz(data / "adjacency.npz").tocsr()
+        return self
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        prev = self.meta.get("data")
+        name = f"v{self.meta['version']}_{uuid.uuid4().hex[:8]}"
+        data = self.dir / name
+        data.mkdir()
+        sparse.save_npz(data / "adjacency.npz", self.adj)
+        (data / "nodes.json").write_text(json.dumps(self.labels, ensure_ascii=False), encoding="utf-8")
+        self.meta.update(nodes=len(self.labels), edges=self.n_edges(), updated=time.time(), data=name)
+        tmp = self.dir / f"meta.{name}.tmp"
+        tmp.write_text(json.dumps(self.meta))
+        os.replace(tmp, self.dir / "meta.json")  # punto de cambio: la nueva version queda visible entera
+        self._prune(keep={name, prev})
+
+    def _prune(self, keep: set) -> None:
+        # versiones viejas: se dejan un rato por si un lector leyo meta.json justo antes del cambio
+        limit = time.time() - KEEP_OLD_SECONDS
+        for p in self.dir.glob("v*_*"):
+            if p.is_dir() and p.name not in keep and p.stat().st_mtime < limit:
+                shutil.rmtree(p, ignore_errors=True)
+        for legacy in ("adjacency.npz", "nodes.json"):
+            (self.dir / legacy).unlink(missing_ok=True)
+
+    # --------- construccion incremental ----------
+    def _node(self, label: str) -> int:
+        k = label.casefold()
+        i = self._index.get(k)
+        if i is None:
+            i = self._index[k] = len(self.labels)
+            self.labels.append(label)
+        return i
+
+    def add_incidence(self, B: sparse.spmatrix) -> None:
+        """Suma B.T @ B (B: papers x nodos, binaria) a la adyacencia."""
+        B = sparse.csr_matrix(B, dtype=np.int32)
+        B.data[:] = 1
+        n = B.shape[1]
+        if n > self.adj.shape[0]:
+            A = self.adj.tocoo()
+            self.adj = sparse.csr_matrix((A.data, (A.row, A.col)), shape=(n, n), dtype=np.int32)
+        elif n < self.adj.shape[0]:
+            B = sparse.csr_matrix((B.data, B.indices, B.indptr), shape=(B.shape[0], self.adj.shape[0]))
+        self.adj = (self.adj + (B.T @ B).tocsr()).tocsr()
+        self.meta["papers"] += int((B.getnnz(axis=1) > 0).sum())
+        self.meta["version"] += 1
+
+    def add_groups(self, groups: Sequence[Sequence[str]]) -> None:
+        """Un grupo por paper (p.ej. sus autores): todos quedan conectados entre si."""
+        rows, cols = [], []
+        for r, g in enumerate(groups):
+            if len(g) > MAX_AUTHORS_PER_PAPER:
+                self.meta["skipped"] += 1
+                continue
+            for label in g:
+                rows.append(r); cols.append(self._node(label))
+        B = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                              shape=(len(groups), len(self.labels)))
+        self.add_incidence(B)
+
+    def set_labels(self, labels: Sequence[str]) -> None:
+        """Nodos fijos (categorias de palabras clave); deben coincidir con los ya guardados."""
+        if self.labels and self.labels != list(labels):
+            raise ValueError("Las palabras clave cambiaron: reconstruye la red con --rebuild")
+        for l in labels:
+            self._node(l)
+
+    # --------- consulta ----------
+    def off_diagonal(self, min_weight: int = 1) -> sparse.csr_matrix:
+        A = self.adj.copy()
+        A.setdiag(0)
+        if min_weight > 1:
+            A.data[A.data < min_weight] = 0
+        A.eliminate_zeros()
+        return A.tocsr()
+
+    def n_edges(self) -> int:
+        return int(self.off_diagonal().nnz // 2)
+
+    def papers_per_node(self) -> np.ndarray:
+        return self.adj.diagonal()
+
+    def graph(self, min_weight: int = 1, nodes: Optional[np.ndarray] = None):
+        """Grafo networkx (pesos = papers en comun); `nodes` limita a un subgrafo inducido."""
+        import networkx as nx
+        A = self.off_diagonal(min_weight)
+        if nodes is not None:
+            A = A[nodes][:, nodes]
+        G = nx.from_scipy_sparse_array(A, edge_attribute="weight")
+        ids = nodes if nodes is not None else np.arange(len(self.labels))
+        return nx.relabel_nodes(G, {i: int(ids[i]) for i in range(len(ids))}, copy=False)
+
+
+# --------- metricas ----------
+def betweenness(A: sparse.csr_matrix, k: Optional[int] = None, seed: int = 0, batch: int = 32) -> np.ndarray:
+    """Betweenness (sin pesos, normalizada como networkx) por Brandes con algebra dispersa.
+
+    Las BFS de `batch` fuentes avanzan a la vez como productos A @ F (n x batch), por
+    niveles; con k < n se muestrean k fuentes y se reescala, igual que
+    nx.betweenness_centrality(G, k=k).
+    """
+    n = A.shape[0]
+    bc = np.zeros(n)
+    if n <= 2:
+        return bc
+    A = sparse.csr_matrix((np.ones(A.nnz), A.indices, A.indptr), shape=A.shape)
+    sources = np.arange(n) if not k or k >= n else np.random.default_rng(seed).choice(n, size=k, replace=False)
+    for b in range(0, len(sources), batch):
+        src = sources[b:b + batch]
+        cols = np.arange(len(src))
+        depth = np.full((n, len(src)), -1, dtype=np.int32)
+        sigma = np.zeros((n, len(src)))
+        depth[src, cols] = 0
+        sigma[src, cols] = 1.0
+        frontier = sigma.copy()
+        d = 0
+        while True:  # hacia adelante: caminos minimos por nivel
+            nxt = A @ frontier
+            new = (nxt > 0) & (depth < 0)
+            if not new.any():
+                break
+            d += 1
+            depth[new] = d
+            sigma[new] = nxt[new]
+            frontier = np.where(new, nxt, 0.0)
+        delta = np.zeros_like(sigma)
+        safe = np.where(sigma > 0, sigma, 1.0)
+        for lvl in range(d, 0, -1):  # hacia atras: acumulacion de dependencias
+            T = np.where(depth == lvl, (1.0 + delta) / safe, 0.0)
+            C = A @ T
+            prev = depth == lvl - 1
+            delta[prev] += sigma[prev] * C[prev]
+        delta[src, cols] = 0.0
+        bc += delta.sum(axis=1)
+    return bc * (n / len(sources)) / ((n - 1) * (n - 2))
+
+
+def metrics(g: CoGraph, betweenness_k: int = BETWEENNESS_K, min_weight: int = 1) -> pd.DataFrame:
+    """Grado, fuerza, betweenness (aproximada por muestreo) y comunidad de cada nodo.
+
+    Se guardan en metrics.csv junto al grafo y se reutilizan mientras no cambie.
+    """
+    import networkx as nx
+    path = g.dir / "metrics.csv"
+    stamp = g.dir / "metrics.json"
+    key = {"version": g.meta["version"], "updated": g.meta.get("updated"),
+           "k": betweenness_k, "min_weight": min_weight}
+    if path.exists() and stamp.exists() and json.loads(stamp.read_text()) == key:
+        return pd.read_csv(path)
+
+    A = g.off_diagonal(min_weight)
+    n = A.shape[0]
+    df = pd.DataFrame({
+        "node": g.labels,
+        "papers": g.papers_per_node(),
+        "degree": np.diff(A.indptr),
+        "strength": np.asarray(A.sum(axis=1)).ravel(),
+    })
+    df["betweenness"] = betweenness(A, betweenness_k or None)
+    G = nx.from_scipy_sparse_array(A, edge_attribute="weight")
+    if A.nnz // 2 <= LOUVAIN_MAX_EDGES:
+        comms = nx.community.louvain_communities(G, weight="weight", seed=0)
+    else:
+        comms = nx.community.label_propagation_communities(G)
+    comm = np.zeros(n, dtype=np.int64)
+    for c, members in enumerate(sorted(comms, key=len, reverse=True)):  # 0 = la mas grande
+        comm[list(members)] = c
+    df["community"] = comm
+    g.dir.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    stamp.write_text(json.dumps(key))
+    return df
+
+
+def render_view(g: CoGraph, df: Optional[pd.DataFrame] = None, max_nodes: int = VIEW_MAX_NODES,
+                min_weight: int = 1, path: Optional[str | Path] = None) -> str:
+    """HTML de pyvis con los `max_nodes` nodos de mayor fuerza (color = comunidad)."""
+    from pyvis.network import Network
+    df = df if df is not None else metrics(g)
+    top = np.sort(df.sort_values(["strength", "papers"], ascending=False).index[:max_nodes].to_numpy())
+    G = g.graph(min_weight, nodes=top)
+    net = Network(height="650px", width="100%", cdn_resources="remote")
+    for i in G.nodes:
+        r = df.iloc[i]
+        net.add_node(int(i), label=str(r.node), value=float(r.papers), group=int(r.community),
+                     title=f"{r.node}<br>papers: {r.papers}<br>grado: {r.degree}<br>"
+                           f"betweenness: {r.betweenness:.4f}")
+    for u, v, w in G.edges(data="weight"):
+        net.add_edge(int(u), int(v), value=int(w), title=f"{w} papers")
+    if len(top) <= 150:
+        net.barnes_hut()
+    else:
+        net.toggle_physics(False)  # con muchos nodos la simulacion bloquea el navegador
+    html = net.generate_html()
+    out = Path(path) if path else g.dir / "view.html"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(html, encoding="utf-8")
+    return html
+
+
+# --------- lectura incremental de paper ----------
+def iter_paper_batches(engine, after_id: int = 0, chunk: int = 5000) -> Iterator[List[Tuple]]:
+    """Lotes de (id, authors, title, abstract) de paper con id > after_id, en orden de id."""
+    abstract = "abstract" if has_abstracts(engine) else "NULL"
+    with engine.connect() as con:
+        res = con.execution_options(stream_results=True).execute(text(f"""
+            SELECT id, authors, title, {abstract} AS abstract FROM paper
+            WHERE id > :after ORDER BY id
+        """), {"after": after_id})
+        while True:
+            rows = res.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+
+
+def load_graphs(root: str | Path = NETWORK_CACHE) -> Dict[str, CoGraph]:
+    out = {}
+    for kind in KINDS:
+        g = CoGraph(kind, root)
+        out[kind] = g.load() if g.exists() else g
+    return out
+
+
+def update_from_db(engine, graphs: Optional[Dict[str, CoGraph]] = None,
+                   keywords: Optional[Dict[str, List[str]]] = None,
+                   root: str | Path = NETWORK_CACHE) -> Dict[str, int]:
+    """Suma a las redes los papers nuevos (id mayor al ultimo procesado). Devuelve papers por red.
+
+    La marca max_paper_id es segura porque los merges del ETL se serializan y confirman
+    los ids en orden (etl.run_csv_ingest.PAPER_MERGE_LOCK).
+    """
+    graphs = graphs or load_graphs(root)
+    counter = KeywordCounter(keywords or DEFAULT_KEYWORDS)
+    graphs["coword"].set_labels(counter.labels)
+    after = min(g.meta["max_paper_id"] for g in graphs.values())
+    added = {k: 0 for k in graphs}
+    for rows in iter_paper_batches(engine, after):
+        for kind, g in graphs.items():
+            part = [r for r in rows if r[0] > g.meta["max_paper_id"]]
+            if not part:
+                continue
+            if kind == "coauthor":
+                g.add_groups([author_names(r[1]) for r in part])
+            else:
+                g.add_incidence(counter.matrix([f"{r[2] or ''} {plain_text(r[3])}" for r in part]))
+            g.meta["max_paper_id"] = int(part[-1][0])
+            added[kind] += len(part)
+    for kind, g in graphs.items():
+        if added[kind] or not g.exists():
+            g.save()
+    return added
+
+
+def networks_built(root: str | Path = NETWORK_CACHE) -> bool:
+    return any((Path(root) / k / "meta.json").exists() for k in KINDS)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Redes de coautoria y co-ocurrencia de palabras clave")
+    ap.add_argument("--rebuild", action="store_true", help="Descarta el estado guardado y procesa todo paper")
+    ap.add_argument("--kind", choices=KINDS, default="coauthor", help="Red para metricas / vista")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--view", default=None, help="Ruta del HTML de pyvis (por defecto en data/cache/networks)")
+    ap.add_argument("--max-nodes", type=int, default=VIEW_MAX_NODES)
+    args = ap.parse_args()
+
+    from etl.db import get_engine
+    graphs = {k: CoGraph(k) for k in KINDS} if args.rebuild else None
+    t0 = time.perf_counter()
+    added = update_from_db(get_engine(), graphs)
+    print(f"[OK] papers nuevos por red: {added} en {time.perf_counter() - t0:.1f}s")
+
+    g = CoGraph(args.kind).load()
+    print(f"[OK] {args.kind}: {g.meta['nodes']} nodos, {g.meta['edges']} aristas, {g.meta['papers']} papers")
+    t0 = time.perf_counter()
+    df = metrics(g)
+    print(f"[OK] metricas en {time.perf_counter() - t0:.1f}s; {df['community'].nunique()} comunidades")
+    print(df.sort_values("betweenness", ascending=False).head(args.top).to_string(index=False))
+    render_view(g, df, args.max_nodes, path=args.view)
+    print(f"[OK] Vista en {args.view or g.dir / 'view.html'}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,359 @@
+# analysis/similarity.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz.distance import Levenshtein
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from analysis.corpus import Doc, csv_files, iter_csv_docs, iter_db_docs
+from analysis.embeddings import EmbeddingStore, embed
+from etl.fuzzy_dedupe import MinHashLSH, clean_title
+
+DEFAULT_PATH = ROOT / "data" / "similarity.sqlite"
+
+# medidas vectoriales: top-k exacto por productos de matrices (densas o dispersas) por bloques
+VECTOR_MEASURES = ("tfidf", "jaccard", "embedding")
+# medidas de edicion: candidatos por LSH (bloqueo) y puntuacion con rapidfuzz
+EDIT_MEASURES = ("levenshtein",)
+MEASURES = VECTOR_MEASURES + EDIT_MEASURES
+
+CHUNK_CELLS = 20_000_000   # celdas (filas x N) por bloque de similitud: ~80 MB en float32
+PARALLEL_MIN_DOCS = 2000   # por debajo no compensa levantar procesos
+MAX_BUCKET = 200           # buckets LSH mas grandes se ignoran (texto generico / plantillas)
+PAIR_CHUNK = 20000         # pares candidatos por tarea de Levenshtein
+
+
+class Pair(NamedTuple):
+    a: str        # Doc.key
+    b: str
+    score: float  # 0-1
+
+
+def _norm(s: str) -> str:
+    return clean_title(s)
+
+
+# --------- una sola pareja (misma definicion que en el top-k) ----------
+def similarity(a: str, b: str, measure: str = "tfidf", corpus: Optional[Sequence[str]] = None) -> float:
+    """Similitud de dos textos.
+
+    tfidf: el IDF sale de `corpus` (los textos sobre los que se corrio top_k, asi el valor
+    coincide con el de sus pares); sin corpus es un TF-IDF de solo esos dos documentos,
+    donde los terminos comunes a ambos pesan poco y el valor no es comparable con top_k.
+    """
+    if measure == "levenshtein":
+        return float(Levenshtein.normalized_similarity(_norm(a), _norm(b)))
+    if measure == "jaccard":
+        sa, sb = set(_norm(a).split()), set(_norm(b).split())
+        return len(sa & sb) / len(sa | sb) if sa | sb else 0.0
+    if measure == "tfidf" and corpus is not None:
+        try:
+            X = _tfidf().fit(corpus).transform([a, b])
+        except ValueError:  # vocabulario vacio
+            return 0.0
+    else:
+        X = _matrix([a, b], measure)
+    return float((X[0] @ X[1].T).toarray()[0, 0] if sparse.issparse(X) else X[0] @ X[1])
+
+
+# --------- representaciones ----------
+def _tfidf() -> TfidfVectorizer:
+    return TfidfVectorizer(preprocessor=_norm, stop_words="english", sublinear_tf=True, dtype=np.float32)
+
+
+def _matrix(texts: Sequence[str], measure: str):
+    """Filas normalizadas de modo que X @ X.T sea la similitud (salvo jaccard)."""
+    if measure == "tfidf":
+        try:
+            return _tfidf().fit_transform(texts).tocsr()
+        except ValueError:  # vocabulario vacio
+            return sparse.csr_matrix((len(texts), 1), dtype=np.float32)
+    if measure == "jaccard":
+        vec = CountVectorizer(preprocessor=_norm, binary=True, token_pattern=r"(?u)\b\w+\b", dtype=np.float32)
+        try:
+            return vec.fit_transform(texts).tocsr()
+        except ValueError:
+            return sparse.csr_matrix((len(texts), 1), dtype=np.float32)
+    if measure == "embedding":
+        return embed(texts)
+    raise ValueError(f"Medida no vectorial: {measure}")
+
+
+# --------- top-k por bloques (se ejecuta en procesos hijos) ----------
+_X = None
+_SIZES = None
+_TEXTS: List[str] = []
+
+
+def _init_vector(X, sizes) -> None:
+    global _X, _SIZES
+    _X, _SIZES = X, sizes
+
+
+def _block_topk(start: int, stop: int, k: int, min_score: float) -> List[Tuple[int, int, float]]:
+    X = _X
+    S = X[start:stop] @ X.T
+    S = S.toarray() if sparse.issparse(S) else np.asarray(S)
+    if _SIZES is not None:  # jaccard: interseccion / union
+        inter = S
+        S = inter / np.maximum(_SIZES[start:stop, None] + _SIZES[None, :] - inter, 1)
+    rows = np.arange(stop - start)
+    S[rows, rows + start] = -np.inf  # sin auto-pares
+    kk = min(k, S.shape[1] - 1)
+    if kk <= 0:
+        return []
+    idx = np.argpartition(-S, kk - 1, axis=1)[:, :kk]
+    out = []
+    for r in rows:
+        for j in idx[r]:
+            s = float(S[r, j])
+            if s > min_score:
+                out.append((start + r, int(j), s))
+    return out
+
+
+def _init_edit(texts: List[str]) -> None:
+    global _TEXTS
+    _TEXTS = texts
+
+
+def _score_pairs(pairs: List[Tuple[int, int]], min_score: float) -> List[Tuple[int, int, float]]:
+    out = []
+    for i, j in pairs:
+        a, b = _TEXTS[i], _TEXTS[j]
+        # filtro por longitud: la similitud normalizada no puede superar min/max
+        if min(len(a), len(b)) < min_score * max(len(a), len(b), 1):
+            continue
+        s = Levenshtein.normalized_similarity(a, b, score_cutoff=min_score or None)
+        if s > min_score:
+            out.append((i, j, float(s)))
+    return out
+
+
+def _run(tasks: List[Tuple], fn: Callable, init: Callable, initargs: Tuple, workers: Optional[int],
+         n_docs: int) -> Iterator[List[Tuple[int, int, float]]]:
+    if n_docs < PARALLEL_MIN_DOCS or workers == 1:
+        init(*initargs)
+        for t in tasks:
+            yield fn(*t)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init, initargs=initargs) as pool:
+        futs = [pool.submit(fn, *t) for t in tasks]
+        for f in futs:
+            yield f.result()
+
+
+def _lsh_candidates(texts: List[str]) -> Iterator[Tuple[int, int]]:
+    """Pares que comparten al menos un bucket LSH (shingles de caracteres)."""
+    lsh = MinHashLSH()
+    for i, t in enumerate(texts):
+        if t:
+            lsh.insert(i, lsh.signature(t))
+    seen = set()
+    for band in lsh.buckets:
+        for ids in band.values():
+            if 1 < len(ids) <= MAX_BUCKET:
+                for p in combinations(ids, 2):
+                    if p not in seen:
+                        seen.add(p)
+                        yield p
+
+
+def _chunks(it: Iterable, size: int) -> Iterator[List]:
+    it = iter(it)
+    while True:
+        block = list(islice(it, size))
+        if not block:
+            return
+        yield block
+
+
+def top_k(docs: Sequence[Doc], measure: str = "tfidf", k: int = 10, min_score: float = 0.0,
+          field: str = "text", workers: Optional[int] = None) -> List[Pair]:
+    """Los k documentos mas parecidos a cada documento (pares dirigidos a -> b).
+
+    Medidas vectoriales: X @ X.T por bloques de filas (memoria acotada por CHUNK_CELLS),
+    top-k con argpartition. Levenshtein: solo pares candidatos por LSH y con longitudes
+    compatibles. Con muchos documentos los bloques se reparten en un pool de procesos.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"Medida invalida: {measure} (usa {', '.join(MEASURES)})")
+    # un paper repetido (p.ej. en varios CSV) se emparejaria consigo mismo: uno por clave
+    docs = list({d.key: d for d in docs}.values())
+    texts = [getattr(d, field) or "" for d in docs]
+    n = len(texts)
+    if n < 2:
+        return []
+    keys = [d.key for d in docs]
+
+    triples: Iterable[List[Tuple[int, int, float]]]
+    if measure in VECTOR_MEASURES:
+        if measure == "embedding" and field == "text":
+            # titulo + resumen desde el almacen persistente (solo se embebe lo nuevo)
+            X = EmbeddingStore().vectors_for(docs)
+        else:
+            X = _matrix(texts, measure)
+        sizes = np.asarray(X.sum(axis=1), dtype=np.float32).ravel() if measure == "jaccard" else None
+        # bloques acotados en memoria y, al menos, unos cuantos por proceso
+        per_worker = -(-n // (4 * (workers or os.cpu_count() or 1)))
+        step = max(1, min(CHUNK_CELLS // n, per_worker))
+        tasks = [(s, min(n, s + step), k, min_score) for s in range(0, n, step)]
+        triples = _run(tasks, _block_topk, _init_vector, (X, sizes), workers, n)
+    else:
+        norm = [_norm(t) for t in texts]
+        tasks = [(block, min_score) for block in _chunks(_lsh_candidates(norm), PAIR_CHUNK)]
+        triples = _run(tasks, _score_pairs, _init_edit, (norm,), workers, n)
+
+    # top-k por documento (los pares de Levenshtein son simetricos)
+    heaps: Dict[int, List[Tuple[float, int]]] = {}
+    def push(i: int, j: int, s: float) -> None:
+        if keys[i] == keys[j]:
+            return
+        h = heaps.setdefault(i, [])
+        if len(h) < k:
+            heapq.heappush(h, (s, j))
+        elif s > h[0][0]:
+            heapq.heapreplace(h, (s, j))
+    for block in triples:
+        for i, j, s in block:
+            push(i, j, s)
+            if measure in EDIT_MEASURES:
+                push(j, i, s)
+    return [Pair(keys[i], keys[j], round(s, 6))
+            for i in sorted(heaps) for s, j in sorted(heaps[i], reverse=True)]
+
+
+# --------- persistencia ----------
+class SimilarityStore:
+    """Resultados de top_k en SQLite: una corrida por (medida, campo, corpus) con sus pares."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path or os.getenv("SIMILARITY_DB_PATH") or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS run (
+                id INTEGER PRIMARY KEY,
+                measure TEXT NOT NULL,
+                field TEXT NOT NULL,
+                source TEXT,
+                k INTEGER,
+                n_docs INTEGER,
+                params TEXT,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pair (
+                run_id INTEGER NOT NULL,
+                a TEXT NOT NULL,
+                b TEXT NOT NULL,
+                score REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pair_run_a ON pair (run_id, a, score DESC);
+        """)
+        self.conn.commit()
+
+    def save(self, pairs: Iterable[Pair], measure: str, field: str, source: str, k: int,
+             n_docs: int, params: Optional[Dict[str, Any]] = None) -> int:
+        cur = self.conn.execute(
+            "INSERT INTO run (measure, field, source, k, n_docs, params, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (measure, field, source, k, n_docs, json.dumps(params or {}), time.time()))
+        run_id = cur.lastrowid
+        self.conn.executemany("INSERT INTO pair (run_id, a, b, score) VALUES (?, ?, ?, ?)",
+                              ((run_id, p.a, p.b, p.score) for p in pairs))
+        # se conserva solo la ultima corrida por medida/campo/fuente
+        old = [r[0] for r in self.conn.execute(
+            "SELECT id FROM run WHERE measure = ? AND field = ? AND source IS ? AND id <> ?",
+            (measure, field, source, run_id))]
+        for rid in old:
+            self.conn.execute("DELETE FROM pair WHERE run_id = ?", (rid,))
+            self.conn.execute("DELETE FROM run WHERE id = ?", (rid,))
+        self.conn.commit()
+        return run_id
+
+    def latest_run(self, measure: str, field: str = "text", source: Optional[str] = None) -> Optional[int]:
+        sql = "SELECT id FROM run WHERE measure = ? AND field = ?"
+        args: List[Any] = [measure, field]
+        if source is not None:
+            sql += " AND source = ?"; args.append(source)
+        row = self.conn.execute(sql + " ORDER BY created DESC LIMIT 1", args).fetchone()
+        return row[0] if row else None
+
+    def neighbors(self, key: str, measure: str = "tfidf", field: str = "text", k: int = 10,
+                  source: Optional[str] = None) -> List[Pair]:
+        run_id = self.latest_run(measure, field, source)
+        if run_id is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT a, b, score FROM pair WHERE run_id = ? AND a = ? ORDER BY score DESC LIMIT ?",
+            (run_id, key, k)).fetchall()
+        return [Pair(*r) for r in rows]
+
+    def runs(self) -> List[Dict[str, Any]]:
+        cols = ["id", "measure", "field", "source", "k", "n_docs", "params", "created"]
+        return [dict(zip(cols, r)) for r in self.conn.execute(f"SELECT {', '.join(cols)} FROM run ORDER BY id")]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def load_docs(source: str = "db", engine=None, limit: Optional[int] = None) -> List[Doc]:
+    if source == "db":
+        if engine is None:
+            from etl.db import get_engine
+            engine = get_engine()
+        docs = (d for _, d in iter_db_docs(engine))
+    elif source == "csv":
+        docs = iter_csv_docs(csv_files())
+    else:
+        raise ValueError(f"source invalido: {source} (usa db o csv)")
+    return list(islice(docs, limit) if limit else docs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Top-k de documentos similares (resumenes o titulos)")
+    ap.add_argument("--measure", choices=MEASURES, default="tfidf")
+    ap.add_argument("--field", choices=["text", "title"], default="text", help="text = resumen")
+    ap.add_argument("--source", choices=["db", "csv"], default="db")
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--min-score", type=float, default=0.0)
+    ap.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, todos los nucleos)")
+    ap.add_argument("--limit", type=int, default=None, help="Solo los primeros N documentos")
+    ap.add_argument("--query", default=None, help="Solo consulta: vecinos guardados de este DOI/clave")
+    args = ap.parse_args()
+
+    store = SimilarityStore()
+    if args.query:
+        for p in store.neighbors(args.query.lower(), args.measure, args.field, args.k):
+            print(f"  {p.score:.4f}  {p.b}")
+        return
+
+    docs = load_docs(args.source, limit=args.limit)
+    t0 = time.perf_counter()
+    pairs = top_k(docs, args.measure, k=args.k, min_score=args.min_score, field=args.field, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    run_id = store.save(pairs, args.measure, args.field, args.source, args.k, len(docs),
+                        {"min_score": args.min_score})
+    print(f"[OK] {len(docs)} documentos, {len(pairs)} pares ({args.measure}) en {elapsed:.1f}s -> run {run_id} en {store.path}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
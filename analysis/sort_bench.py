@@ -0,0 +1,223 @@
+# analysis/sort_bench.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' / 'analysis.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------------
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analysis.corpus import csv_files, iter_csv_rows
+from analysis.sorting import ALGORITHMS, Key, sort_key
+
+BENCH_DIR = ROOT / "data" / "benchmarks" / "sorting"
+DEFAULT_SEED = 20240101
+MAX_SECONDS = float(os.getenv("SORT_BENCH_MAX_SECONDS", "20"))  # si un tamaño tarda mas, no se sigue creciendo
+MODELS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "n": lambda n: n,
+    "n log n": lambda n: n * np.log2(n),
+    "n log^2 n": lambda n: n * np.log2(n) ** 2,
+    "n^2": lambda n: n ** 2,
+}
+
+
+# --------- datos ----------
+def load_keys(source: str = "csv", engine=None, raw_dir: Optional[str | Path] = None) -> List[Key]:
+    """Claves (anio, titulo) de los CSV combinados (un paper por clave) o de la tabla paper."""
+    if source == "csv":
+        files = csv_files(raw_dir) if raw_dir else csv_files()
+        return [sort_key(r.get("published"), r.get("title")) for r in iter_csv_rows(files)]
+    if source == "db":
+        from sqlalchemy import text
+        if engine is None:
+            from etl.db import get_engine
+            engine = get_engine()
+        with engine.connect() as con:
+            return [sort_key(p, t) for p, t in con.execute(text("SELECT published, title FROM paper ORDER BY id"))]
+    raise ValueError(f"source invalido: {source} (usa csv o db)")
+
+
+def fingerprint(keys: Sequence[Key]) -> str:
+    """Huella del conjunto de datos (independiente del orden de lectura)."""
+    h = hashlib.sha1()
+    for k in sorted(keys):
+        h.update(k); h.update(b"\n")
+    return h.hexdigest()
+
+
+def default_sizes(n: int, start: int = 500) -> List[int]:
+    sizes, m = [], start
+    while m < n:
+        sizes.append(m); m *= 2
+    return sizes + [n]
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(), "implementation": platform.python_implementation(),
+        "platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor(),
+        "cpu_count": os.cpu_count(), "numpy": np.__version__, "commit": commit,
+    }
+
+
+# --------- medicion ----------
+def _time_once(fn, data: List[Key]) -> float:
+    gc.collect()
+    gc.disable()  # sin pausas del recolector dentro de la medicion
+    try:
+        t0 = time.perf_counter_ns()
+        fn(data)
+        return (time.perf_counter_ns() - t0) / 1e9
+    finally:
+        gc.enable()
+
+
+def _peak_memory(fn, data: List[Key]) -> int:
+    # corrida aparte: tracemalloc hace mas lento el codigo y distorsionaria los tiempos
+    tracemalloc.start()
+    try:
+        fn(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def growth(summary: pd.DataFrame) -> pd.DataFrame:
+    """Exponente empirico (pendiente log-log) y modelo que mejor ajusta cada algoritmo."""
+    rows = []
+    for name, g in summary.groupby("algorithm"):
+        g = g[g["median_s"] > 0]
+        if len(g) < 3:
+            continue
+        n, t = g["n"].to_numpy(float), g["median_s"].to_numpy(float)
+        slope = float(np.polyfit(np.log(n), np.log(t), 1)[0])
+        errs = {}
+        for m, f in MODELS.items():  # t ~ c * f(n): error cuadratico en escala log
+            c = float(np.exp(np.mean(np.log(t) - np.log(f(n)))))
+            errs[m] = float(np.mean((np.log(t) - np.log(c * f(n))) ** 2))
+        best = min(errs, key=errs.get)
+        rows.append({"algorithm": name, "category": g["category"].iloc[0],
+                     "expected": ALGORITHMS[name].complexity, "exponent": round(slope, 3),
+                     "best_model": best, "sizes": len(g)})
+    return pd.DataFrame(rows)
+
+
+def run(keys: Sequence[Key], algorithms: Optional[Sequence[str]] = None, sizes: Optional[Sequence[int]] = None,
+        trials: int = 5, seed: int = DEFAULT_SEED, memory: bool = True,
+        max_seconds: float = MAX_SECONDS, out_dir: Optional[str | Path] = None,
+        log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Mide cada algoritmo sobre prefijos crecientes de una permutacion fija de las claves.
+
+    La permutacion depende solo de `seed` y de los datos (ordenados antes de barajar), asi
+    que misma huella + misma semilla = mismas entradas en cualquier maquina. Como el tiempo
+    absoluto si depende de la maquina, cada mediana se reporta tambien relativa a
+    sorted() de CPython sobre la misma entrada.
+    """
+    algorithms = list(algorithms or ALGORITHMS)
+    unknown = [a for a in algorithms if a not in ALGORITHMS]
+    if unknown:
+        raise ValueError(f"Algoritmos desconocidos: {unknown}")
+    if "builtin" not in algorithms:
+        algorithms.insert(0, "builtin")  # referencia para los tiempos relativos
+    base = sorted(keys)
+    data = list(base)
+    random.Random(seed).shuffle(data)
+    sizes = sorted(set(min(s, len(data)) for s in (sizes or default_sizes(len(data)))))
+
+    raw: List[Dict[str, Any]] = []
+    summary: List[Dict[str, Any]] = []
+    stopped: Dict[str, int] = {}
+    for n in sizes:
+        inp = data[:n]
+        expected = sorted(inp)
+        ref = None
+        for name in algorithms:
+            alg = ALGORITHMS[name]
+            if (alg.max_n and n > alg.max_n) or name in stopped:
+                continue
+            if alg.fn(inp) != expected:  # tambien sirve de calentamiento
+                raise AssertionError(f"{name} no ordena correctamente (n={n})")
+            times = [_time_once(alg.fn, inp) for _ in range(trials)]
+            raw += [{"algorithm": name, "n": n, "trial": i, "seconds": t} for i, t in enumerate(times)]
+            med = statistics.median(times)
+            ref = med if name == "builtin" else ref
+            summary.append({
+                "algorithm": name, "category": alg.category, "n": n,
+                "median_s": med, "min_s": min(times), "stdev_s": statistics.pstdev(times),
+                "relative": med / ref if ref else None,
+                "peak_bytes": _peak_memory(alg.fn, inp) if memory else None,
+            })
+            log(f"  n={n:>7} {name:<17} mediana {med:.4f}s")
+            if med > max_seconds:
+                stopped[name] = n  # el siguiente tamaño (x2) seria demasiado lento
+
+    summary_df = pd.DataFrame(summary)
+    growth_df = growth(summary_df)
+    manifest = {
+        "created": datetime.now().isoformat(timespec="seconds"), "seed": seed, "trials": trials,
+        "records": len(keys), "fingerprint": fingerprint(base), "sizes": sizes,
+        "algorithms": algorithms, "stopped_after": stopped, "max_seconds": max_seconds,
+        "environment": environment(),
+    }
+    out = Path(out_dir) if out_dir else BENCH_DIR / datetime.now().strftime("%Y%m%d_%H%M%S")
+    out.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(raw).to_csv(out / "trials.csv", index=False)
+    summary_df.to_csv(out / "summary.csv", index=False)
+    growth_df.to_csv(out / "growth.csv", index=False)
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return {"dir": str(out), "manifest": manifest, "summary": summary_df, "growth": growth_df}
+
+
+def runs(root: str | Path = BENCH_DIR) -> List[Path]:
+    """Corridas guardadas, la mas reciente primero."""
+    root = Path(root)
+    return sorted((p for p in root.iterdir() if (p / "manifest.json").exists()), reverse=True) if root.exists() else []
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de algoritmos de ordenamiento sobre (anio, titulo)")
+    ap.add_argument("--source", choices=["csv", "db"], default="csv")
+    ap.add_argument("--algorithms", nargs="*", default=None, help=f"Subconjunto de: {', '.join(ALGORITHMS)}")
+    ap.add_argument("--sizes", nargs="*", type=int, default=None, help="Por defecto 500, 1000, 2000, ... hasta n")
+    ap.add_argument("--trials", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    ap.add_argument("--no-memory", action="store_true", help="Omite la corrida con tracemalloc")
+    ap.add_argument("--out", default=None, help="Directorio de resultados (por defecto data/benchmarks/sorting/<fecha>)")
+    args = ap.parse_args()
+
+    keys = load_keys(args.source)
+    if not keys:
+        print(f"[ERROR] No hay registros en la fuente {args.source}")
+        return 1
+    print(f"[INFO] {len(keys)} registros de {args.source}")
+    res = run(keys, args.algorithms, args.sizes, args.trials, args.seed, memory=not args.no_memory,
+              out_dir=args.out)
+    print(res["growth"].to_string(index=False))
+    print(f"[OK] Resultados en {res['dir']}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+# analysis/sorting.py
+"""Catalogo de algoritmos de ordenamiento para el benchmark (analysis/sort_bench.py).
+
+Todos reciben una lista de claves `bytes` (ver sort_key) y devuelven una lista nueva
+ordenada, sin modificar la entrada. Las claves codifican (anio, titulo) de modo que el
+orden de bytes coincide con el orden de la tupla; asi los algoritmos por comparacion
+y los de distribucion (radix, bucket, pigeonhole) ordenan exactamente lo mismo.
+"""
+from __future__ import annotations
+
+import re
+from bisect import insort
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+Key = bytes
+SortFn = Callable[[List[Key]], List[Key]]
+
+_YEAR = re.compile(r"(\d{4})")
+_SPACES = re.compile(r"\s+")
+YEAR_BYTES = 2
+SENTINEL = b"\xff"  # mayor que cualquier clave: el primer byte del anio es <= 0x27
+
+
+def sort_key(published: Optional[str], title: Optional[str]) -> Key:
+    """Clave (anio de published, titulo normalizado) como bytes comparables."""
+    m = _YEAR.search(published or "")
+    year = int(m.group(1)) if m else 0
+    t = _SPACES.sub(" ", (title or "")).strip().casefold()
+    return year.to_bytes(YEAR_BYTES, "big") + t.encode("utf-8")
+
+
+# --------- por comparacion ----------
+def selection_sort(a: List[Key]) -> List[Key]:
+    a = list(a)
+    n = len(a)
+    for i in range(n - 1):
+        m = i
+        for j in range(i + 1, n):
+            if a[j] < a[m]:
+                m = j
+        a[i], a[m] = a[m], a[i]
+    return a
+
+
+def gnome_sort(a: List[Key]) -> List[Key]:
+    a = list(a)
+    i, n = 1, len(a)
+    while i < n:
+        if i == 0 or a[i - 1] <= a[i]:
+            i += 1
+        else:
+            a[i - 1], a[i] = a[i], a[i - 1]
+            i -= 1
+    return a
+
+
+def binary_insertion_sort(a: List[Key]) -> List[Key]:
+    out: List[Key] = []
+    for x in a:
+        insort(out, x)  # busqueda binaria + desplazamiento
+    return out
+
+
+def comb_sort(a: List[Key]) -> List[Key]:
+    a = list(a)
+    gap, n, done = len(a), len(a), False
+    while not done:
+        gap = max(1, int(gap / 1.3))
+        done = gap == 1
+        for i in range(n - gap):
+            if a[i] > a[i + gap]:
+                a[i], a[i + gap] = a[i + gap], a[i]
+                done = False
+    return a
+
+
+def tree_sort(a: List[Key]) -> List[Key]:
+    """Arbol binario de busqueda sin balancear (iterativo: sin limite de recursion)."""
+    if not a:
+        return []
+    key, left, right = [a[0]], [-1], [-1]
+    for x in a[1:]:
+        node = 0
+        while True:
+            side = left if x < key[node] else right
+            if side[node] < 0:
+                side[node] = len(key)
+                key.append(x); left.append(-1); right.append(-1)
+                break
+            node = side[node]
+    out, stack, node = [], [], 0
+    while stack or node >= 0:
+        while node >= 0:
+            stack.append(node); node = left[node]
+        node = stack.pop()
+        out.append(key[node])
+        node = right[node]
+    return out
+
+
+def quick_sort(a: List[Key]) -> List[Key]:
+    """Quicksort iterativo, pivote mediana de tres y particion en tres (claves repetidas)."""
+    a = list(a)
+    stack = [(0, len(a) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if lo >= hi:
+            continue
+        mid = (lo + hi) // 2
+        pivot = sorted((a[lo], a[mid], a[hi]))[1]
+        lt, i, gt = lo, lo, hi
+        while i <= gt:
+            if a[i] < pivot:
+                a[lt], a[i] = a[i], a[lt]; lt += 1; i += 1
+            elif a[i] > pivot:
+                a[i], a[gt] = a[gt], a[i]; gt -= 1
+            else:
+                i += 1
+        stack.append((lo, lt - 1))
+        stack.append((gt + 1, hi))
+    return a
+
+
+def heap_sort(a: List[Key]) -> List[Key]:
+    a = list(a)
+    n = len(a)
+
+    def sift(start: int, end: int) -> None:
+        root = start
+        while 2 * root + 1 < end:
+            child = 2 * root + 1
+            if child + 1 < end and a[child] < a[child + 1]:
+                child += 1
+            if a[root] >= a[child]:
+                return
+            a[root], a[child] = a[child], a[root]
+            root = child
+
+    for s in range(n // 2 - 1, -1, -1):
+        sift(s, n)
+    for end in range(n - 1, 0, -1):
+        a[0], a[end] = a[end], a[0]
+        sift(0, end)
+    return a
+
+
+def bitonic_sort(a: List[Key]) -> List[Key]:
+    """Red bitonica iterativa; rellena con SENTINEL hasta la siguiente potencia de 2."""
+    n = len(a)
+    size = 1
+    while size < n:
+        size *= 2
+    x = list(a) + [SENTINEL] * (size - n)
+    k = 2
+    while k <= size:
+        j = k // 2
+        while j > 0:
+            for i in range(size):
+                l = i ^ j
+                if l > i and ((x[i] > x[l]) == ((i & k) == 0)):
+                    x[i], x[l] = x[l], x[i]
+            j //= 2
+        k *= 2
+    return x[:n]
+
+
+# --------- sin comparaciones (distribucion) ----------
+def _msd_radix(a: List[Key], offset: int = 0) -> List[Key]:
+    """Radix MSD por bytes desde `offset`; las claves mas cortas van primero."""
+    out: List[Key] = []
+    stack = [(a, offset)]
+    while stack:
+        part, d = stack.pop()
+        if len(part) <= 1:
+            out.extend(part)
+            continue
+        ended: List[Key] = []
+        buckets: Dict[int, List[Key]] = {}
+        for x in part:
+            if len(x) <= d:
+                ended.append(x)
+            else:
+                buckets.setdefault(x[d], []).append(x)
+        out.extend(ended)
+        for b in sorted(buckets, reverse=True):  # pila: el menor se procesa primero
+            stack.append((buckets[b], d + 1))
+    return out
+
+
+def radix_sort(a: List[Key]) -> List[Key]:
+    return _msd_radix(list(a))
+
+
+def pigeonhole_sort(a: List[Key]) -> List[Key]:
+    """Pigeonhole por anio sobre las claves ya ordenadas por titulo (orden LSD estable)."""
+    if not a:
+        return []
+    by_title = _msd_radix(list(a), offset=YEAR_BYTES)
+    years = [int.from_bytes(x[:YEAR_BYTES], "big") for x in by_title]
+    lo = min(years)
+    holes: List[List[Key]] = [[] for _ in range(max(years) - lo + 1)]
+    for x, y in zip(by_title, years):
+        holes[y - lo].append(x)
+    return [x for h in holes for x in h]
+
+
+def bucket_sort(a: List[Key], prefix: int = 8) -> List[Key]:
+    """n cubetas segun los primeros `prefix` bytes de la clave; insercion dentro de cada una."""
+    n = len(a)
+    if n <= 1:
+        return list(a)
+    vals = [int.from_bytes(x[:prefix].ljust(prefix, b"\0"), "big") for x in a]
+    lo, hi = min(vals), max(vals)
+    span = hi - lo + 1
+    buckets: List[List[Key]] = [[] for _ in range(n)]
+    for x, v in zip(a, vals):
+        insort(buckets[(v - lo) * n // span], x)
+    return [x for b in buckets for x in b]
+
+
+# --------- hibridos ----------
+MINRUN = 32
+
+
+def tim_sort(a: List[Key]) -> List[Key]:
+    """TimSort simplificado: tramos de MINRUN con insercion binaria + mezclas por pares."""
+    a = list(a)
+    n = len(a)
+    for lo in range(0, n, MINRUN):
+        run: List[Key] = []
+        for x in a[lo:lo + MINRUN]:
+            insort(run, x)
+        a[lo:lo + MINRUN] = run
+    width = MINRUN
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid, hi = min(lo + width, n), min(lo + 2 * width, n)
+            if mid >= hi or a[mid - 1] <= a[mid]:
+                continue  # tramos ya en orden: no hay que mezclar
+            left, right = a[lo:mid], a[mid:hi]
+            i = j = 0; k = lo
+            while i < len(left) and j < len(right):
+                if right[j] < left[i]:
+                    a[k] = right[j]; j += 1
+                else:
+                    a[k] = left[i]; i += 1
+                k += 1
+            a[k:hi] = left[i:] if i < len(left) else right[j:]
+        width *= 2
+    return a
+
+
+def builtin_sort(a: List[Key]) -> List[Key]:
+    """sorted() de CPython (TimSort en C): referencia para normalizar tiempos."""
+    return sorted(a)
+
+
+class Algorithm(NamedTuple):
+    name: str
+    fn: SortFn
+    category: str                 # comparison | non-comparison | hybrid
+    complexity: str               # caso promedio esperado
+    max_n: Optional[int] = None   # tope de tamaño (algoritmos cuadraticos en Python puro)
+
+
+ALGORITHMS: Dict[str, Algorithm] = {a.name: a for a in [
+    Algorithm("builtin", builtin_sort, "hybrid", "n log n"),
+    Algorithm("timsort", tim_sort, "hybrid", "n log n"),
+    Algorithm("quicksort", quick_sort, "comparison", "n log n"),
+    Algorithm("heapsort", heap_sort, "comparison", "n log n"),
+    Algorithm("treesort", tree_sort, "comparison", "n log n"),
+    Algorithm("combsort", comb_sort, "comparison", "n log n"),
+    Algorithm("bitonic", bitonic_sort, "comparison", "n log^2 n"),
+    Algorithm("binary_insertion", binary_insertion_sort, "comparison", "n^2", 50_000),
+    Algorithm("selection", selection_sort, "comparison", "n^2", 8_000),
+    Algorithm("gnome", gnome_sort, "comparison", "n^2", 8_000),
+    Algorithm("radix", radix_sort, "non-comparison", "n k"),
+    Algorithm("bucket", bucket_sort, "non-comparison", "n + k"),
+    Algorithm("pigeonhole", pigeonhole_sort, "non-comparison", "n + k"),
+]}
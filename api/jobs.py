@@ -0,0 +1,152 @@
+# api/jobs.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))          # ingestas simultaneas
+JOB_MAX_PENDING = int(os.getenv("INGEST_JOB_MAX_PENDING", "20"))  # en cola + en curso
+JOB_TTL = float(os.getenv("INGEST_JOB_TTL", "3600"))              # s que se conserva un job terminado
+
+TERMINAL = {"done", "error"}
+
+
+class QueueFull(RuntimeError):
+    """Hay demasiados jobs pendientes; el cliente debe reintentar mas tarde."""
+
+
+def job_key(params: Dict[str, Any]) -> str:
+    """Clave de coalescencia: mismos parametros -> mismo job mientras este en vuelo."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Job:
+    """Estado de una ingesta en segundo plano.
+
+    Cada update() incrementa `version` y despierta a quien espere en wait(), asi el
+    endpoint SSE solo emite cuando hay cambios.
+    """
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"      # queued | running | done | error
+        self.stage = "queued"       # queued | fetch | load | done
+        self.progress: Dict[str, int] = {}
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.submissions = 1        # peticiones coalescidas en este job
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.version = 0
+        self._cond = threading.Condition()
+
+    def update(self, progress: Optional[Dict[str, int]] = None, **fields: Any) -> None:
+        with self._cond:
+            if progress:
+                self.progress.update(progress)
+            for k, v in fields.items():
+                setattr(self, k, v)
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Bloquea hasta que version cambie (o timeout); devuelve la version actual."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version or self.status in TERMINAL, timeout)
+            return self.version
+
+    def snapshot(self, include_result: bool = True) -> Dict[str, Any]:
+        with self._cond:
+            out = {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": dict(self.progress),
+                "submissions": self.submissions,
+                "created_at": self.created,
+                "started_at": self.started,
+                "finished_at": self.finished,
+                "error": self.error,
+            }
+            if include_result:
+                out["result"] = self.result
+            return out
+
+
+class JobManager:
+    """Pool acotado de workers + registro de jobs en memoria (por proceso)."""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING, ttl: float = JOB_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-job")
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[str, Job] = {}  # key -> job en cola o en curso
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[Job], Any]) -> Tuple[Job, bool]:
+        """Encola fn(job). Si ya hay un job en vuelo con la misma clave, lo devuelve (coalesced=True)."""
+        with self._lock:
+            self._prune()
+            job = self._inflight.get(key)
+            if job is not None:
+                job.update(submissions=job.submissions + 1)
+                return job, True
+            if len(self._inflight) >= self.max_pending:
+                raise QueueFull(f"{len(self._inflight)} jobs pendientes (max {self.max_pending})")
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+        self._pool.submit(self._run, job, fn)
+        return job, False
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.update(status="running", started=time.time())
+        try:
+            result = fn(job)
+        except Exception as e:
+            job.update(status="error", error=f"{type(e).__name__}: {e}", finished=time.time())
+        else:
+            job.update(status="done", stage="done", result=result, finished=time.time())
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+
+    def _prune(self) -> None:
+        now = time.time()
+        for jid in [j.id for j in self._jobs.values() if j.finished and now - j.finished > self.ttl]:
+            del self._jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._prune()
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+        return [j.snapshot(include_result=False) for j in jobs]
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -1,7 +1,22 @@
 # api/main.py (fragmento)
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from api.routers import ingest as ingest_router
+from api.routers import semantic as semantic_router
+from api.routers import metrics as metrics_router
+from etl.db import dispose_async_engines, dispose_engines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # cierra los pools compartidos (etl.db) al apagar el proceso
+    await dispose_async_engines()
+    dispose_engines()
 
 
-app = FastAPI(title="Analisis de Algoritmos – API")
-app.include_router(ingest_router.router)
\ No newline at end of file
+app = FastAPI(title="Analisis de Algoritmos – API", lifespan=lifespan)
+app.include_router(ingest_router.router)
+app.include_router(semantic_router.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
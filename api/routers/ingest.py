@@ -1,22 +1,118 @@
 # api/routers/ingest.py
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from api.jobs import TERMINAL, Job, QueueFull, get_manager, job_key
+from etl.db import get_engine
 from etl.ingest_service import run_ingest
-import subprocess, sys
+from etl.run_csv_ingest import run_etl
 
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
+SSE_HEARTBEAT = 15.0  # s sin cambios antes de enviar un comentario keep-alive
+
 
 class IngestReq(BaseModel):
-query: str
-sources: list[str] = ["sciencedirect", "acm", "sage"]
-per_source: int = 300
+    query: str
+    sources: list[str] = ["sciencedirect", "acm", "sage"]
+    per_source: int = 300
+    concurrent: bool = False
+    fuzzy_dedupe: bool = False
+    parquet: bool = False  # ademas del CSV, escribe al dataset Parquet
+
+
+def _ingest_and_load(req: IngestReq, progress: Optional[Callable[[str, Dict[str, int]], None]] = None,
+                     raise_etl: bool = False) -> Dict[str, Any]:
+    """raise_etl: propaga el error del ETL (jobs: el job queda en "error", no en "done")."""
+    result = run_ingest(req.query, req.sources, per_source=req.per_source, concurrent=req.concurrent,
+                        fuzzy_dedupe=req.fuzzy_dedupe, progress=progress,
+                        output_format="both" if req.parquet else "csv")
+    if not result["out_csv"]:
+        return {"ingest": result, "etl": None}
+    if progress:
+        progress("load", {})
+    # ETL en proceso (sin subprocess), con el pool compartido del proceso (etl.db)
+    try:
+        etl = run_etl(result["out_csv"], engine=get_engine(), source=",".join(req.sources))
+    except Exception as e:
+        if raise_etl:
+            raise
+        return {"ingest": result, "etl": None, "etl_error": f"{type(e).__name__}: {e}"}
+    if progress:
+        progress("load", {"rows_loaded": etl["rows_staged"], "rows_inserted": etl["inserted"]})
+    return {"ingest": result, "etl": etl}
 
 
 @router.post("/")
 def ingest(req: IngestReq):
-result = run_ingest(req.query, req.sources, per_source=req.per_source)
-# Dispara ETL
-p = subprocess.run([sys.executable, "etl/run_csv_ingest.py", "--input", result["out_csv"], "--source", ",".join(req.sources)], capture_output=True, text=True)
-return {"ingest": result, "etl_stdout": p.stdout, "etl_stderr": p.stderr, "returncode": p.returncode}
\ No newline at end of file
+    return _ingest_and_load(req)
+
+
+# --------- jobs en segundo plano ----------
+@router.post("/jobs", status_code=202)
+def submit_job(req: IngestReq):
+    """Encola la ingesta y devuelve job_id de inmediato; una consulta identica en vuelo se reutiliza."""
+    key = job_key({
+        "query": " ".join(req.query.split()),
+        "sources": sorted(set(req.sources)),
+        "per_source": req.per_source,
+        "concurrent": req.concurrent,
+        "fuzzy_dedupe": req.fuzzy_dedupe,
+        "parquet": req.parquet,
+    })
+
+    def work(job: Job) -> Dict[str, Any]:
+        def progress(stage: str, counts: Dict[str, int]) -> None:
+            job.update(progress=counts, stage="fetch" if stage == "done" else stage)
+        return _ingest_and_load(req, progress, raise_etl=True)
+
+    try:
+        job, coalesced = get_manager().submit(key, work)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status, "coalesced": coalesced}
+
+
+@router.get("/jobs")
+def list_jobs():
+    return get_manager().list()
+
+
+def _job_or_404(job_id: str) -> Job:
+    job = get_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no existe (o expiro)")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _job_or_404(job_id).snapshot()
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: un evento `progress` por cambio y uno final `done`/`error`."""
+    job = _job_or_404(job_id)
+
+    async def stream():
+        version = -1
+        while True:
+            current = await asyncio.to_thread(job.wait, version, SSE_HEARTBEAT)
+            if current == version and job.status not in TERMINAL:
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            snap = job.snapshot(include_result=job.status in TERMINAL)
+            event = job.status if job.status in TERMINAL else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snap, ensure_ascii=False, default=str)}\n\n"
+            if job.status in TERMINAL:
+                return
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
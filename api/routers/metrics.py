@@ -0,0 +1,14 @@
+# api/routers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from etl.metrics import CONTENT_TYPE, REGISTRY
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Contadores e histogramas de ingesta/ETL del proceso en formato Prometheus."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
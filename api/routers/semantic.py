@@ -0,0 +1,77 @@
+# api/routers/semantic.py
+import asyncio
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import bindparam, text
+
+from analysis.ann import Hit, get_index
+from etl.db import get_async_engine
+
+
+router = APIRouter(tags=["semantic"])
+
+
+class SemanticReq(BaseModel):
+    query: str
+    k: int = Field(10, ge=1, le=100)
+
+
+def _index_or_503():
+    idx = get_index()
+    if idx is None:
+        raise HTTPException(status_code=503, detail="Indice ANN no construido: python analysis/ann.py --build")
+    return idx
+
+
+async def _paper_key(pid: int) -> str:
+    async with get_async_engine().connect() as con:
+        row = (await con.execute(text("SELECT doi FROM paper WHERE id = :id"), {"id": pid})).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"paper {pid} no existe")
+    return (row[0] or "").strip().lower() or f"id:{pid}"
+
+
+async def _with_papers(hits: List[Hit]) -> List[Dict[str, Any]]:
+    """Completa cada resultado (clave del indice) con id/titulo/doi de paper."""
+    dois = [h.key for h in hits if not h.key.startswith("id:")]
+    ids = [int(h.key[3:]) for h in hits if h.key.startswith("id:")]
+    found: Dict[str, Any] = {}
+    async with get_async_engine().connect() as con:
+        if dois:
+            q = text("SELECT id, title, doi, published FROM paper WHERE lower(doi) IN :dois").bindparams(
+                bindparam("dois", expanding=True))
+            for r in await con.execute(q, {"dois": dois}):
+                found[r.doi.lower()] = r
+        if ids:
+            q = text("SELECT id, title, doi, published FROM paper WHERE id IN :ids").bindparams(
+                bindparam("ids", expanding=True))
+            for r in await con.execute(q, {"ids": ids}):
+                found[f"id:{r.id}"] = r
+    out = []
+    for h in hits:
+        r = found.get(h.key)
+        if r is not None:  # borrado de paper despues de indexar: se omite
+            out.append({"id": r.id, "title": r.title, "doi": r.doi, "published": r.published,
+                        "score": round(h.score, 4)})
+    return out
+
+
+# consultas a paper con el engine async; la busqueda ANN (CPU) y las lecturas del
+# almacen sqlite del indice van a un hilo para no bloquear el event loop
+@router.get("/papers/{paper_id}/similar")
+async def similar_papers(paper_id: int, k: int = Query(10, ge=1, le=100)):
+    idx = await asyncio.to_thread(_index_or_503)
+    key = await _paper_key(paper_id)
+    if await asyncio.to_thread(idx.store.row_of, key) is None:  # consulta sqlite
+        raise HTTPException(status_code=404, detail=f"paper {paper_id} aun no esta indexado")
+    hits = await asyncio.to_thread(idx.similar, key, k)
+    return {"paper_id": paper_id, "results": await _with_papers(hits)}
+
+
+@router.post("/search/semantic")
+async def semantic_search(req: SemanticReq):
+    idx = await asyncio.to_thread(_index_or_503)
+    hits = await asyncio.to_thread(idx.search_text, req.query, req.k)
+    return {"query": req.query, "results": await _with_papers(hits)}
@@ -1,15 +1,31 @@
 # etl/db.py
 from __future__ import annotations
 import os
+import threading
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 
 # etl -> repo root
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env", override=False)
 
-def get_engine() -> Engine:
+# pool por engine (uno por proceso y url): API, UI, ETL y scripts comparten conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))     # s esperando una conexion libre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # s; evita conexiones cortadas por firewalls
+# limite por sentencia en ms (0 = sin limite: el ETL hace COPY/merge largos)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# el API async solo hace consultas cortas
+API_STATEMENT_TIMEOUT_MS = int(os.getenv("API_STATEMENT_TIMEOUT_MS", "30000"))
+
+_lock = threading.Lock()
+_engines: Dict[Tuple, Any] = {}
+
+
+def database_url() -> str:
     url = os.getenv("DATABASE_URL")
     if not url:
         # fallback por variables separadas si lo prefieres
@@ -19,4 +35,94 @@ def get_engine() -> Engine:
         port = os.getenv("POSTGRES_PORT", "5432")
         db   = os.getenv("POSTGRES_DB", "postgres")
         url = f"postgresql+psycopg://{user}:{pwd}@{host}:{port}/{db}"
-    return create_engine(url, pool_pre_ping=True, future=True)
+    return url
+
+
+def _engine_args(url: str, statement_timeout_ms: int, settings: Optional[Dict[str, str]],
+                 pool: Dict[str, Any]) -> Dict[str, Any]:
+    # parametros de sesion via la opcion -c de libpq (psycopg 2 y 3) o server_settings (asyncpg)
+    opts = dict(settings or {})
+    if statement_timeout_ms:
+        opts.setdefault("statement_timeout", str(statement_timeout_ms))
+    args: Dict[str, Any] = {
+        "pool_pre_ping": True, "pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE,
+    }
+    args.update(pool)
+    u = make_url(url)
+    if opts and u.drivername.endswith("asyncpg"):
+        args["connect_args"] = {"server_settings": opts}
+    elif opts:
+        # connect_args pisa el ?options= de la url: se conservan ambos
+        extra = [f"-c{k}={v}" for k, v in sorted(opts.items())]
+        args["connect_args"] = {"options": " ".join(([u.query["options"]] if "options" in u.query else []) + extra)}
+    return args
+
+
+def _key(kind: str, url: str, timeout: int, settings: Optional[Dict[str, str]], pool: Dict[str, Any]) -> Tuple:
+    return (kind, url, timeout, tuple(sorted((settings or {}).items())), tuple(sorted(pool.items())))
+
+
+def get_engine(url: Optional[str] = None, statement_timeout_ms: Optional[int] = None,
+               settings: Optional[Dict[str, str]] = None, **pool: Any) -> Engine:
+    """Engine compartido del proceso: la misma configuracion devuelve siempre el mismo pool.
+
+    settings: parametros de sesion extra (p.ej. {"search_path": "bench,public"});
+    pool: sobreescribe pool_size, max_overflow, ... para este engine.
+    """
+    url = url or database_url()
+    timeout = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    key = _key("sync", url, timeout, settings, pool)
+    with _lock:
+        eng = _engines.get(key)
+        if eng is None:
+            eng = _engines[key] = create_engine(url, future=True, **_engine_args(url, timeout, settings, pool))
+        return eng
+
+
+def async_url(url: str) -> str:
+    """La misma base con driver async: psycopg 3 (sirve a ambos modos) salvo que ya sea asyncpg."""
+    u = make_url(url)
+    if u.drivername in ("postgresql+asyncpg", "postgresql+psycopg_async"):
+        return url
+    return u.set(drivername="postgresql+psycopg_async").render_as_string(hide_password=False)
+
+
+def get_async_engine(url: Optional[str] = None, statement_timeout_ms: Optional[int] = None,
+                     settings: Optional[Dict[str, str]] = None, **pool: Any):
+    """Variante AsyncEngine de get_engine para los endpoints async de FastAPI."""
+    from sqlalchemy.ext.asyncio import create_async_engine  # requiere greenlet
+    url = async_url(url or database_url())
+    timeout = API_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    key = _key("async", url, timeout, settings, pool)
+    with _lock:
+        eng = _engines.get(key)
+        if eng is None:
+            eng = _engines[key] = create_async_engine(url, **_engine_args(url, timeout, settings, pool))
+        return eng
+
+
+def dispose_engine(engine: Engine) -> None:
+    """Cierra el pool de `engine` y lo quita del registro (p.ej. esquemas temporales)."""
+    with _lock:
+        for k, v in list(_engines.items()):
+            if v is engine:
+                del _engines[k]
+    engine.dispose()
+
+
+def _pop(kind: str) -> list:
+    with _lock:
+        keys = [k for k in _engines if k[0] == kind]
+        return [_engines.pop(k) for k in keys]
+
+
+def dispose_engines() -> None:
+    """Cierra los pools sync del proceso (fin de un script, apagado del API)."""
+    for eng in _pop("sync"):
+        eng.dispose()
+
+
+async def dispose_async_engines() -> None:
+    for eng in _pop("async"):
+        await eng.dispose()
@@ -0,0 +1,86 @@
+# etl/db_status.py
+"""Consultas baratas para el panel de estado (ui/pages/2_DB_Status.py).
+
+Ninguna recorre paper ni staging completas salvo exact_count, que se pide a mano y
+tiene statement_timeout. Los conteos por fuente y anio salen de paper_stats, que
+mantienen los triggers de la migracion 004.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+STATUS_TABLES = ("paper", "staging_papers")
+STATUS_TTL = float(os.getenv("DB_STATUS_TTL", "60"))                  # s de cache en la UI
+EXACT_COUNT_TIMEOUT = float(os.getenv("DB_STATUS_COUNT_TIMEOUT", "120"))  # s por count(*)
+
+
+def table_estimates(engine, tables: Sequence[str] = STATUS_TABLES) -> List[Dict[str, Any]]:
+    """Filas estimadas (pg_class.reltuples), tamaño en disco y ultimo ANALYZE de cada tabla.
+
+    reltuples vale -1 si la tabla nunca se analizo; entonces se usa n_live_tup.
+    """
+    sql = text("""
+        SELECT c.reltuples, s.n_live_tup, pg_total_relation_size(c.oid) AS bytes,
+               GREATEST(s.last_analyze, s.last_autoanalyze) AS analyzed
+        FROM pg_class c LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+        WHERE c.oid = to_regclass(:t)
+    """)
+    out = []
+    with engine.connect() as con:
+        for t in tables:
+            r = con.execute(sql, {"t": t}).first()
+            if r is None:
+                out.append({"table": t, "exists": False, "estimate": None, "bytes": None, "analyzed": None})
+                continue
+            est = r.reltuples if r.reltuples is not None and r.reltuples >= 0 else r.n_live_tup
+            out.append({"table": t, "exists": True, "estimate": int(est or 0), "bytes": int(r.bytes),
+                        "analyzed": r.analyzed})
+    return out
+
+
+def exact_count(engine, table: str, timeout: float = EXACT_COUNT_TIMEOUT) -> int:
+    """count(*) exacto; falla con el error de PostgreSQL si pasa de `timeout` segundos."""
+    if not table.isidentifier():
+        raise ValueError(f"Nombre de tabla invalido: {table}")
+    with engine.begin() as con:
+        con.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+        return int(con.execute(text(f"SELECT count(*) FROM {table}")).scalar())
+
+
+def paper_breakdown(engine) -> Optional[pd.DataFrame]:
+    """(source, year, n) desde paper_stats; None si la migracion 004 no se aplico."""
+    with engine.connect() as con:
+        if con.execute(text("SELECT to_regclass('paper_stats')")).scalar() is None:
+            return None
+        return pd.read_sql(text("SELECT source, year, n FROM paper_stats WHERE n > 0 ORDER BY source, year"), con)
+
+
+def latest_papers(engine, limit: int = 5) -> pd.DataFrame:
+    """Ultimos papers por id (indice de la PK, no ordena la tabla)."""
+    insp = inspect(engine)
+    p_cols = {c["name"] for c in insp.get_columns("paper")}
+    s_cols = {c["name"] for c in insp.get_columns("source")} if insp.has_table("source") else set()
+    # fuente: columna paper.source (migracion 004) o, en esquemas con tabla source, su code/name
+    src_pk = "id" if "id" in s_cols else ("source_id" if "source_id" in s_cols else None)
+    src_disp = "code" if "code" in s_cols else ("name" if "name" in s_cols else None)
+    join_clause = ""
+    if src_pk and src_disp and "source_id" in p_cols:
+        join_clause = f"LEFT JOIN source s ON s.{src_pk} = p.source_id"
+        source_expr = f"COALESCE(s.{src_disp}, '?')"
+    elif "source" in p_cols:
+        source_expr = "COALESCE(p.source, '?')"
+    else:
+        source_expr = "NULL::text"
+    order = "p.id DESC" if "id" in p_cols else "p.doi DESC"
+    sql = f"""
+        SELECT p.title, p.doi, {source_expr} AS source, p.published, p.url
+        FROM paper p {join_clause}
+        ORDER BY {order}
+        LIMIT :n
+    """
+    with engine.connect() as con:
+        return pd.read_sql(text(sql), con, params={"n": limit})
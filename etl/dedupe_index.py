@@ -0,0 +1,127 @@
+# etl/dedupe_index.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# --------------------------------------------------------------------
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_PATH = ROOT / "data" / "dedupe_index.sqlite"
+
+Key = Tuple[str, str]  # ("doi", doi) | ("title", titulo_normalizado), ver DedupeFilter.key
+
+
+def _digest(key: Key) -> bytes:
+    # DOIs y titulos se guardan como hash de 8 bytes: indice compacto y de tamaño fijo
+    return hashlib.blake2b(f"{key[0]}:{key[1]}".encode("utf-8"), digest_size=8).digest()
+
+
+class DedupeIndex:
+    """Indice local (SQLite) de DOIs y titulos normalizados ya cargados en `paper`.
+
+    run_ingest lo consulta mientras descarga para no reenviar registros conocidos;
+    run_csv_ingest lo actualiza tras cada carga correcta.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path or os.getenv("DEDUPE_INDEX_PATH") or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen_key (h BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.conn.commit()
+
+    def __contains__(self, key: Optional[Key]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM seen_key WHERE h = ?", (_digest(key),)).fetchone() is not None
+
+    def add_many(self, keys: Iterable[Optional[Key]], batch: int = 10000) -> int:
+        """Añade las claves; devuelve cuantas eran nuevas (INSERT OR IGNORE omite las demas)."""
+        buf = []
+        with self._lock:
+            before = self.conn.total_changes
+            for k in keys:
+                if not k:
+                    continue
+                buf.append((_digest(k),))
+                if len(buf) >= batch:
+                    self.conn.executemany("INSERT OR IGNORE INTO seen_key (h) VALUES (?)", buf)
+                    buf.clear()
+            if buf:
+                self.conn.executemany("INSERT OR IGNORE INTO seen_key (h) VALUES (?)", buf)
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT count(*) FROM seen_key").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM seen_key")
+            self.conn.commit()
+
+    def seed_from_paper(self, engine, key_fn: Callable[[dict], Optional[Key]], chunk: int = 50000) -> int:
+        """Recorre `paper` (doi, title) en streaming y añade sus claves. Devuelve las nuevas."""
+        from sqlalchemy import text
+        total = 0
+        with engine.connect() as con:
+            res = con.execution_options(stream_results=True).execute(text("SELECT doi, title FROM paper"))
+            while True:
+                rows = res.fetchmany(chunk)
+                if not rows:
+                    break
+                total += self.add_many(key_fn({"doi": d, "title": t}) for d, t in rows)
+        return total
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# una conexion por archivo y proceso: run_ingest y run_etl la reutilizan entre llamadas
+_shared: Dict[Path, DedupeIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_index(path: str | Path | None = None) -> DedupeIndex:
+    """Indice compartido del proceso (DEDUPE_INDEX_PATH o `path`); no se cierra."""
+    p = Path(path or os.getenv("DEDUPE_INDEX_PATH") or DEFAULT_PATH).resolve()
+    with _shared_lock:
+        idx = _shared.get(p)
+        if idx is None:
+            idx = _shared[p] = DedupeIndex(p)
+        return idx
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Indice persistente de dedupe (DOIs / titulos ya cargados)")
+    ap.add_argument("--seed", action="store_true", help="Carga las claves de la tabla paper")
+    ap.add_argument("--rebuild", action="store_true", help="Vacia el indice antes de sembrar")
+    ap.add_argument("--path", default=None, help="Ruta del archivo SQLite")
+    args = ap.parse_args()
+
+    idx = DedupeIndex(args.path)
+    if args.rebuild:
+        idx.clear()
+    if args.seed or args.rebuild:
+        from etl.db import get_engine
+        from etl.ingest_service import DedupeFilter
+        n = idx.seed_from_paper(get_engine(), DedupeFilter.key)
+        print(f"[OK] {n} claves nuevas desde paper.")
+    print(f"[OK] {idx.count()} claves en {idx.path}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+# etl/fuzzy_dedupe.py
+from __future__ import annotations
+
+import html
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+
+# umbrales por defecto (configurables en NearDuplicateIndex / run_ingest)
+FUZZY_THRESHOLD = 92.0      # fuzz.ratio minimo entre titulos limpios
+SUBTITLE_MIN_WORDS = 4      # el titulo principal debe ser suficientemente especifico
+YEAR_TOLERANCE = 1          # años de diferencia admitidos (online first vs impreso)
+MIN_TITLE_CHARS = 12        # titulos muy cortos ("editorial") no se comparan
+MAX_CANDIDATES = 50         # tope de candidatos puntuados por fila
+
+_TAGS = re.compile(r"<[^>]+>")
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+_SUBTITLE = re.compile(r"\s*(?::|\?|\s[-–—]\s)\s*")
+_YEAR = re.compile(r"(\d{4})")
+# numeros de parte/volumen: "Part 2", "Vol. III", "part one" distinguen titulos casi iguales
+_ROMAN = {"ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x", "xi", "xii"}
+_PART_WORDS = {"part", "vol", "volume", "chapter", "book"}
+
+_PRIME = (1 << 31) - 1
+
+
+class Match(NamedTuple):
+    reason: str                 # doi | title | fuzzy_title | subtitle
+    score: float                # 0-100
+    duplicate_of: Optional[str]  # doi o titulo del registro que se conserva
+    # True: la fila nueva trae DOI y el registro conservado (duplicate_of, sin DOI) no;
+    # se conserva la fila nueva y quien llama descarta la anterior
+    supersedes: bool = False
+
+
+def _unmarkup(s: str) -> str:
+    # &amp;amp; aparece en los CSV de Crossref: se desescapa dos veces
+    return _TAGS.sub(" ", html.unescape(html.unescape(s)))
+
+
+def clean_title(s: str | None) -> str:
+    """Titulo sin HTML/entidades, acentos ni puntuacion, en minusculas."""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKD", _unmarkup(s))
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    s = _NON_WORD.sub(" ", s.replace("&", " and "))
+    return _SPACES.sub(" ", s).strip()
+
+
+def split_title(s: str | None) -> Tuple[str, bool]:
+    """(titulo principal limpio, tiene_subtitulo)."""
+    if not s:
+        return "", False
+    parts = _SUBTITLE.split(_unmarkup(s).strip(), maxsplit=1)
+    has_sub = len(parts) > 1 and bool(clean_title(parts[1]))
+    return clean_title(parts[0]), has_sub
+
+
+def number_tokens(title: str) -> frozenset:
+    """Numeros, romanos y la palabra tras part/vol/chapter/book de un titulo limpio."""
+    toks = title.split()
+    out = {t for t in toks if t.isdigit() or t in _ROMAN}
+    out.update(b for a, b in zip(toks, toks[1:]) if a in _PART_WORDS)
+    return frozenset(out)
+
+
+def _year(r: Dict[str, Any]) -> Optional[int]:
+    m = _YEAR.search(str(r.get("published") or ""))
+    return int(m.group(1)) if m else None
+
+
+class MinHashLSH:
+    """MinHash sobre shingles de caracteres + LSH por bandas (solo guarda buckets)."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, k: int = 4, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser multiplo de bands")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self.bands, self.rows, self.k = bands, num_perm // bands, k
+        self.buckets: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(bands)]
+
+    def signature(self, text: str) -> np.ndarray:
+        k = self.k
+        shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        h = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self.a[:, None] * h[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> List[int]:
+        r = self.rows
+        return [hash(sig[i * r:(i + 1) * r].tobytes()) for i in range(self.bands)]
+
+    def query(self, sig: np.ndarray) -> Set[int]:
+        out: Set[int] = set()
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            ids = band.get(key)
+            if ids:
+                out.update(ids)
+        return out
+
+    def insert(self, idx: int, sig: np.ndarray) -> None:
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            band[key].append(idx)
+
+
+class NearDuplicateIndex:
+    """Detecta casi-duplicados sin comparar todos contra todos.
+
+    Candidatos: LSH (MinHash) sobre el titulo limpio + bloque exacto por titulo
+    principal (antes de ':' / ' - '). Luego se puntua con rapidfuzz. Registros con
+    DOIs distintos, años muy separados o distintos numeros de parte/volumen
+    ("...: Part 2") nunca se consideran duplicados. Si la fila nueva trae DOI y el
+    registro conservado no, la nueva lo reemplaza (Match.supersedes).
+    """
+
+    def __init__(self, threshold: float = FUZZY_THRESHOLD, subtitle_min_words: int = SUBTITLE_MIN_WORDS,
+                 year_tolerance: Optional[int] = YEAR_TOLERANCE, min_title_chars: int = MIN_TITLE_CHARS,
+                 max_candidates: int = MAX_CANDIDATES):
+        self.threshold = threshold
+        self.subtitle_min_words = subtitle_min_words
+        self.year_tolerance = year_tolerance
+        self.min_title_chars = min_title_chars
+        self.max_candidates = max_candidates
+        self.lsh = MinHashLSH()
+        self.by_main: Dict[str, List[int]] = defaultdict(list)
+        # por registro conservado: (titulo limpio, titulo principal, tiene_subtitulo, doi, año,
+        # etiqueta, numeros de parte)
+        self.records: List[Tuple[str, str, bool, str, Optional[int], str, frozenset]] = []
+
+    def _compatible(self, doi: str, year: Optional[int], nums: frozenset, rec: Tuple) -> bool:
+        if doi and rec[3] and doi != rec[3]:
+            return False
+        if self.year_tolerance is not None and year and rec[4] and abs(year - rec[4]) > self.year_tolerance:
+            return False
+        return nums == rec[6]
+
+    def _index(self, idx: int, rec: Tuple, sig: np.ndarray) -> None:
+        self.lsh.insert(idx, sig)
+        self.by_main[rec[1]].append(idx)
+
+    def match(self, r: Dict[str, Any], add: bool = True) -> Optional[Match]:
+        """Devuelve el mejor Match >= umbral; si no hay y add=True, indexa la fila."""
+        raw = r.get("title")
+        title = clean_title(raw)
+        if len(title) < self.min_title_chars:
+            return None
+        main, has_sub = split_title(raw)
+        doi = (r.get("doi") or "").lower().strip()
+        year = _year(r)
+        nums = number_tokens(title)
+
+        sig = self.lsh.signature(title)
+        # primero el bloque por titulo principal, luego los candidatos LSH
+        cands: Dict[int, None] = {}
+        if len(main.split()) >= self.subtitle_min_words:
+            cands.update(dict.fromkeys(self.by_main.get(main, ())))
+        cands.update(dict.fromkeys(sorted(self.lsh.query(sig))))
+
+        best: Optional[Match] = None
+        best_idx = -1
+        for idx in islice(cands, self.max_candidates):
+            rec = self.records[idx]
+            if not self._compatible(doi, year, nums, rec):
+                continue
+            score, reason = fuzz.ratio(title, rec[0]), "fuzzy_title"
+            # mismo titulo principal y solo uno de los dos trae subtitulo
+            if (score < self.threshold and has_sub != rec[2] and main == rec[1]
+                    and len(main.split()) >= self.subtitle_min_words):
+                score, reason = fuzz.ratio(main, rec[1]), "subtitle"
+            if score >= self.threshold and (best is None or score > best.score):
+                best, best_idx = Match(reason, round(float(score), 1), rec[5]), idx
+        new = (title, main, has_sub, doi, year, doi or (raw or ""), nums)
+        if best is not None and doi and not self.records[best_idx][3]:
+            # se conserva la fila con DOI: ocupa el lugar del registro sin DOI en el indice
+            if add:
+                self.records[best_idx] = new
+                self._index(best_idx, new, sig)
+            return best._replace(supersedes=True)
+        if best is None and add:
+            self.records.append(new)
+            self._index(len(self.records) - 1, new, sig)
+        return best
@@ -1,20 +1,28 @@
 ﻿# etl/ingest_service.py
 from __future__ import annotations
 
-import os, csv, json, re
-from typing import Literal, Dict, Any, List, Tuple
+import os, csv, json, re, queue, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Literal, Dict, Any, List, Mapping, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env", override=False)
 
-from etl.source.sciencedirect import ScienceDirectClient, iter_search, entry_to_row
-from etl.source.crossref_source import CrossrefSource, item_to_row
+from etl.source.sciencedirect import ScienceDirectClient, SD_SEARCH_URL, iter_search, entry_to_row
+from etl.source.crossref_source import CrossrefSource, CR_BASE, item_to_row
+from etl.source.concurrency import host_limit
+from etl.fuzzy_dedupe import FUZZY_THRESHOLD, Match, NearDuplicateIndex
+from etl.dedupe_index import DedupeIndex, get_index
+from etl.records import ROW_FIELDS
+from etl.metrics import RunMetrics, submit_in_context
 
 RAW_DIR = "data/raw"
 
 SourceOpt = Literal["sciencedirect", "sage", "acm"]
+OutputFormat = Literal["csv", "parquet", "both"]
+Row = Mapping[str, Any]  # Record (item_to_row / entry_to_row) o dict equivalente
 PUBLISHER_MAP = {
     "sage": "SAGE Publications",
     "acm": "Association for Computing Machinery",
@@ -37,73 +45,319 @@ def normalize_title(s: str | None) -> str | None:
     s = re.sub(r"[^a-z0-9\s:;,\.\-\(\)\[\]{}]", "", s)
     return s
 
-def dedupe_rows(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    seen = set(); deduped=[]; removed=[]
-    for r in rows:
+class DedupeFilter:
+    """Dedupe incremental por DOI o titulo normalizado: solo guarda las claves vistas.
+
+    Con fuzzy=True ademas detecta casi-duplicados (ver etl.fuzzy_dedupe); los
+    kwargs extra (threshold, subtitle_min_words, ...) van a NearDuplicateIndex.
+    """
+
+    def __init__(self, fuzzy: bool = False, **fuzzy_opts: Any):
+        self.seen: set = set()
+        self.near = NearDuplicateIndex(**fuzzy_opts) if fuzzy else None
+
+    @staticmethod
+    def key(r: Row) -> Optional[Tuple[str, str]]:
         doi = (r.get("doi") or "").lower().strip()
         title_key = normalize_title(r.get("title")) or ""
-        key = ("doi", doi) if doi else ("title", title_key) if title_key else None
-        if key and key in seen: removed.append(r); continue
-        if key: seen.add(key)
-        deduped.append(r)
-    return deduped, removed
+        return ("doi", doi) if doi else ("title", title_key) if title_key else None
 
-def run_ingest(query: str, sources: List[SourceOpt], per_source: int = 300) -> Dict[str, Any]:
-    Path(RAW_DIR).mkdir(parents=True, exist_ok=True)
-    all_rows: List[Dict[str, Any]] = []
-    errors: List[str] = []
+    def match(self, r: Row) -> Optional[Match]:
+        """Match (motivo, score, duplicate_of) si la fila es duplicada; None si es nueva.
 
-    clean_query = _strip_quotes(query)
+        Con m.supersedes la fila es nueva y reemplaza a la conservada sin DOI (duplicate_of).
+        """
+        key = self.key(r)
+        if key and key in self.seen:
+            return Match(key[0], 100.0, key[1])
+        m = self.near.match(r) if self.near is not None else None
+        if m is not None and not m.supersedes:
+            return m
+        if key: self.seen.add(key)
+        return m
+
+    def is_duplicate(self, r: Row) -> bool:
+        m = self.match(r)
+        return m is not None and not m.supersedes
+
+def dedupe_rows(rows: Iterable[Row], fuzzy: bool = False,
+                **fuzzy_opts: Any) -> Tuple[List[Row], List[Row]]:
+    f = DedupeFilter(fuzzy, **fuzzy_opts); kept: Dict[int, Row] = {}; removed=[]
+    no_doi: Dict[str, int] = {}  # titulo -> posicion de las filas conservadas sin DOI
+    for i, r in enumerate(rows):
+        m = f.match(r)
+        if m is not None and not m.supersedes:
+            removed.append(r); continue
+        if m is not None and m.duplicate_of in no_doi:
+            removed.append(kept.pop(no_doi.pop(m.duplicate_of)))
+        kept[i] = r
+        if not (r.get("doi") or "").strip():
+            no_doi[r.get("title") or ""] = i
+    return list(kept.values()), removed
+
+RowJob = Callable[[], Iterator[Row]]
+# progress(etapa, contadores): etapa in fetch | done; contadores = pages_fetched, rows_fetched, ...
+ProgressFn = Callable[[str, Dict[str, int]], None]
+PROGRESS_EVERY = 500  # filas entre avisos de progreso
+
+def _source_jobs(query: str, sources: List[SourceOpt], per_source: int, concurrent: bool,
+                 errors: List[str], on_page: Optional[Callable[[int], None]] = None) -> List[Tuple[str, RowJob]]:
+    """Lista de (etiqueta_error, funcion_que_genera_filas) en el orden de las fuentes."""
+    jobs: List[Tuple[str, RowJob]] = []
 
     if "sciencedirect" in sources:
         if _has_elsevier_key():
-            try:
+            def sd_job() -> Iterator[Row]:
                 cli = ScienceDirectClient()
-                sd_rows = [entry_to_row(e) for e in iter_search(cli, query=clean_query, max_records=per_source)]
-                all_rows.extend(sd_rows)
-            except Exception as e:
-                errors.append(f"ScienceDirect: {type(e).__name__}: {e}")
+                prefetch = host_limit(SD_SEARCH_URL) if concurrent else 1
+                return map(entry_to_row, iter_search(cli, query=query, max_records=per_source,
+                                                     prefetch=prefetch, on_page=on_page))
+            jobs.append(("ScienceDirect", sd_job))
         else:
             errors.append("ScienceDirect omitido: ELSEVIER_API_KEY ausente/placeholder.")
 
-    cr = CrossrefSource()
-    if "sage" in sources:
+    for key, label in (("sage", "SAGE/Crossref"), ("acm", "ACM/Crossref")):
+        if key in sources:
+            def cr_job(key: str = key) -> Iterator[Row]:
+                # un cliente por fuente: la sesion HTTP no se comparte entre hilos
+                cr = CrossrefSource(prefetch=host_limit(CR_BASE) if concurrent else 1)
+                items = cr.iter_search(query=query, publisher=PUBLISHER_MAP[key], max_records=per_source,
+                                       on_page=on_page)
+                return (item_to_row(it, key) for it in items)
+            jobs.append((label, cr_job))
+
+    return jobs
+
+def _iter_serial(jobs: List[Tuple[str, RowJob]], errors: List[str]) -> Iterator[Row]:
+    for label, job in jobs:
         try:
-            items = cr.search(query=clean_query, publisher=PUBLISHER_MAP["sage"], max_records=per_source)
-            all_rows.extend([item_to_row(it, "sage") for it in items])
+            yield from job()
         except Exception as e:
-            errors.append(f"SAGE/Crossref: {type(e).__name__}: {e}")
+            errors.append(f"{label}: {type(e).__name__}: {e}")
+
+def _iter_concurrent(jobs: List[Tuple[str, RowJob]], errors: List[str],
+                     max_workers: int | None = None, buffer: int = 1000) -> Iterator[Row]:
+    """Cada fuente produce filas en su hilo hacia una cola acotada (memoria constante)."""
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    done = object()
 
-    if "acm" in sources:
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5); return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(label: str, job: RowJob) -> None:
         try:
-            items = cr.search(query=clean_query, publisher=PUBLISHER_MAP["acm"], max_records=per_source)
-            all_rows.extend([item_to_row(it, "acm") for it in items])
+            for row in job():
+                if not put(row):
+                    return
         except Exception as e:
-            errors.append(f"ACM/Crossref: {type(e).__name__}: {e}")
+            errors.append(f"{label}: {type(e).__name__}: {e}")
+        finally:
+            put(done)
 
-    deduped, removed = dedupe_rows(all_rows)
+    with ThreadPoolExecutor(max_workers=max_workers or len(jobs), thread_name_prefix="source") as pool:
+        for label, job in jobs:
+            submit_in_context(pool, worker, label, job)  # las peticiones cuentan en la corrida
+        try:
+            remaining = len(jobs)
+            while remaining:
+                item = q.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()  # si el consumidor se detiene, los productores no quedan bloqueados
 
-    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_csv = str(Path(RAW_DIR) / f"combined_{stamp}.csv")
-    log_json = str(Path(RAW_DIR) / f"dedupe_removed_{stamp}.json")
+def _timed_rows(rows: Iterator[Row], acc: List[float]) -> Iterator[Row]:
+    """Suma en acc[0] el tiempo que el consumidor espera cada fila (descarga + mapeo)."""
+    it = iter(rows)
+    while True:
+        t0 = time.perf_counter()
+        r = next(it, None)
+        acc[0] += time.perf_counter() - t0
+        if r is None:
+            return
+        yield r
+
+class _JsonlWriter:
+    """Log de eliminados en JSON Lines: un objeto por linea, se puede leer en streaming."""
+
+    def __init__(self, f):
+        self.f = f; self.count = 0
+
+    def write(self, obj: Dict[str, Any]) -> None:
+        self.f.write(json.dumps(obj, ensure_ascii=False))
+        self.f.write("\n")
+        self.count += 1
+
+def run_ingest(query: str, sources: List[SourceOpt], per_source: int = 300,
+               concurrent: bool = False, max_workers: int | None = None,
+               fuzzy_dedupe: bool = False, fuzzy_threshold: float = FUZZY_THRESHOLD,
+               skip_known: bool = True, dedupe_index: DedupeIndex | None = None,
+               progress: ProgressFn | None = None,
+               output_format: OutputFormat = "csv") -> Dict[str, Any]:
+    """Descarga, deduplica y guarda el CSV combinado.
 
-    if deduped:
-        with open(out_csv, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=list(deduped[0].keys()))
-            w.writeheader(); w.writerows(deduped)
+    Todo el flujo es en streaming: las paginas se mapean a filas, se filtran con
+    DedupeFilter y se escriben al CSV a medida que llegan, asi que la memoria no
+    crece con per_source (solo el conjunto de claves de dedupe).
+
+    Con concurrent=True cada fuente corre en su propio hilo y las paginas de cada fuente
+    se piden por adelantado hasta el limite por host (ver etl.source.concurrency).
+
+    Con fuzzy_dedupe=True tambien se eliminan casi-duplicados (titulo con otra
+    puntuacion, entidades HTML, subtitulo o sin DOI). Cada fila del log de
+    eliminados lleva dedupe_reason, dedupe_score y duplicate_of. Entre dos casi-duplicados
+    se conserva el que trae DOI, por eso las filas sin DOI se escriben al final.
+
+    Con skip_known=True se descartan (sin registrarlas) las filas cuyo DOI o titulo
+    ya esta en el indice persistente (etl.dedupe_index), es decir, ya cargadas en paper.
+
+    output_format: "csv" (por defecto, lo consume run_csv_ingest), "parquet" o "both".
+    El Parquet va al dataset particionado de etl.parquet_store (requiere pyarrow).
+    El log de eliminados es JSON Lines (dedupe_removed_<stamp>.jsonl).
+
+    progress (opcional) recibe ("fetch", contadores) por cada pagina descargada y cada
+    PROGRESS_EVERY filas, y ("done", contadores) al terminar (ver api/jobs.py).
+
+    El resultado incluye "metrics" (etl.metrics.RunMetrics): segundos por etapa (fetch,
+    dedupe, write, total) y, por host, peticiones, reintentos, bytes y latencias.
+    Con concurrent=True fetch es solo lo que el consumidor espero por filas.
+    """
+    run = RunMetrics("ingest")
+    Path(RAW_DIR).mkdir(parents=True, exist_ok=True)
+    errors: List[str] = []
+
+    clean_query = _strip_quotes(query)
+
+    counts = {"pages_fetched": 0, "rows_fetched": 0, "rows_kept": 0, "rows_removed": 0, "already_in_db": 0}
+    counts_lock = threading.Lock()
+
+    def report(stage: str) -> None:
+        if progress is not None:
+            with counts_lock:
+                snap = dict(counts)
+            progress(stage, snap)
+
+    def on_page(n: int) -> None:
+        # se llama desde los hilos de las fuentes
+        with counts_lock:
+            counts["pages_fetched"] += 1
+        report("fetch")
+
+    jobs = _source_jobs(clean_query, sources, per_source, concurrent, errors,
+                        on_page=on_page if progress is not None else None)
+    if concurrent and len(jobs) > 1:
+        rows = _iter_concurrent(jobs, errors, max_workers=max_workers)
     else:
+        rows = _iter_serial(jobs, errors)
+
+    # sufijo aleatorio: dos jobs en el mismo segundo no comparten CSV, log ni Parquet
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+    out_csv = str(Path(RAW_DIR) / f"combined_{stamp}.csv")
+    log_json = str(Path(RAW_DIR) / f"dedupe_removed_{stamp}.jsonl")
+    if output_format not in ("csv", "parquet", "both"):
+        raise ValueError(f"output_format invalido: {output_format}")
+    write_csv = output_format in ("csv", "both")
+    pq_writer = None
+    if output_format in ("parquet", "both"):
+        from etl.parquet_store import ParquetRowWriter  # pyarrow es opcional
+        pq_writer = ParquetRowWriter(stamp)
+
+    dedupe = DedupeFilter(fuzzy_dedupe, threshold=fuzzy_threshold) if fuzzy_dedupe else DedupeFilter()
+    known = (dedupe_index or get_index()) if skip_known else None
+    # con fuzzy, las filas sin DOI se retienen hasta el final: una fila posterior con DOI
+    # del mismo trabajo las reemplaza (Match.supersedes). Son pocas: Crossref siempre trae DOI
+    held: Dict[str, Row] = {}
+    total_raw = kept = already_known = 0
+    csv_f = w = None
+    out_parquet = ""
+    fetch_s, write_s = [0.0], 0.0
+    t_loop = time.perf_counter()
+
+    def emit(r: Row) -> None:
+        nonlocal csv_f, w, kept, write_s
+        t0 = time.perf_counter()
+        if write_csv and csv_f is None:  # el CSV solo se crea si hay al menos una fila
+            csv_f = open(out_csv, "w", newline="", encoding="utf-8")
+            w = csv.DictWriter(csv_f, fieldnames=ROW_FIELDS)
+            w.writeheader()
+        if write_csv:
+            w.writerow(r)
+        if pq_writer is not None:
+            pq_writer.write(r)
+        kept += 1
+        write_s += time.perf_counter() - t0
+
+    with run.active(), open(log_json, "w", encoding="utf-8") as lf:
+        removed = _JsonlWriter(lf)
+        try:
+            for r in _timed_rows(rows, fetch_s):
+                total_raw += 1
+                if progress is not None and total_raw % PROGRESS_EVERY == 0:
+                    with counts_lock:
+                        counts.update(rows_fetched=total_raw, rows_kept=kept,
+                                      rows_removed=removed.count, already_in_db=already_known)
+                    report("fetch")
+                if known is not None and DedupeFilter.key(r) in known:
+                    already_known += 1; continue
+                m = dedupe.match(r)
+                if m is not None and not m.supersedes:
+                    removed.write(dict(r, dedupe_reason=m.reason, dedupe_score=m.score,
+                                       duplicate_of=m.duplicate_of))
+                    continue
+                if m is not None:
+                    old = held.pop(m.duplicate_of, None)
+                    if old is not None:
+                        removed.write(dict(old, dedupe_reason=m.reason, dedupe_score=m.score,
+                                           duplicate_of=(r.get("doi") or "").lower().strip()))
+                if fuzzy_dedupe and not (r.get("doi") or "").strip():
+                    held[r.get("title") or ""] = r
+                else:
+                    emit(r)
+            for r in held.values():
+                emit(r)
+            held.clear()
+            if pq_writer is not None:
+                t0 = time.perf_counter()
+                out_parquet = pq_writer.close(); pq_writer = None
+                write_s += time.perf_counter() - t0
+        finally:
+            if csv_f is not None:
+                csv_f.close()
+            if pq_writer is not None:  # error a mitad de camino: no se publica el Parquet
+                pq_writer.abort()
+
+    if not kept or not write_csv:
         out_csv = ""  # <- NO hay CSV
 
-    with open(log_json, "w", encoding="utf-8") as f:
-        json.dump(removed, f, ensure_ascii=False, indent=2)
+    # dedupe = lo que queda del bucle (indice persistente, DedupeFilter y log de eliminados)
+    run.add("fetch", fetch_s[0])
+    run.add("dedupe", time.perf_counter() - t_loop - fetch_s[0] - write_s)
+    run.add("write", write_s)
+
+    with counts_lock:
+        counts.update(rows_fetched=total_raw, rows_kept=kept,
+                      rows_removed=removed.count, already_in_db=already_known)
+    report("done")
 
     return {
         "query": query,
         "sources": sources,
-        "total_raw": len(all_rows),
-        "total_after_dedupe": len(deduped),
-        "duplicates_removed": len(removed),
+        "total_raw": total_raw,
+        "total_after_dedupe": kept,
+        "duplicates_removed": removed.count,
+        "already_in_db": already_known,
         "out_csv": out_csv,
+        "out_parquet": out_parquet,
         "log_json": log_json,
         "errors": errors,
+        "metrics": run.finish(rows={"fetched": total_raw, "kept": kept, "removed": removed.count,
+                                    "already_in_db": already_known}),
     }
@@ -0,0 +1,292 @@
+# etl/metrics.py
+"""Instrumentacion de la ingesta y el ETL: tiempos por etapa, HTTP por host y reintentos.
+
+Dos niveles:
+- REGISTRY: contadores e histogramas del proceso, en formato Prometheus (GET /metrics).
+- RunMetrics: las cifras de una corrida (run_ingest / run_etl), que van en su dict de
+  resultado. Mientras una corrida esta activa (run.active()) las peticiones HTTP de
+  cualquier hilo lanzado con submit_in_context() tambien se anotan en ella.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+# si se define, cada corrida vuelca el registro a este archivo (textfile collector de
+# node_exporter): sirve para corridas por CLI/cron, que no pasan por el API
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+
+Labels = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiquetas {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: Labels, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def get(self, **labels: Any) -> Any:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, v in items:
+            out += self._samples(key, v)
+        return out
+
+    def _samples(self, key: Labels, v: Any) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_fmt(v)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    h["counts"][i] += 1
+                    break
+            h["sum"] += value
+            h["count"] += 1
+
+    def _samples(self, key: Labels, h: Any) -> List[str]:
+        out, acc = [], 0
+        for b, c in zip(self.buckets, h["counts"]):  # los buckets de Prometheus son acumulados
+            acc += c
+            le = 'le="%s"' % _fmt(b)
+            out.append(f"{self.name}_bucket{self._labels(key, le)} {acc}")
+        inf = 'le="+Inf"'
+        out.append(f"{self.name}_bucket{self._labels(key, inf)} {h['count']}")
+        out.append(f"{self.name}_sum{self._labels(key)} {_fmt(h['sum'])}")
+        out.append(f"{self.name}_count{self._labels(key)} {h['count']}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, m: _Metric) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(m.name, m)
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.counter("bib_http_requests_total", "Peticiones HTTP a las APIs por host y estado",
+                                 ("host", "status"))
+HTTP_LATENCY = REGISTRY.histogram("bib_http_request_seconds", "Latencia de cada peticion HTTP", ("host",))
+HTTP_BYTES = REGISTRY.counter("bib_http_response_bytes_total", "Bytes recibidos por host", ("host",))
+HTTP_RETRIES = REGISTRY.counter("bib_http_retries_total", "Reintentos por host y motivo", ("host", "reason"))
+HTTP_WAIT = REGISTRY.counter("bib_http_wait_seconds_total",
+                             "Tiempo esperando rate limit, cupo del host o backoff", ("host",))
+STAGE_SECONDS = REGISTRY.histogram("bib_stage_seconds", "Tiempo de pared por etapa de cada corrida",
+                                   ("pipeline", "stage"), STAGE_BUCKETS)
+ROWS = REGISTRY.counter("bib_rows_total", "Filas procesadas por etapa", ("pipeline", "stage"))
+RUNS = REGISTRY.counter("bib_runs_total", "Corridas terminadas", ("pipeline",))
+LAST_RUN = REGISTRY.gauge("bib_last_run_timestamp_seconds", "Fin de la ultima corrida (epoch)", ("pipeline",))
+LOAD_ROWS_PER_SEC = REGISTRY.gauge("bib_load_rows_per_second", "Filas/s de la ultima carga a staging")
+
+
+# --------- cifras de una corrida ----------
+_current: contextvars.ContextVar[Optional["RunMetrics"]] = contextvars.ContextVar("run_metrics", default=None)
+
+
+def current_run() -> Optional["RunMetrics"]:
+    return _current.get()
+
+
+def submit_in_context(pool, fn, *args: Any):
+    """pool.submit que conserva la corrida activa en el hilo del pool."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+class RunMetrics:
+    """Tiempos por etapa y resumen HTTP por host de una corrida (thread-safe)."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.stages: Dict[str, float] = {}
+        self.http: Dict[str, Dict[str, float]] = {}
+        self._latency: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def active(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def _host(self, host: str) -> Dict[str, float]:
+        h = self.http.get(host)
+        if h is None:
+            h = self.http[host] = {"requests": 0, "errors": 0, "retries": 0, "bytes": 0,
+                                   "seconds": 0.0, "wait_seconds": 0.0}
+            self._latency[host] = []
+        return h
+
+    def record_http(self, host: str, status: str, seconds: float, nbytes: int, wait: float) -> None:
+        with self._lock:
+            h = self._host(host)
+            h["requests"] += 1
+            h["errors"] += not status.startswith(("2", "3"))
+            h["bytes"] += nbytes
+            h["seconds"] += seconds
+            h["wait_seconds"] += wait
+            self._latency[host].append(seconds)
+
+    def record_retry(self, host: str, wait: float) -> None:
+        with self._lock:
+            h = self._host(host)
+            h["retries"] += 1
+            h["wait_seconds"] += wait
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            http = {}
+            for host, h in self.http.items():
+                lat = sorted(self._latency[host])
+                q = statistics.quantiles(lat, n=20, method="inclusive") if len(lat) > 1 else lat * 19
+                http[host] = dict(h, seconds=round(h["seconds"], 4), wait_seconds=round(h["wait_seconds"], 4),
+                                  latency_p50=round(q[9], 4) if q else None,
+                                  latency_p95=round(q[18], 4) if q else None,
+                                  latency_max=round(lat[-1], 4) if lat else None)
+            return {"stages": {k: round(v, 4) for k, v in self.stages.items()}, "http": http}
+
+    def finish(self, rows: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Cierra la corrida: agrega `total`, publica en REGISTRY y devuelve el resumen."""
+        self.add("total", time.perf_counter() - self._t0)
+        for stage, secs in self.stages.items():
+            STAGE_SECONDS.observe(secs, pipeline=self.pipeline, stage=stage)
+        for stage, n in (rows or {}).items():
+            ROWS.inc(n, pipeline=self.pipeline, stage=stage)
+        RUNS.inc(pipeline=self.pipeline)
+        LAST_RUN.set(time.time(), pipeline=self.pipeline)
+        if METRICS_TEXTFILE:
+            write_textfile(METRICS_TEXTFILE)
+        out = self.summary()
+        out["rows"] = dict(rows or {})
+        return out
+
+
+# --------- ganchos para etl.source.ratelimit ----------
+def observe_http(host: str, status: Any, seconds: float, nbytes: int = 0, wait: float = 0.0) -> None:
+    status = str(status)
+    HTTP_REQUESTS.inc(host=host, status=status)
+    HTTP_LATENCY.observe(seconds, host=host)
+    if nbytes:
+        HTTP_BYTES.inc(nbytes, host=host)
+    if wait:
+        HTTP_WAIT.inc(wait, host=host)
+    run = _current.get()
+    if run is not None:
+        run.record_http(host, status, seconds, nbytes, wait)
+
+
+def observe_retry(host: str, reason: Any, wait: float) -> None:
+    HTTP_RETRIES.inc(host=host, reason=str(reason))
+    HTTP_WAIT.inc(wait, host=host)
+    run = _current.get()
+    if run is not None:
+        run.record_retry(host, wait)
+
+
+def write_textfile(path: str | Path) -> None:
+    """Vuelca REGISTRY de forma atomica (el collector nunca lee un archivo a medias)."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    tmp.write_text(REGISTRY.render(), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,178 @@
+# etl/migrations.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# --------------------------------------------------------------------
+
+import argparse
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# expresion canonica del titulo normalizado (la misma que usaba upsert_into_paper)
+TITLE_NORM_SQL = r"lower(regexp_replace({col}, '\s+', ' ', 'g'))"
+
+
+class Migration(NamedTuple):
+    name: str
+    requires: List[str]                 # tablas que deben existir; si no, se pospone
+    apply: Callable[[Connection], None]
+
+
+def _try(conn: Connection, sql: str) -> bool:
+    """Ejecuta `sql` en un savepoint; False si falla (p.ej. extension no instalada)."""
+    try:
+        with conn.begin_nested():
+            conn.execute(text(sql))
+        return True
+    except Exception as e:
+        print(f"[WARN] {sql.strip().splitlines()[0]} -> {type(e).__name__}: {e}".splitlines()[0])
+        return False
+
+
+def _paper_title_norm(conn: Connection) -> None:
+    # columna generada: PostgreSQL la calcula (y rellena las filas existentes) al añadirla
+    conn.execute(text(f"""
+        ALTER TABLE paper ADD COLUMN IF NOT EXISTS title_norm TEXT
+        GENERATED ALWAYS AS ({TITLE_NORM_SQL.format(col="title")}) STORED
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS paper_title_norm_idx ON paper (title_norm)"))
+    # opcional: similitud con pg_trgm (el README pide instalar la extension)
+    if _try(conn, "CREATE EXTENSION IF NOT EXISTS pg_trgm"):
+        _try(conn, "CREATE INDEX IF NOT EXISTS paper_title_norm_trgm_idx ON paper USING gin (title_norm gin_trgm_ops)")
+
+
+def _staging_batches(conn: Connection) -> None:
+    # cada carga se etiqueta con batch_id; loaded_at permite purgar lotes viejos
+    conn.execute(text("ALTER TABLE staging_papers ADD COLUMN IF NOT EXISTS batch_id TEXT"))
+    conn.execute(text("ALTER TABLE staging_papers ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS staging_papers_batch_idx ON staging_papers (batch_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS staging_papers_loaded_at_idx ON staging_papers (loaded_at)"))
+
+
+def _paper_abstract(conn: Connection) -> None:
+    # el esquema minimo no guarda el resumen; upsert_into_paper lo copia si la columna existe
+    conn.execute(text("ALTER TABLE paper ADD COLUMN IF NOT EXISTS abstract TEXT"))
+
+
+# anio = primer grupo de 4 digitos de published (como analysis.sorting.sort_key); 0 = sin anio
+PAPER_YEAR_SQL = r"COALESCE(CAST(substring({col} from '\d{{4}}') AS INT), 0)"
+
+def _stats_delta(rows: str, sign: str = "") -> str:
+    """Suma (o resta) a paper_stats los conteos por (fuente, anio) de `rows`."""
+    return f"""
+        INSERT INTO paper_stats (source, year, n)
+        SELECT COALESCE(source, ''), {PAPER_YEAR_SQL.format(col="published")}, {sign}count(*)
+        FROM {rows} GROUP BY 1, 2
+        ON CONFLICT (source, year) DO UPDATE SET n = paper_stats.n + EXCLUDED.n;
+    """
+
+
+def _paper_stats(conn: Connection) -> None:
+    # agregado (fuente, anio) -> n mantenido por triggers de sentencia con tablas de
+    # transicion: una agregacion por INSERT/UPDATE/DELETE, no por fila. El panel de
+    # estado lo lee en vez de recorrer paper.
+    conn.execute(text("ALTER TABLE paper ADD COLUMN IF NOT EXISTS source TEXT"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS paper_stats (
+            source TEXT NOT NULL,
+            year INT NOT NULL,
+            n BIGINT NOT NULL,
+            PRIMARY KEY (source, year)
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION paper_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM paper_stats;
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                {_stats_delta("old_rows", "-")}
+                DELETE FROM paper_stats WHERE n = 0;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                {_stats_delta("new_rows")}
+            END IF;
+            RETURN NULL;
+        END $$
+    """))
+    # sin escrituras concurrentes entre el backfill y la creacion de los triggers
+    conn.execute(text("LOCK TABLE paper IN SHARE ROW EXCLUSIVE MODE"))
+    for name, event, refs in (
+        ("paper_stats_ins", "INSERT", "NEW TABLE AS new_rows"),
+        ("paper_stats_upd", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("paper_stats_del", "DELETE", "OLD TABLE AS old_rows"),
+    ):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name} ON paper"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {name} AFTER {event} ON paper REFERENCING {refs}
+            FOR EACH STATEMENT EXECUTE FUNCTION paper_stats_apply()
+        """))
+    conn.execute(text("DROP TRIGGER IF EXISTS paper_stats_trunc ON paper"))
+    conn.execute(text("""
+        CREATE TRIGGER paper_stats_trunc AFTER TRUNCATE ON paper
+        FOR EACH STATEMENT EXECUTE FUNCTION paper_stats_apply()
+    """))
+    conn.execute(text("DELETE FROM paper_stats"))
+    conn.execute(text(_stats_delta("paper")))
+
+
+def _paper_doi_lower(conn: Connection) -> None:
+    # las claves del indice ANN son lower(doi): sin este indice, la busqueda semantica
+    # completa sus resultados recorriendo paper
+    conn.execute(text("CREATE INDEX IF NOT EXISTS paper_doi_lower_idx ON paper (lower(doi))"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration("001_paper_title_norm", ["paper"], _paper_title_norm),
+    Migration("002_staging_batches", ["staging_papers"], _staging_batches),
+    Migration("003_paper_abstract", ["paper"], _paper_abstract),
+    Migration("004_paper_stats", ["paper"], _paper_stats),
+    Migration("005_paper_doi_lower", ["paper"], _paper_doi_lower),
+]
+
+
+def migrate(engine, only: Optional[List[str]] = None) -> List[str]:
+    """Aplica las migraciones pendientes (idempotente). Devuelve las aplicadas."""
+    applied: List[str] = []
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        done = {r[0] for r in conn.execute(text("SELECT name FROM schema_migrations"))}
+    for m in MIGRATIONS:
+        if m.name in done or (only and m.name not in only):
+            continue
+        insp = inspect(engine)
+        if not all(insp.has_table(t) for t in m.requires):
+            continue  # se aplicara cuando existan las tablas
+        with engine.begin() as conn:
+            m.apply(conn)
+            # ON CONFLICT: otro proceso pudo aplicarla en paralelo (las migraciones son idempotentes)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:n) ON CONFLICT (name) DO NOTHING"),
+                         {"n": m.name})
+        applied.append(m.name)
+    return applied
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Aplica migraciones de esquema pendientes")
+    ap.add_argument("--only", nargs="*", help="Nombres de migracion a aplicar")
+    args = ap.parse_args()
+    from etl.db import get_engine
+    applied = migrate(get_engine(), args.only)
+    print(f"[OK] Migraciones aplicadas: {applied or 'ninguna pendiente'}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+# etl/parquet_store.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# --------------------------------------------------------------------
+
+import argparse
+import csv
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from etl.ingest_service import RAW_DIR, ROW_FIELDS
+
+# data/parquet/papers/run_date=YYYY-MM-DD/combined_<stamp>.parquet (particionado estilo hive)
+PARQUET_DIR = ROOT / "data" / "parquet" / "papers"
+COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+BATCH_ROWS = 10000  # filas por row group
+
+# esquema fijo para todas las corridas: todo texto (published llega como año o fecha
+# segun la fuente, openaccess como bool o texto) + run_id para saber de que corrida viene
+SCHEMA = pa.schema([(f, pa.string()) for f in ROW_FIELDS] + [("run_id", pa.string())])
+
+# stamp = YYYYMMDD_HHMMSS[_<hex>]: el sufijo (corridas nuevas) evita choques entre jobs del mismo segundo
+_STAMP = re.compile(r"combined_(\d{8}_\d{6}(?:_[0-9a-f]+)?)\.")
+
+
+def _cell(v: Any) -> Optional[str]:
+    return None if v is None or v == "" else str(v)
+
+
+def partition_dir(stamp: str, root: str | Path = PARQUET_DIR) -> Path:
+    run_date = datetime.strptime(stamp[:8], "%Y%m%d").strftime("%Y-%m-%d")
+    return Path(root) / f"run_date={run_date}"
+
+
+class ParquetRowWriter:
+    """Escribe filas (dict) a un Parquet comprimido en row groups de BATCH_ROWS.
+
+    Se escribe en un archivo temporal con prefijo '_' (el dataset lo ignora) y se
+    renombra al cerrar, asi los lectores nunca ven un archivo a medias.
+    """
+
+    def __init__(self, stamp: str, root: str | Path = PARQUET_DIR,
+                 batch_rows: int = BATCH_ROWS, compression: str = COMPRESSION):
+        d = partition_dir(stamp, root)
+        d.mkdir(parents=True, exist_ok=True)
+        self.path = d / f"combined_{stamp}.parquet"
+        self._tmp = d / f"_combined_{stamp}.parquet.tmp"
+        self.run_id = stamp
+        self.batch_rows = batch_rows
+        self.count = 0
+        self._cols: Dict[str, List[Optional[str]]] = {f: [] for f in ROW_FIELDS}
+        self._writer = pq.ParquetWriter(str(self._tmp), SCHEMA, compression=compression)
+
+    def write(self, r: Dict[str, Any]) -> None:
+        for f, col in self._cols.items():
+            col.append(_cell(r.get(f)))
+        self.count += 1
+        if len(self._cols[ROW_FIELDS[0]]) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        n = len(self._cols[ROW_FIELDS[0]])
+        if not n:
+            return
+        arrays = [pa.array(self._cols[f], pa.string()) for f in ROW_FIELDS]
+        arrays.append(pa.array([self.run_id] * n, pa.string()))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=SCHEMA))
+        for col in self._cols.values():
+            col.clear()
+
+    def close(self) -> str:
+        """Cierra y publica el archivo; devuelve su ruta ("" si no se escribio ninguna fila)."""
+        self._flush()
+        self._writer.close()
+        if not self.count:
+            self._tmp.unlink(missing_ok=True)
+            return ""
+        os.replace(self._tmp, self.path)
+        return str(self.path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def open_dataset(root: str | Path = PARQUET_DIR) -> ds.Dataset:
+    """Todas las corridas como un solo dataset (columna de particion run_date), con mmap."""
+    return ds.dataset(str(root), schema=SCHEMA.append(pa.field("run_date", pa.string())),
+                      format="parquet", partitioning="hive",
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def csv_to_parquet(csv_path: str | Path, root: str | Path = PARQUET_DIR) -> str:
+    """Convierte un combined_<stamp>.csv historico al dataset (idempotente)."""
+    m = _STAMP.search(Path(csv_path).name)
+    if not m:
+        raise ValueError(f"Nombre inesperado (se espera combined_YYYYMMDD_HHMMSS[_xxxx].csv): {csv_path}")
+    stamp = m.group(1)
+    target = partition_dir(stamp, root) / f"combined_{stamp}.parquet"
+    if target.exists():
+        return str(target)
+    w = ParquetRowWriter(stamp, root)
+    try:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                w.write(r)
+    except Exception:
+        w.abort()
+        raise
+    return w.close()
+
+
+def backfill(paths: Iterable[str | Path], root: str | Path = PARQUET_DIR) -> List[str]:
+    return [p for p in (csv_to_parquet(c, root) for c in paths) if p]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Dataset Parquet de corridas de ingesta")
+    ap.add_argument("--backfill", action="store_true", help=f"Convierte {RAW_DIR}/combined_*.csv al dataset")
+    ap.add_argument("--root", default=str(PARQUET_DIR), help="Directorio del dataset")
+    args = ap.parse_args()
+
+    if args.backfill:
+        done = backfill(sorted((ROOT / RAW_DIR).glob("combined_*.csv")), args.root)
+        print(f"[OK] {len(done)} corridas en Parquet.")
+    if not Path(args.root).exists():
+        print(f"[INFO] No hay dataset en {args.root}")
+        return
+    dset = open_dataset(args.root)
+    print(f"[OK] {len(dset.files)} archivos, {dset.count_rows()} filas en {args.root}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
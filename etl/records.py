@@ -0,0 +1,58 @@
+# etl/records.py
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+# columnas del CSV combinado (mismo orden que item_to_row / entry_to_row)
+ROW_FIELDS = ["source", "title", "doi", "pii", "authors", "container_title",
+              "published", "openaccess", "url", "abstract"]
+
+
+class Record(Mapping):
+    """Registro de articulo con __slots__ (sin dict por instancia).
+
+    Es un Mapping de solo lectura sobre ROW_FIELDS, asi que funciona donde antes
+    se usaba el dict de item_to_row: r.get("doi"), r["title"], dict(r, extra=...),
+    csv.DictWriter.writerow(r) o pd.DataFrame(rows).
+    """
+
+    __slots__ = tuple(ROW_FIELDS)
+
+    def __init__(self, source: Optional[str] = None, title: Optional[str] = None, doi: Optional[str] = None,
+                 pii: Optional[str] = None, authors: Optional[str] = None, container_title: Optional[str] = None,
+                 published: Optional[str] = None, openaccess: Any = None, url: Optional[str] = None,
+                 abstract: Optional[str] = None):
+        # source y la revista se repiten entre filas: una sola copia de cada string
+        self.source = sys.intern(source) if source else source
+        self.title = title
+        self.doi = doi
+        self.pii = pii
+        self.authors = authors
+        self.container_title = sys.intern(container_title) if isinstance(container_title, str) else container_title
+        self.published = published
+        self.openaccess = openaccess
+        self.url = url
+        self.abstract = abstract
+
+    @classmethod
+    def from_mapping(cls, d: Mapping) -> "Record":
+        return cls(**{f: d.get(f) for f in ROW_FIELDS})
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ROW_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ROW_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f: getattr(self, f) for f in ROW_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"Record(source={self.source!r}, doi={self.doi!r}, title={self.title!r})"
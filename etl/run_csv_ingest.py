@@ -10,14 +10,139 @@ if str(ROOT) not in sys.path:
 # --------------------------------------------------------------------
 
 import argparse
+import csv
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
 import pandas as pd
 from sqlalchemy import text, inspect
 from etl.db import get_engine  # requiere etl/db.py existente
+from etl.dedupe_index import DedupeIndex, get_index
+from etl.ingest_service import DedupeFilter
+from etl.metrics import LOAD_ROWS_PER_SEC, RunMetrics
+from etl.migrations import TITLE_NORM_SQL, migrate
+
+CSV_COLS = ["title","doi","pii","authors","container_title","published","source","url","abstract"]
+DEFAULT_RETENTION_DAYS = float(os.getenv("STAGING_RETENTION_DAYS", "7"))
+# mantener al dia el indice ANN (si existe) tras cada carga, en segundo plano
+ANN_UPDATE_ON_LOAD = os.getenv("ANN_UPDATE_ON_LOAD", "1") != "0"
+# idem para las redes de coautoria / palabras clave (analysis/networks.py)
+NETWORK_UPDATE_ON_LOAD = os.getenv("NETWORK_UPDATE_ON_LOAD", "1") != "0"
+# merges en paper como sentencias preparadas en el servidor (psycopg 3); "0" si hay un
+# pgbouncer en modo transaction, que no conserva sentencias preparadas entre conexiones
+PREPARE_MERGE = os.getenv("DB_PREPARE_MERGE", "1") != "0"
+# candado de transaccion que serializa los merges en paper: asi los ids se confirman en
+# orden y las actualizaciones incrementales (ANN, redes) pueden usar max(paper.id) como marca
+PAPER_MERGE_LOCK = 0x62696221
+
+# entrada del ETL: ruta a un CSV combinado o filas ya en memoria (Record de item_to_row o dicts)
+EtlInput = Union[str, Path, Sequence[Mapping[str, Any]]]
+
+def _is_path(data: EtlInput) -> bool:
+    return isinstance(data, (str, Path))
+
+def _header(data: EtlInput) -> List[str]:
+    if _is_path(data):
+        with open(data, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), [])
+    return list(data[0].keys()) if data else []
+
+def _iter_rows(data: EtlInput) -> Iterator[dict]:
+    if _is_path(data):
+        with open(data, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        yield from data
+
+def new_batch_id() -> str:
+    return f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+
+def ensure_staging_table(engine, header: List[str], table="staging_papers") -> None:
+    """Crea staging (columnas TEXT del CSV + batch_id/loaded_at) si todavia no existe."""
+    if inspect(engine).has_table(table):
+        return
+    cols = [c for c in header if c.isidentifier() and c not in ("batch_id", "loaded_at")] or CSV_COLS
+    defs = [f"{c} TEXT" for c in cols] + ["batch_id TEXT", "loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()"]
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(defs)})"))
 
 def ensure_staging(engine, df: pd.DataFrame, table="staging_papers"):
     df.to_sql(table, engine, if_exists="append", index=False, method="multi", chunksize=1000)
     return table
 
+# --------- carga masiva con COPY FROM STDIN ----------
+def _staging_columns(engine, table: str, header: List[str], existing: set | None = None) -> List[str]:
+    """Columnas a copiar: las del CSV que existen en la tabla."""
+    if existing is None:
+        existing = {c["name"] for c in inspect(engine).get_columns(table)}
+    return [c for c in header if c in existing and c != "batch_id"]
+
+def _csv_chunks(rows: Iterable[dict], cols: List[str], chunk_rows: int, counter: List[int],
+                extra: List[str] | None = None) -> Iterator[str]:
+    """Convierte filas en bloques de texto CSV con solo `cols` (+ valores fijos `extra`)."""
+    extra = extra or []
+    buf = io.StringIO(); w = csv.writer(buf); n = 0
+    for row in rows:
+        w.writerow([row.get(c) or None for c in cols] + extra)
+        n += 1; counter[0] += 1
+        if n >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0); buf.truncate(); n = 0
+    if n:
+        yield buf.getvalue()
+
+class _ChunkReader:
+    """Adaptador file-like para copy_expert de psycopg2."""
+    def __init__(self, chunks: Iterator[str]):
+        self.chunks = chunks; self.buf = ""
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.buf) < size:
+            nxt = next(self.chunks, None)
+            if nxt is None:
+                break
+            self.buf += nxt
+        if size < 0:
+            out, self.buf = self.buf, ""
+        else:
+            out, self.buf = self.buf[:size], self.buf[size:]
+        return out
+    readline = read
+
+def copy_into_staging(engine, data: EtlInput, table="staging_papers", chunk_rows: int = 50000,
+                      batch_id: str | None = None, staging_cols: set | None = None) -> int:
+    """Carga el CSV (o las filas) en `table` con COPY ... FROM STDIN, en streaming (sin DataFrame)."""
+    header = _header(data)
+    cols = _staging_columns(engine, table, header, staging_cols)
+    if not cols:
+        raise ValueError(f"El CSV no comparte columnas con {table}")
+    extra = [batch_id] if batch_id else []
+    sql = f"COPY {table} ({', '.join(cols + (['batch_id'] if batch_id else []))}) FROM STDIN WITH (FORMAT csv)"
+
+    counter = [0]
+    chunks = _csv_chunks(_iter_rows(data), cols, chunk_rows, counter, extra)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if hasattr(cur, "copy"):  # psycopg 3
+            with cur.copy(sql) as cp:
+                for chunk in chunks:
+                    cp.write(chunk)
+        else:  # psycopg2
+            cur.copy_expert(sql, _ChunkReader(chunks))
+        cur.close()
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return counter[0]
+
 def paper_table_compatible(engine, df_cols) -> tuple[bool, list[str]]:
     insp = inspect(engine)
     if not insp.has_table("paper"):
@@ -27,50 +152,274 @@ def paper_table_compatible(engine, df_cols) -> tuple[bool, list[str]]:
     use = [c for c in wanted if c in cols]
     return (("doi" in cols) and (len(use) >= 2)), use
 
-def upsert_into_paper(engine, staging_table, cols):
+def _execute_merge(conn, sql: str, params: Dict[str, Any]) -> int:
+    """Ejecuta un merge; con psycopg 3 lo prepara en el servidor (prepare=True).
+
+    La sentencia queda preparada en la conexion del pool, asi que las cargas siguientes
+    que la reciban se saltan el parse/plan. psycopg2 no lo soporta: ejecucion normal.
+    """
+    raw = conn.connection.dbapi_connection
+    if PREPARE_MERGE and hasattr(raw, "prepare_threshold"):  # psycopg 3
+        with raw.cursor() as cur:
+            cur.execute(sql.replace(":batch_id", "%(batch_id)s"), params, prepare=True)
+            return cur.rowcount
+    return conn.execute(text(sql), params).rowcount
+
+def upsert_into_paper(engine, staging_table, cols, title_norm: bool | None = None,
+                      batch_id: str | None = None):
+    """Inserta en paper lo nuevo de staging: por DOI y, sin DOI, por titulo normalizado.
+
+    Si paper tiene la columna indexada title_norm (migracion 001) la comparacion
+    por titulo usa el indice en vez de recalcular la expresion sobre toda la tabla.
+    Con batch_id solo se mezcla ese lote de staging (migracion 002). Ambos INSERT
+    van como sentencias preparadas (ver _execute_merge). Dos merges nunca se solapan
+    (PAPER_MERGE_LOCK): un paper con id menor nunca se confirma despues de uno mayor.
+    """
+    if title_norm is None:
+        title_norm = "title_norm" in {c["name"] for c in inspect(engine).get_columns("paper")}
     collist = ", ".join(cols)
     select_cols = ", ".join([f"s.{c}" for c in cols])
+    p2_title = "p2.title_norm" if title_norm else TITLE_NORM_SQL.format(col="p2.title")
+    in_batch = "AND s.batch_id = :batch_id" if batch_id else ""
+    params = {"batch_id": batch_id} if batch_id else {}
+    inserted = 0
     with engine.begin() as conn:
-        conn.execute(text(f"""
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": PAPER_MERGE_LOCK})
+        inserted += _execute_merge(conn, f"""
             INSERT INTO paper ({collist})
             SELECT {select_cols}
             FROM {staging_table} s
             LEFT JOIN paper p ON (p.doi = s.doi AND p.doi IS NOT NULL)
-            WHERE (p.doi IS NULL)
-        """))
+            WHERE s.doi IS NOT NULL AND p.doi IS NULL {in_batch}
+        """, params)
         if "title" in cols:
-            conn.execute(text(f"""
+            inserted += _execute_merge(conn, f"""
                 INSERT INTO paper ({collist})
                 SELECT {select_cols}
                 FROM {staging_table} s
-                WHERE s.doi IS NULL
+                WHERE s.doi IS NULL {in_batch}
                   AND NOT EXISTS (
                       SELECT 1 FROM paper p2
-                      WHERE lower(regexp_replace(p2.title,'\\s+',' ','g')) =
-                            lower(regexp_replace(s.title,'\\s+',' ','g'))
+                      WHERE {p2_title} = {TITLE_NORM_SQL.format(col="s.title")}
                   )
-            """))
+            """, params)
+    return inserted
+
+def update_dedupe_index(rows: Iterable[dict], index: DedupeIndex | None = None) -> int:
+    """Registra DOIs/titulos recien cargados para que run_ingest no los vuelva a emitir.
+    Devuelve cuantas claves no estaban ya en el indice."""
+    return (index or get_index()).add_many(DedupeFilter.key(r) for r in rows)
+
+def load_staging(engine, data: EtlInput, method: str = "auto", table="staging_papers",
+                 batch_id: str | None = None, staging_cols: set | None = None) -> int:
+    """CSV/filas -> staging. method: copy | to_sql | auto (COPY y, si falla, to_sql)."""
+    if method in ("copy", "auto"):
+        try:
+            return copy_into_staging(engine, data, table=table, batch_id=batch_id, staging_cols=staging_cols)
+        except Exception as e:
+            if method == "copy":
+                raise
+            print(f"[WARN] COPY no disponible ({type(e).__name__}: {e}); usando to_sql.")
+    df = pd.read_csv(data) if _is_path(data) else pd.DataFrame(list(data))
+    for c in CSV_COLS:
+        if c not in df.columns:
+            df[c] = None
+    if batch_id:
+        df["batch_id"] = batch_id
+    ensure_staging(engine, df, table=table)
+    return len(df)
+
+def cleanup_staging(engine, retention_days: float, table="staging_papers",
+                    has_loaded_at: bool | None = None) -> int:
+    """Borra de staging los lotes cargados hace mas de `retention_days` dias.
+
+    Solo tiene sentido si esos lotes ya se mergearon en paper (run_etl no la llama si
+    paper no es compatible).
+    """
+    if has_loaded_at is None:
+        has_loaded_at = "loaded_at" in {c["name"] for c in inspect(engine).get_columns(table)}
+    if retention_days < 0 or not has_loaded_at:
+        return 0
+    with engine.begin() as conn:
+        res = conn.execute(text(f"DELETE FROM {table} WHERE loaded_at < now() - make_interval(secs => :s)"),
+                           {"s": retention_days * 86400})
+    return res.rowcount
+
+# --------- punto de entrada importable ----------
+# esquema ya preparado por (url del engine, tabla): evita re-inspeccionar en cada llamada.
+# Solo se guarda el caso completo (paper compatible y migrado); si no, la proxima carga
+# vuelve a migrar e inspeccionar, por si paper se creo mientras tanto.
+_schema_cache: Dict[tuple, Dict[str, Any]] = {}
+_schema_lock = threading.Lock()  # dos cargas en paralelo no migran a la vez
+
+def _prepare(engine, header: List[str], table: str) -> Dict[str, Any]:
+    key = (engine.url.render_as_string(hide_password=True), table)
+    info = _schema_cache.get(key)
+    if info is not None:
+        return info
+    with _schema_lock:
+        info = _schema_cache.get(key)
+        if info is not None:
+            return info
+        ensure_staging_table(engine, header, table)
+        migrate(engine)  # p.ej. title_norm indexado en paper, batch_id en staging
+        insp = inspect(engine)
+        staging_cols = {c["name"] for c in insp.get_columns(table)}
+        paper_ok, paper_cols = paper_table_compatible(engine, header)
+        info = {
+            "staging_cols": staging_cols,
+            "paper_ok": paper_ok,
+            "paper_cols": paper_cols,
+            "title_norm": paper_ok and "title_norm" in {c["name"] for c in insp.get_columns("paper")},
+        }
+        if info["paper_ok"] and info["title_norm"]:
+            _schema_cache[key] = info
+    return info
+
+def _update_ann_index(engine) -> int:
+    """Embebe e indexa los papers nuevos si ya existe un indice ANN (analysis/ann.py)."""
+    try:
+        from analysis.ann import index_new_papers
+        return index_new_papers(engine)
+    except Exception as e:  # sin modelo / dependencias: la carga no debe fallar por esto
+        print(f"[WARN] Indice ANN no actualizado ({type(e).__name__}: {e})")
+        return 0
+
+def _update_networks(engine) -> int:
+    """Suma los papers nuevos a las redes si ya se construyeron (analysis/networks.py)."""
+    try:
+        from analysis.networks import networks_built, update_from_db
+        if not networks_built():
+            return 0
+        return max(update_from_db(engine).values(), default=0)
+    except Exception as e:
+        print(f"[WARN] Redes no actualizadas ({type(e).__name__}: {e})")
+        return 0
+
+# --------- indices derivados (ANN, redes) fuera de la carga ----------
+# un solo hilo por proceso: las pasadas no compiten entre si ni con la carga siguiente
+_post_pool: Optional[ThreadPoolExecutor] = None
+_post_lock = threading.Lock()
+_post_queued: Dict[str, Future] = {}   # url -> pasada en cola que aun no empezo
+_post_last: Optional[Future] = None
+
+def _refresh_derived(engine, key: str) -> Dict[str, int]:
+    with _post_lock:
+        _post_queued.pop(key, None)  # desde aqui, una carga nueva encola otra pasada
+    run = RunMetrics("post_load")
+    out = {"ann_indexed": 0, "network_papers": 0}
+    if ANN_UPDATE_ON_LOAD:
+        with run.stage("ann"):
+            out["ann_indexed"] = _update_ann_index(engine)
+    if NETWORK_UPDATE_ON_LOAD:
+        with run.stage("networks"):
+            out["network_papers"] = _update_networks(engine)
+    run.finish(rows=out)
+    return out
+
+def schedule_index_updates(engine) -> Optional[Future]:
+    """Encola la actualizacion del indice ANN y de las redes tras un merge.
+
+    Ambas leen los papers con id mayor al ultimo procesado, asi que una pasada que
+    sigue en cola ya cubre esta carga y no se encola otra.
+    """
+    global _post_pool, _post_last
+    if not (ANN_UPDATE_ON_LOAD or NETWORK_UPDATE_ON_LOAD):
+        return None
+    key = engine.url.render_as_string(hide_password=True)
+    with _post_lock:
+        fut = _post_queued.get(key)
+        if fut is None:
+            if _post_pool is None:
+                _post_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="post-load")
+            fut = _post_queued[key] = _post_last = _post_pool.submit(_refresh_derived, engine, key)
+        return fut
+
+def wait_index_updates(timeout: Optional[float] = None) -> Optional[Dict[str, int]]:
+    """Espera a la ultima pasada encolada (p.ej. la CLI antes de salir); None si no hay."""
+    fut = _post_last
+    return fut.result(timeout) if fut is not None else None
+
+def run_etl(data: EtlInput, engine=None, source: str = "", method: str = "auto",
+            batch_id: str | None = None, retention_days: float = DEFAULT_RETENTION_DAYS,
+            table: str = "staging_papers") -> Dict[str, Any]:
+    """Carga un CSV combinado (o filas en memoria) en staging y hace el merge en paper.
+
+    Pensado para llamarse en proceso (API/UI) reutilizando el engine del llamador;
+    devuelve estadisticas en vez de imprimirlas. "metrics" lleva los segundos de cada
+    etapa (prepare, staging, merge, dedupe_index, cleanup, total). El indice ANN y las
+    redes se actualizan despues, en segundo plano (schedule_index_updates).
+    """
+    run = RunMetrics("etl")
+    engine = engine or get_engine()
+    batch_id = batch_id or new_batch_id()
+    header = _header(data)
+    stats: Dict[str, Any] = {
+        "batch_id": batch_id, "source": source, "staging_table": table,
+        "rows_staged": 0, "load_seconds": 0.0, "rows_per_sec": 0.0,
+        "merged": False, "inserted": 0, "purged": 0, "index_update_queued": False,
+        "metrics": {},
+    }
+    if not header:
+        return stats
+
+    with run.stage("prepare"):
+        info = _prepare(engine, header, table)
+
+    t0 = time.perf_counter()
+    n = load_staging(engine, data, method=method, table=table, batch_id=batch_id,
+                     staging_cols=info["staging_cols"])
+    secs = time.perf_counter() - t0
+    run.add("staging", secs)
+    stats.update(rows_staged=n, load_seconds=round(secs, 4), rows_per_sec=round(n / secs if secs > 0 else 0.0, 1))
+    LOAD_ROWS_PER_SEC.set(stats["rows_per_sec"])
+
+    if info["paper_ok"]:
+        with run.stage("merge"):
+            stats["inserted"] = upsert_into_paper(engine, table, info["paper_cols"],
+                                                  title_norm=info["title_norm"], batch_id=batch_id)
+        stats["merged"] = True
+        with run.stage("dedupe_index"):
+            update_dedupe_index(_iter_rows(data))
+        if stats["inserted"]:
+            stats["index_update_queued"] = schedule_index_updates(engine) is not None
+
+    # sin paper compatible nada se mergeo: los lotes viejos de staging aun no estan en
+    # paper y no se purgan (se mergean a mano cuando exista, ver main)
+    if info["paper_ok"]:
+        with run.stage("cleanup"):
+            stats["purged"] = cleanup_staging(engine, retention_days, table,
+                                              has_loaded_at="loaded_at" in info["staging_cols"])
+    stats["metrics"] = run.finish(rows={"staged": n, "inserted": stats["inserted"]})
+    return stats
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", required=True, help="Ruta al CSV combinado")
     ap.add_argument("--source", default="", help="Etiqueta(s) de fuente (solo logging)")
+    ap.add_argument("--method", default="auto", choices=["auto", "copy", "to_sql"],
+                    help="Carga a staging: COPY FROM STDIN (rapido) o DataFrame.to_sql")
+    ap.add_argument("--batch-id", default=None, help="Id del lote en staging (por defecto uno nuevo)")
+    ap.add_argument("--retention-days", type=float, default=DEFAULT_RETENTION_DAYS,
+                    help="Purga lotes de staging mas viejos que esto (-1 = no purgar)")
     args = ap.parse_args()
 
-    engine = get_engine()
-    df = pd.read_csv(args.input)
-
-    for c in ["title","doi","pii","authors","container_title","published","source","url","abstract"]:
-        if c not in df.columns:
-            df[c] = None
-
-    staging = ensure_staging(engine, df)
-    ok, cols = paper_table_compatible(engine, df.columns)
-    if ok:
-        upsert_into_paper(engine, staging, cols)
-        print(f"[OK] Cargado en {staging} y upsert en paper ({len(cols)} cols).")
+    st = run_etl(args.input, source=args.source, method=args.method,
+                 batch_id=args.batch_id, retention_days=args.retention_days)
+    staging = st["staging_table"]
+    print(f"[OK] {st['rows_staged']} filas en {staging} (lote {st['batch_id']}) "
+          f"en {st['load_seconds']:.2f}s ({st['rows_per_sec']:.0f} filas/s).")
+    if st["merged"]:
+        print(f"[OK] Cargado en {staging} y upsert en paper ({st['inserted']} filas nuevas).")
     else:
         print(f"[OK] Cargado en {staging}. No se detecto tabla 'paper' compatible; puedes mergear luego.")
+    if st["index_update_queued"]:
+        upd = wait_index_updates()
+        print(f"[OK] Indice ANN: {upd['ann_indexed']} papers; redes: {upd['network_papers']} papers.")
+    if st["purged"]:
+        print(f"[OK] Purgadas {st['purged']} filas de lotes viejos en {staging}.")
+    if st["metrics"]:
+        print("[INFO] Etapas: " + ", ".join(f"{k} {v:.2f}s" for k, v in st["metrics"]["stages"].items()))
 
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,84 @@
+# etl/source/concurrency.py
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, TypeVar
+from urllib.parse import urlsplit
+
+from etl.metrics import submit_in_context
+
+T = TypeVar("T")
+
+
+def api_host(env: str, default: str) -> str:
+    """Host del API configurado en `env` (CROSSREF_API_URL / ELSEVIER_API_URL)."""
+    return urlsplit(os.getenv(env) or default).hostname or ""
+
+
+CROSSREF_HOST = api_host("CROSSREF_API_URL", "https://api.crossref.org")
+ELSEVIER_HOST = api_host("ELSEVIER_API_URL", "https://api.elsevier.com")
+
+# Máximo de peticiones simultáneas por host (se comparte entre todas las fuentes)
+HOST_LIMITS: Dict[str, int] = {
+    CROSSREF_HOST: int(os.getenv("CROSSREF_MAX_CONCURRENCY", "3")),
+    ELSEVIER_HOST: int(os.getenv("ELSEVIER_MAX_CONCURRENCY", "2")),
+}
+DEFAULT_HOST_LIMIT = 2
+
+_lock = threading.Lock()
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def host_limit(url_or_host: str) -> int:
+    host = urlsplit(url_or_host).hostname or url_or_host
+    return max(1, HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).hostname or ""
+    with _lock:
+        sem = _semaphores.get(host)
+        if sem is None:
+            sem = _semaphores[host] = threading.BoundedSemaphore(host_limit(host))
+        return sem
+
+
+@contextmanager
+def host_slot(url: str):
+    """Reserva un cupo de concurrencia para el host de `url` mientras dura la petición."""
+    sem = _host_semaphore(url)
+    with sem:
+        yield
+
+
+def prefetch_pages(fetch: Callable[[int], List[T]], starts: Iterable[int], window: int = 1) -> Iterator[List[T]]:
+    """Entrega en orden las páginas `fetch(start)`, manteniendo hasta `window` en vuelo.
+
+    Con window=1 es equivalente al bucle secuencial. Si el consumidor deja de iterar,
+    las páginas pendientes se cancelan.
+    """
+    if window <= 1:
+        for s in starts:
+            yield fetch(s)
+        return
+
+    it = iter(starts)
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix="prefetch") as pool:
+        try:
+            for s in islice(it, window):
+                pending.append(submit_in_context(pool, fetch, s))
+            while pending:
+                page = pending.popleft().result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append(submit_in_context(pool, fetch, nxt))
+                yield page
+        finally:
+            for f in pending:
+                f.cancel()
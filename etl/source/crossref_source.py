@@ -1,19 +1,32 @@
 ﻿# etl/source/crossref_source.py
 from __future__ import annotations
 
-import time
-from typing import List, Dict, Any, Optional
+from contextlib import closing
+from typing import Callable, Iterator, List, Dict, Any, Optional
 from pathlib import Path
 import os
 import re
 import requests
 from dotenv import load_dotenv
 
+from etl.source.concurrency import prefetch_pages
+from etl.source.ratelimit import http_get
+from etl.source.http_cache import CacheMiss, HttpCache, get_cache
+from etl.records import Record
+
 # etl/source -> repo root
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env", override=False)
 
-CR_BASE = "https://api.crossref.org/v1/works"   # version explícita
-CR_MEMBERS = "https://api.crossref.org/v1/members"
+# CROSSREF_API_URL permite apuntar a otra instancia (p.ej. etl/source/mock_api.py)
+CR_API = (os.getenv("CROSSREF_API_URL") or "https://api.crossref.org").rstrip("/")
+CR_BASE = f"{CR_API}/v1/works"   # version explícita
+CR_MEMBERS = f"{CR_API}/v1/members"
+
+CR_OFFSET_MAX = 10000   # Crossref rechaza offset > 10000; más allá hay que usar cursor
+CR_CURSOR_ROWS = 1000   # máximo de rows por página que acepta Crossref
+# solo los campos que consume item_to_row (reduce el tamaño de cada página)
+CR_SELECT = "DOI,title,author,issued,container-title,link,abstract"
+MEMBERS_TTL = 30 * 86400  # el id de un editor casi nunca cambia
 
 def _user_agent() -> str:
     app = os.getenv("APP_ENV", "dev")
@@ -24,21 +37,41 @@ def _user_agent() -> str:
     return "analisis-bibliometria/1.0 (mailto:contact@example.com); env={}".format(app)
 
 class CrossrefSource:
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: int = 30, prefetch: int = 1, paging: str = "auto", select: bool = True,
+                 cache: Optional[HttpCache] = None, use_cache: bool = True):
         self.session = requests.Session()
+        # pool acorde al número de páginas que pueden ir en paralelo
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, prefetch))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             "User-Agent": _user_agent(),
             "Accept": "application/json",
         })
         self.timeout = timeout
         self.mailto = (os.getenv("CROSSREF_MAILTO") or "").strip()  # opcional
+        self.prefetch = prefetch  # páginas en vuelo por búsqueda (1 = secuencial)
+        # "offset" | "cursor" | "auto" (cursor solo si max_records supera CR_OFFSET_MAX)
+        self.paging = paging
+        self.select = select
+        self.cache = (cache or get_cache()) if use_cache else None
 
-    def _get(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _get(self, url: str, params: Dict[str, Any], ttl: Optional[float] = None) -> Dict[str, Any]:
         # añadimos mailto como parámetro por cortesía
         if self.mailto:
             params = dict(params)
             params["mailto"] = self.mailto
-        r = self.session.get(url, params=params, timeout=self.timeout)
+        # los next-cursor de Crossref caducan a los pocos minutos: una pagina de cursor
+        # (incluida cursor=*, que trae el siguiente) nunca pasa por la cache
+        cache = self.cache if "cursor" not in params else None
+        if cache is None and self.cache is not None and self.cache.mode == "offline":
+            raise CacheMiss(f"Paginacion por cursor sin cache (offline): {url} {params}")
+        if cache is not None:
+            cached = cache.get_json(url, params, ttl=ttl)
+            if cached is not None:
+                return cached
+        # limite de tasa por host + reintentos ante 429/5xx (ver etl.source.ratelimit)
+        r = http_get(self.session, url, params=params, timeout=self.timeout)
         # Consejo: cuando dé 400, es útil ver el cuerpo
         if r.status_code >= 400:
             try:
@@ -46,12 +79,15 @@ class CrossrefSource:
             except Exception:
                 txt = "<sin texto>"
             raise requests.HTTPError(f"{r.status_code} for {r.url} :: {txt}", response=r)
-        return r.json()
+        data = r.json()
+        if cache is not None:
+            cache.put(url, params, r.content)
+        return data
 
     # --------- resolución del member id del editor ----------
     def _resolve_member_id(self, publisher: str) -> Optional[int]:
         params = {"query": publisher, "rows": 20}
-        data = self._get(CR_MEMBERS, params)
+        data = self._get(CR_MEMBERS, params, ttl=MEMBERS_TTL)
         items = data.get("message", {}).get("items") or []
         if not items:
             return None
@@ -74,9 +110,17 @@ class CrossrefSource:
         return int(best_id) if best_id is not None else None
 
     # --------- búsqueda con paginación por offset ----------
-    def search(self, query: str, publisher: str, max_records: int = 300) -> List[Dict[str, Any]]:
-        rows: List[Dict[str, Any]] = []
+    def search(self, query: str, publisher: str, max_records: int = 300,
+               prefetch: Optional[int] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_search(query, publisher, max_records=max_records, prefetch=prefetch))
+
+    def iter_search(self, query: str, publisher: str, max_records: int = 300,
+                    prefetch: Optional[int] = None,
+                    on_page: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        """Igual que search, pero entrega los items página a página (memoria constante).
 
+        on_page(n_items) se llama con cada página recibida (progreso).
+        """
         # resolver member id y usar filter=member:<id> (más robusto que publisher-name)
         member_id = None
         try:
@@ -85,27 +129,57 @@ class CrossrefSource:
             # si falla el endpoint de members, seguimos sin ID
             member_id = None
 
-        got, offset = 0, 0
-        while got < max_records:
-            page_size = min(100, max_records - got)
-            filters = f"member:{member_id}" if member_id else f"publisher-name:{publisher}"
-            params = {
-                "query.bibliographic": query,
-                "filter": filters,
-                "rows": page_size,
-                "offset": offset,
-            }
+        filters = f"member:{member_id}" if member_id else f"publisher-name:{publisher}"
+        base = {"query.bibliographic": query, "filter": filters}
+        if self.select:
+            base["select"] = CR_SELECT
+
+        use_cursor = self.paging == "cursor" or (self.paging == "auto" and max_records > CR_OFFSET_MAX)
+        if use_cursor:
+            yield from self._iter_cursor(base, max_records, on_page)
+            return
+
+        def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            params = dict(base, rows=min(100, max_records - offset), offset=offset)
             data = self._get(CR_BASE, params)
-            items = data.get("message", {}).get("items") or []
+            return data.get("message", {}).get("items") or []
+
+        # los offsets se conocen de antemano, así que las páginas se pueden pedir en paralelo
+        offsets = range(0, min(max_records, CR_OFFSET_MAX + 100), 100)
+        with closing(prefetch_pages(fetch_page, offsets, prefetch or self.prefetch)) as pages:
+            for offset, items in zip(offsets, pages):
+                if not items:
+                    break
+                if on_page:
+                    on_page(len(items))
+                yield from items
+                if len(items) < min(100, max_records - offset):
+                    break  # página incompleta: no hay más resultados
+
+    # --------- deep paging con cursor ----------
+    def _iter_cursor(self, base: Dict[str, Any], max_records: int,
+                     on_page: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        """Paginación con cursor=* / next-cursor (sin cursor_max, que Crossref rechaza con 400).
+
+        Las páginas son secuenciales: cada una depende del next-cursor de la anterior.
+        """
+        got, cursor = 0, "*"
+        while got < max_records:
+            params = dict(base, rows=min(CR_CURSOR_ROWS, max_records - got), cursor=cursor)
+            msg = self._get(CR_BASE, params).get("message", {})
+            items = msg.get("items") or []
             if not items:
                 break
-            rows.extend(items)
+            items = items[:max_records - got]
+            if on_page:
+                on_page(len(items))
+            yield from items
             got += len(items)
-            offset += len(items)
-            time.sleep(0.15)  # ser amable
-        return rows
+            cursor = msg.get("next-cursor")
+            if not cursor:
+                break
 
-def item_to_row(it: Dict[str, Any], source_label: str) -> Dict[str, Any]:
+def item_to_row(it: Dict[str, Any], source_label: str) -> Record:
     doi = it.get("DOI")
     title = (it.get("title") or [None])[0]
     authors = "; ".join([f"{a.get('given','')} {a.get('family','')}".strip()
@@ -122,15 +196,15 @@ def item_to_row(it: Dict[str, Any], source_label: str) -> Dict[str, Any]:
     if not link_url and it.get("link"):
         link_url = it["link"][0].get("URL")
 
-    return {
-        "source": source_label,
-        "title": title,
-        "doi": doi,
-        "pii": None,
-        "authors": authors,
-        "container_title": (it.get("container-title") or [None])[0],
-        "published": str(year) if year else None,
-        "openaccess": None,
-        "url": link_url,
-        "abstract": it.get("abstract"),
-    }
+    return Record(
+        source=source_label,
+        title=title,
+        doi=doi,
+        pii=None,
+        authors=authors,
+        container_title=(it.get("container-title") or [None])[0],
+        published=str(year) if year else None,
+        openaccess=None,
+        url=link_url,
+        abstract=it.get("abstract"),
+    )
@@ -0,0 +1,163 @@
+# etl/source/http_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# etl/source -> repo root
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_DIR = ROOT / "data" / "cache" / "http"
+
+# parametros que no cambian la respuesta (no forman parte de la clave)
+IGNORED_PARAMS = {"mailto"}
+
+# on: lee y escribe | off: sin cache | refresh: ignora lo guardado pero lo reescribe
+# offline: solo responde desde cache (sin TTL); si no hay entrada lanza CacheMiss
+MODES = {"on", "off", "refresh", "offline"}
+
+
+class CacheMiss(LookupError):
+    """Modo offline y la peticion no esta en cache."""
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS)
+    raw = url + "?" + json.dumps(items, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """Cache de respuestas HTTP en disco, direccionada por hash de URL + parametros.
+
+    Los cuerpos se guardan comprimidos con zlib en <root>/<ab>/<hash>.z y un indice
+    SQLite lleva tamaño y ultimo acceso para expirar por TTL y desalojar por LRU
+    cuando se supera max_bytes.
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_DIR, ttl: float = 86400,
+                 max_bytes: int = 500 * 1024 * 1024, mode: str = "on"):
+        if mode not in MODES:
+            raise ValueError(f"Modo de cache invalido: {mode} (usa {sorted(MODES)})")
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --------- indice ----------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entry (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entry_accessed ON entry(accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.z"
+
+    def _drop(self, db: sqlite3.Connection, key: str) -> None:
+        db.execute("DELETE FROM entry WHERE key = ?", (key,))
+        self._path(key).unlink(missing_ok=True)
+
+    # --------- lectura / escritura ----------
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None) -> Optional[bytes]:
+        if self.mode in ("off", "refresh"):
+            return None
+        key = cache_key(url, params)
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT created FROM entry WHERE key = ?", (key,)).fetchone()
+            body = None
+            if row and (self.mode == "offline" or time.time() - row[0] <= ttl):
+                try:
+                    body = zlib.decompress(self._path(key).read_bytes())
+                    db.execute("UPDATE entry SET accessed = ? WHERE key = ?", (time.time(), key))
+                except (OSError, zlib.error):
+                    self._drop(db, key)  # archivo perdido o corrupto
+                db.commit()
+        if body is None and self.mode == "offline":
+            raise CacheMiss(f"Sin respuesta en cache (offline) para {url} {params or ''}")
+        return body
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None) -> Optional[Any]:
+        body = self.get(url, params, ttl=ttl)
+        return json.loads(body) if body is not None else None
+
+    def put(self, url: str, params: Optional[Dict[str, Any]], body: bytes) -> None:
+        if self.mode in ("off", "offline"):
+            return
+        key = cache_key(url, params)
+        data = zlib.compress(body, 6)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)  # escritura atomica
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO entry (key, url, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, url, len(data), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entry").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)  # deja holgura para no desalojar en cada put
+        for key, size in db.execute("SELECT key, size FROM entry ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            self._drop(db, key)
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._db()
+            for (key,) in db.execute("SELECT key FROM entry").fetchall():
+                self._drop(db, key)
+            db.commit()
+
+
+_default: Optional[HttpCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    """Cache compartida del proceso, configurada por .env:
+    HTTP_CACHE_MODE (on/off/refresh/offline), HTTP_CACHE_TTL (s), HTTP_CACHE_MAX_MB, HTTP_CACHE_DIR.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpCache(
+                root=os.getenv("HTTP_CACHE_DIR") or DEFAULT_DIR,
+                ttl=float(os.getenv("HTTP_CACHE_TTL", "86400")),
+                max_bytes=int(float(os.getenv("HTTP_CACHE_MAX_MB", "500")) * 1024 * 1024),
+                mode=(os.getenv("HTTP_CACHE_MODE") or "on").strip().lower(),
+            )
+        return _default
@@ -0,0 +1,276 @@
+# etl/source/mock_api.py
+from __future__ import annotations
+
+# --- bootstrap de ruta para importar 'etl.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# --------------------------------------------------------------------
+
+import argparse
+import base64
+import json
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = ROOT / "data" / "fixtures" / "mock_api"
+WORKS_PATH = "/v1/works"
+MEMBERS_PATH = "/v1/members"
+SD_PATH = "/content/search/sciencedirect"
+
+
+@dataclass
+class MockConfig:
+    """Comportamiento del servidor simulado (ver README: Benchmark de ingesta)."""
+    total: int = 100_000          # resultados disponibles por busqueda (y fuente)
+    latency_ms: float = 0.0       # latencia media por peticion
+    jitter_ms: float = 0.0        # desviacion de la latencia (gaussiana, truncada en 0)
+    error_rate: float = 0.0       # fraccion de respuestas 503
+    throttle_rate: float = 0.0    # fraccion de respuestas 429 (con Retry-After: 0)
+    dup_rate: float = 0.0         # fraccion de items que repiten el DOI de uno anterior
+    seed: int = 0
+
+
+# --------- plantillas (grabadas o sinteticas) ----------
+def _synthetic_work(i: int) -> Dict[str, Any]:
+    return {
+        "DOI": f"10.5555/mock.{i}",
+        "title": [f"Generative models for bibliometric analysis, study {i}"],
+        "author": [{"given": "Ana", "family": f"Perez{i % 500}"}, {"given": "Luis", "family": f"Gomez{i % 37}"}],
+        "issued": {"date-parts": [[2015 + i % 10, 1 + i % 12, 1]]},
+        "container-title": ["Communications of the ACM"],
+        "link": [{"URL": f"https://example.org/{i}.pdf", "intended-application": "text-mining"}],
+        "abstract": "<jats:p>Large language models and generative AI in education and research.</jats:p>",
+    }
+
+
+def _synthetic_entry(i: int) -> Dict[str, Any]:
+    return {
+        "dc:title": f"Generative artificial intelligence in higher education, case {i}",
+        "prism:doi": f"10.1016/mock.{i}",
+        "pii": f"S0000000000{i:06d}",
+        "authors": {"author": [{"authname": f"Lopez M.{i % 300}"}, {"authname": "Chen L."}]},
+        "prism:publicationName": "Computers & Education",
+        "prism:coverDate": f"{2015 + i % 10}-01-01",
+        "openaccess": i % 3 == 0,
+        "link": [{"@ref": "scidir", "@href": f"https://www.sciencedirect.com/science/article/pii/S{i}"}],
+    }
+
+
+def load_fixtures(root: Path = FIXTURES_DIR) -> Dict[str, List[Dict[str, Any]]]:
+    """Items grabados (works.json / sciencedirect.json); si no hay, se generan sinteticos."""
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for name, make in (("works", _synthetic_work), ("sciencedirect", _synthetic_entry)):
+        p = root / f"{name}.json"
+        items = json.loads(p.read_text(encoding="utf-8")) if p.exists() else []
+        out[name] = items or [make(i) for i in range(200)]
+    return out
+
+
+def record_from_cache(cache_dir: Optional[str | Path] = None, root: Path = FIXTURES_DIR,
+                      limit: int = 2000) -> Dict[str, int]:
+    """Extrae items reales de la cache HTTP (etl/source/http_cache.py) como plantillas."""
+    from etl.source.http_cache import DEFAULT_DIR
+    cache_dir = Path(cache_dir or DEFAULT_DIR)
+    found: Dict[str, List[Dict[str, Any]]] = {"works": [], "sciencedirect": []}
+    db = sqlite3.connect(str(cache_dir / "index.sqlite"))
+    try:
+        for key, url in db.execute("SELECT key, url FROM entry"):
+            kind = "works" if WORKS_PATH in url else "sciencedirect" if "sciencedirect" in url else None
+            if kind is None or len(found[kind]) >= limit:
+                continue
+            try:
+                data = json.loads(zlib.decompress((cache_dir / key[:2] / f"{key}.z").read_bytes()))
+            except (OSError, zlib.error, ValueError):
+                continue
+            items = (data.get("message", {}).get("items") if kind == "works"
+                     else data.get("search-results", {}).get("entry")) or []
+            found[kind] += [it for it in items if isinstance(it, dict)][:limit - len(found[kind])]
+    finally:
+        db.close()
+    root.mkdir(parents=True, exist_ok=True)
+    for kind, items in found.items():
+        if items:
+            (root / f"{kind}.json").write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    return {k: len(v) for k, v in found.items()}
+
+
+# --------- servidor ----------
+class MockState:
+    def __init__(self, config: MockConfig, fixtures: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.config = config
+        self.fixtures = fixtures or load_fixtures()
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "throttled": 0, "items": 0, "bytes": 0}
+
+    def count(self, **inc: int) -> None:
+        with self._lock:
+            for k, v in inc.items():
+                self.stats[k] += v
+
+    def roll(self) -> Tuple[float, Optional[int]]:
+        """(retardo en s, status de error a inyectar o None)."""
+        c = self.config
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(c.latency_ms, c.jitter_ms)) / 1000 if c.latency_ms else 0.0
+            r = self._rng.random()
+        if r < c.error_rate:
+            return delay, 503
+        if r < c.error_rate + c.throttle_rate:
+            return delay, 429
+        return delay, None
+
+    def item_index(self, stream: str, i: int) -> int:
+        """Indice global del item i de una busqueda; con dup_rate algunos repiten uno anterior."""
+        base = zlib.crc32(stream.encode("utf-8")) % 1000 * 10_000_000
+        if self.config.dup_rate and i and random.Random(base + i).random() < self.config.dup_rate:
+            i = random.Random(base - i).randrange(i)
+        return base + i
+
+    def work(self, stream: str, i: int) -> Dict[str, Any]:
+        tpl = self.fixtures["works"]
+        j = self.item_index(stream, i)
+        it = dict(tpl[j % len(tpl)])
+        it["DOI"] = f"10.5555/mock.{j}"  # DOI unico por indice (los duplicados repiten indice)
+        it["title"] = [f"{(it.get('title') or ['Untitled'])[0]} [{j}]"]
+        return it
+
+    def entry(self, stream: str, i: int) -> Dict[str, Any]:
+        tpl = self.fixtures["sciencedirect"]
+        j = self.item_index(stream, i)
+        e = dict(tpl[j % len(tpl)])
+        e["prism:doi"] = f"10.1016/mock.{j}"
+        e["pii"] = f"SMOCK{j:012d}"
+        e["dc:title"] = f"{e.get('dc:title') or 'Untitled'} [{j}]"
+        return e
+
+
+def _q(params: Dict[str, List[str]], name: str, default: str = "") -> str:
+    return (params.get(name) or [default])[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    state: MockState  # se asigna en make_server
+    protocol_version = "HTTP/1.1"  # keep-alive, como las APIs reales
+
+    def log_message(self, *args: Any) -> None:  # sin log por peticion
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+        self.state.count(bytes=len(raw))
+
+    def do_GET(self) -> None:
+        st = self.state
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/_stats":
+            return self._send(200, {"stats": st.stats, "config": asdict(st.config)})
+        st.count(requests=1)
+        delay, err = st.roll()
+        if delay:
+            time.sleep(delay)
+        if err == 503:
+            st.count(errors=1)
+            return self._send(503, {"status": "error", "message": "injected"})
+        if err == 429:
+            st.count(throttled=1)
+            return self._send(429, {"status": "error", "message": "injected"}, {"Retry-After": "0"})
+
+        total = st.config.total
+        if url.path == MEMBERS_PATH:
+            name = _q(params, "query")
+            return self._send(200, {"status": "ok", "message": {"items": [
+                {"id": zlib.crc32(name.encode()) % 100_000, "primary-name": name}]}})
+        if url.path == WORKS_PATH:
+            stream = f"{_q(params, 'query.bibliographic')}|{_q(params, 'filter')}"
+            rows = min(int(_q(params, "rows", "20")), 1000)
+            cursor = _q(params, "cursor")
+            if cursor:
+                start = 0 if cursor == "*" else int(base64.urlsafe_b64decode(cursor.encode()).decode())
+            else:
+                start = int(_q(params, "offset", "0"))
+            stop = min(start + rows, total)
+            items = [st.work(stream, i) for i in range(start, stop)]
+            st.count(items=len(items))
+            msg: Dict[str, Any] = {"total-results": total, "items-per-page": rows, "items": items}
+            if cursor:
+                msg["next-cursor"] = base64.urlsafe_b64encode(str(stop).encode()).decode()
+            return self._send(200, {"status": "ok", "message-type": "work-list", "message": msg})
+        if url.path == SD_PATH:
+            stream = f"sd|{_q(params, 'query')}"
+            count = min(int(_q(params, "count", "25")), 100)
+            start = int(_q(params, "start", "0"))
+            entries = [st.entry(stream, i) for i in range(start, min(start + count, total))]
+            st.count(items=len(entries))
+            return self._send(200, {"search-results": {
+                "opensearch:totalResults": str(total), "opensearch:startIndex": str(start),
+                "entry": entries}})
+        self._send(404, {"status": "error", "message": f"ruta no simulada: {url.path}"})
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0,
+                fixtures: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> ThreadingHTTPServer:
+    """Servidor listo para serve_forever(); port=0 elige un puerto libre (server.server_address)."""
+    handler = type("MockHandler", (_Handler,), {"state": MockState(config, fixtures)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Arranca el servidor en un hilo demonio. Devuelve (server, url_base)."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-api", daemon=True).start()
+    h, p = server.server_address[:2]
+    return server, f"http://{h}:{p}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor local que simula Crossref y ScienceDirect")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--total", type=int, default=MockConfig.total, help="Resultados por busqueda")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraccion de respuestas 503")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="Fraccion de respuestas 429")
+    ap.add_argument("--dup-rate", type=float, default=0.0, help="Fraccion de DOIs repetidos")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--record-from-cache", action="store_true",
+                    help="Guarda como plantillas los items de la cache HTTP y termina")
+    args = ap.parse_args()
+
+    if args.record_from_cache:
+        print(f"[OK] Plantillas grabadas en {FIXTURES_DIR}: {record_from_cache()}")
+        return 0
+    cfg = MockConfig(args.total, args.latency_ms, args.jitter_ms, args.error_rate,
+                     args.throttle_rate, args.dup_rate, args.seed)
+    server = make_server(cfg, args.host, args.port)
+    base = f"http://{args.host}:{args.port}"
+    print(f"[OK] API simulada en {base}")
+    print(f"     CROSSREF_API_URL={base} ELSEVIER_API_URL={base} HTTP_CACHE_MODE=off")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+# etl/source/ratelimit.py
+from __future__ import annotations
+
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from etl.metrics import observe_http, observe_retry
+from etl.source.concurrency import CROSSREF_HOST, ELSEVIER_HOST, host_slot
+
+# peticiones/segundo iniciales por host; se ajustan con las cabeceras de cada API
+DEFAULT_RATES: Dict[str, float] = {
+    CROSSREF_HOST: float(os.getenv("CROSSREF_RATE", "5")),
+    ELSEVIER_HOST: float(os.getenv("ELSEVIER_RATE", "2")),
+}
+DEFAULT_RATE = 2.0
+MIN_RATE = 0.2
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+BACKOFF_BASE = 0.5   # s
+BACKOFF_MAX = 60.0   # s
+
+
+class QuotaExhausted(requests.HTTPError):
+    """La cuota del API (p.ej. semanal de Elsevier) esta agotada hasta `reset`."""
+
+
+class TokenBucket:
+    """Token bucket por host con ajuste adaptativo (AIMD).
+
+    `max_rate` es el limite que anuncia el servidor; ante un 429 la tasa efectiva
+    se reduce a la mitad y se recupera poco a poco con cada respuesta correcta.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.quota_reset: Optional[float] = None  # epoch (s) si la cuota esta agotada
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_limit(self, rate: float) -> None:
+        with self._lock:
+            self.max_rate = max(MIN_RATE, rate)
+            self.rate = self.max_rate
+            self.capacity = max(1.0, self.max_rate)
+
+    def penalize(self, pause: float = 0.0) -> None:
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if pause:
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def reward(self) -> None:
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate * 1.1)
+
+    # --------- cabeceras de limite ----------
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        # Crossref: X-Rate-Limit-Limit: 50 / X-Rate-Limit-Interval: 1s
+        limit, interval = headers.get("X-Rate-Limit-Limit"), headers.get("X-Rate-Limit-Interval")
+        if limit and interval:
+            try:
+                secs = _parse_interval(interval)
+                if secs > 0 and abs(int(limit) / secs - self.max_rate) > 1e-9:
+                    self.set_limit(int(limit) / secs)
+            except ValueError:
+                pass
+        # Elsevier: X-RateLimit-Remaining / X-RateLimit-Reset (epoch) sobre la cuota semanal
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        if remaining is not None:
+            try:
+                self.quota_reset = float(reset) if int(remaining) <= 0 and reset else None
+            except ValueError:
+                pass
+
+    def check_quota(self, url: str) -> None:
+        if self.quota_reset and self.quota_reset > time.time():
+            when = datetime.fromtimestamp(self.quota_reset, tz=timezone.utc).isoformat()
+            raise QuotaExhausted(f"Cuota agotada para {urlsplit(url).hostname} hasta {when}")
+
+
+def _parse_interval(s: str) -> float:
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*", s)
+    if not m:
+        raise ValueError(s)
+    return float(m.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[m.group(2) or "s"]
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Segundos indicados por Retry-After (entero o fecha HTTP), si existe."""
+    v = headers.get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(v) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int) -> float:
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+_lock = threading.Lock()
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def get_limiter(url: str) -> TokenBucket:
+    host = urlsplit(url).hostname or ""
+    with _lock:
+        b = _buckets.get(host)
+        if b is None:
+            b = _buckets[host] = TokenBucket(DEFAULT_RATES.get(host, DEFAULT_RATE))
+        return b
+
+
+def http_get(session: requests.Session, url: str, params: Optional[Dict[str, Any]] = None,
+             timeout: float = 30, retries: int = MAX_RETRIES, **kwargs: Any) -> requests.Response:
+    """GET con limite de tasa por host, reintentos ante 429/5xx/errores de red y Retry-After.
+
+    Devuelve la ultima respuesta (aunque sea un error) para que el llamador decida.
+    Cada intento se anota en etl.metrics (latencia, bytes, espera y reintentos por host).
+    """
+    limiter = get_limiter(url)
+    host = urlsplit(url).hostname or ""
+    attempt = 0
+    while True:
+        limiter.check_quota(url)
+        t0 = time.perf_counter()
+        limiter.acquire()
+        try:
+            with host_slot(url):
+                t1 = time.perf_counter()  # t1 - t0: espera por tasa y por cupo del host
+                r = session.get(url, params=params, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            observe_http(host, type(e).__name__, time.perf_counter() - t1, wait=t1 - t0)
+            if attempt >= retries:
+                raise
+            delay = backoff(attempt)
+            reason = type(e).__name__
+        else:
+            observe_http(host, r.status_code, time.perf_counter() - t1, len(r.content), wait=t1 - t0)
+            limiter.update_from_headers(r.headers)
+            if r.status_code not in RETRY_STATUS or attempt >= retries:
+                if r.status_code < 400:
+                    limiter.reward()
+                return r
+            delay = retry_after(r.headers)
+            if delay is None:
+                delay = backoff(attempt)
+            if r.status_code == 429:
+                limiter.penalize(delay)  # frena a todos los hilos del mismo host
+            reason = r.status_code
+        observe_retry(host, reason, delay)
+        attempt += 1
+        time.sleep(delay)
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import os
-import time
-from typing import Iterator, Dict, Any
+from contextlib import closing
+from typing import Callable, Iterator, Dict, Any, List, Optional
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -12,11 +12,19 @@ load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env", override=F
 import requests
 from urllib.parse import urlencode
 
-SD_SEARCH_URL = "https://api.elsevier.com/content/search/sciencedirect"
-SD_ARTICLE_PII_URL = "https://api.elsevier.com/content/article/pii/{}"
+from etl.source.concurrency import prefetch_pages
+from etl.source.ratelimit import http_get
+from etl.source.http_cache import HttpCache, get_cache
+from etl.records import Record
+
+# ELSEVIER_API_URL permite apuntar a otra instancia (p.ej. etl/source/mock_api.py)
+SD_API = (os.getenv("ELSEVIER_API_URL") or "https://api.elsevier.com").rstrip("/")
+SD_SEARCH_URL = f"{SD_API}/content/search/sciencedirect"
+SD_ARTICLE_PII_URL = SD_API + "/content/article/pii/{}"
 
 class ScienceDirectClient:
-    def __init__(self, api_key: str | None = None, insttoken: str | None = None, timeout: int = 30):
+    def __init__(self, api_key: str | None = None, insttoken: str | None = None, timeout: int = 30,
+                 cache: Optional[HttpCache] = None, use_cache: bool = True):
         self.api_key = api_key or os.getenv("ELSEVIER_API_KEY")
         self.insttoken = insttoken or os.getenv("ELSEVIER_INSTTOKEN")
         if not self.api_key:
@@ -29,36 +37,51 @@ class ScienceDirectClient:
         if self.insttoken:
             self.session.headers["X-ELS-Insttoken"] = self.insttoken
         self.timeout = timeout
+        # la clave de cache no incluye la API key (va en cabeceras)
+        self.cache = (cache or get_cache()) if use_cache else None
+
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if self.cache is not None:
+            cached = self.cache.get_json(url, params)
+            if cached is not None:
+                return cached
+        r = http_get(self.session, url, params=params, timeout=self.timeout)
+        r.raise_for_status()
+        data = r.json()
+        if self.cache is not None:
+            self.cache.put(url, params, r.content)
+        return data
 
     def search(self, query: str, count: int = 100, start: int = 0) -> Dict[str, Any]:
         params = {"query": query, "count": min(count, 100), "start": start}
         url = f"{SD_SEARCH_URL}?{urlencode(params)}"
-        r = self.session.get(url, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._get_json(url)
 
     def fetch_article_meta(self, pii: str, view: str = "META_ABS") -> Dict[str, Any]:
         url = SD_ARTICLE_PII_URL.format(pii)
-        r = self.session.get(url, params={"view": view}, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._get_json(url, {"view": view})
 
-def iter_search(client: ScienceDirectClient, query: str, max_records: int = 300) -> Iterator[Dict[str, Any]]:
-    got = 0
-    start = 0
+def iter_search(client: ScienceDirectClient, query: str, max_records: int = 300,
+                prefetch: int = 1, on_page: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
     page = 100
-    while got < max_records:
+
+    def fetch_page(start: int) -> List[Dict[str, Any]]:
         data = client.search(query=query, count=page, start=start)
-        entries = (data.get("search-results", {}).get("entry") or [])
-        if not entries:
-            break
-        for e in entries:
-            yield e
-        got += len(entries)
-        start += len(entries)
-        time.sleep(0.35)  # rate limit courtesy
+        return (data.get("search-results", {}).get("entry") or [])
+
+    # con prefetch > 1 se piden varias páginas a la vez (limitado por host_slot y el rate limiter)
+    with closing(prefetch_pages(fetch_page, range(0, max_records, page), prefetch)) as pages:
+        for entries in pages:
+            if not entries:
+                break
+            if on_page:
+                on_page(len(entries))
+            for e in entries:
+                yield e
+            if len(entries) < page:
+                break
 
-def entry_to_row(e: Dict[str, Any]) -> Dict[str, Any]:
+def entry_to_row(e: Dict[str, Any]) -> Record:
     links = {l.get("@ref"): l.get("@href") for l in (e.get("link") or [])}
     authors = None
     authors_obj = e.get("authors", {})
@@ -66,15 +89,15 @@ def entry_to_row(e: Dict[str, Any]) -> Dict[str, Any]:
         auth_list = authors_obj.get("author") or []
         if isinstance(auth_list, list):
             authors = "; ".join([a.get("authname", "") for a in auth_list if isinstance(a, dict)])
-    return {
-        "source": "sciencedirect",
-        "title": e.get("dc:title"),
-        "doi": e.get("prism:doi"),
-        "pii": e.get("pii"),
-        "authors": authors,
-        "container_title": e.get("prism:publicationName"),
-        "published": e.get("prism:coverDate"),
-        "openaccess": e.get("openaccess"),
-        "url": links.get("scidir") or links.get("self"),
-        "abstract": None,
-    }
+    return Record(
+        source="sciencedirect",
+        title=e.get("dc:title"),
+        doi=e.get("prism:doi"),
+        pii=e.get("pii"),
+        authors=authors,
+        container_title=e.get("prism:publicationName"),
+        published=e.get("prism:coverDate"),
+        openaccess=e.get("openaccess"),
+        url=links.get("scidir") or links.get("self"),
+        abstract=None,
+    )
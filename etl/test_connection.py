@@ -1,7 +1,17 @@
 # etl/test_connection.py
+# --- bootstrap de ruta para importar 'etl.*' aunque el CWD cambie ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# --------------------------------------------------------------------
+
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+
+from etl.db import get_engine
 
 # Cargar las variables del archivo .env
 load_dotenv()
@@ -14,7 +24,7 @@ DB_URL = os.getenv(
 
 def main():
     try:
-        engine = create_engine(DB_URL, pool_pre_ping=True, future=True)
+        engine = get_engine(DB_URL)
         with engine.connect() as conn:
             result = conn.execute(text("SELECT 1")).scalar()
             print("✅ Conexión exitosa a PostgreSQL, resultado:", result)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+# Añade la raíz del repo al sys.path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import csv
+import json
+import os
+import platform
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from etl.source.mock_api import MockConfig, start_in_thread
+
+# Benchmark de la ingesta contra la API simulada (etl/source/mock_api.py), etapa por etapa:
+# fetch -> map -> dedupe -> write (run_ingest por partes) y load (run_etl), mas run_ingest
+# completo. La carga va a un esquema temporal de PostgreSQL que se borra al final.
+# Uso: python scripts/bench_ingest.py --sizes 1000 10000 100000 --latency-ms 20
+
+BENCH_DIR = ROOT / "data" / "benchmarks" / "ingest"
+SOURCES = ["acm", "sage", "sciencedirect"]
+MIN_COMPARE_SECONDS = 0.05  # etapas mas cortas son ruido: no se comparan con la base
+
+# esquema minimo del README; las migraciones del ETL añaden el resto
+BENCH_SCHEMA = """
+CREATE TABLE paper (
+  id BIGSERIAL PRIMARY KEY, title TEXT, doi TEXT UNIQUE, pii TEXT, authors TEXT,
+  container_title TEXT, published TEXT, url TEXT
+);
+CREATE TABLE staging_papers (
+  title TEXT, doi TEXT, pii TEXT, authors TEXT, container_title TEXT,
+  published TEXT, source TEXT, url TEXT, abstract TEXT
+)
+"""
+
+
+def configure_env(base_url: str, tmp: Path, rate: float, concurrency: int) -> None:
+    """Apunta las fuentes a la API simulada. Debe llamarse antes de importar etl.ingest_service."""
+    os.environ.update({
+        "CROSSREF_API_URL": base_url, "ELSEVIER_API_URL": base_url,
+        "ELSEVIER_API_KEY": os.getenv("ELSEVIER_API_KEY") or "mock-key",
+        "CROSSREF_RATE": str(rate), "ELSEVIER_RATE": str(rate),
+        "CROSSREF_MAX_CONCURRENCY": str(concurrency), "ELSEVIER_MAX_CONCURRENCY": str(concurrency),
+        "HTTP_CACHE_MODE": "off",                        # medir la red, no la cache
+        "DEDUPE_INDEX_PATH": str(tmp / "dedupe_index.sqlite"),
+        "ANN_UPDATE_ON_LOAD": "0", "NETWORK_UPDATE_ON_LOAD": "0",
+    })
+
+
+class BenchDB:
+    """Esquema temporal bench_<id> con search_path propio: no toca las tablas reales."""
+
+    def __init__(self, url: Optional[str] = None):
+        from sqlalchemy import text
+        from etl.db import get_engine
+        self.text = text
+        self.schema = f"bench_{uuid.uuid4().hex[:8]}"
+        admin = get_engine(url)
+        with admin.begin() as con:
+            con.execute(text(f"CREATE SCHEMA {self.schema}"))
+        self.admin = admin
+        self.engine = get_engine(url, settings={"search_path": f"{self.schema},public"})
+        self.reset()
+
+    def reset(self) -> None:
+        with self.engine.begin() as con:
+            con.execute(self.text("DROP TABLE IF EXISTS paper, staging_papers, schema_migrations"))
+            for stmt in BENCH_SCHEMA.split(";"):
+                con.execute(self.text(stmt))
+        from etl import run_csv_ingest
+        run_csv_ingest._schema_cache.clear()  # el esquema se recrea: hay que re-inspeccionar
+
+    def drop(self) -> None:
+        from etl.db import dispose_engine
+        dispose_engine(self.engine)
+        with self.admin.begin() as con:
+            con.execute(self.text(f"DROP SCHEMA {self.schema} CASCADE"))
+
+
+def _timed(results: List[Dict[str, Any]], n: int, stage: str, fn,
+           count: Optional[Callable[[Any], int]] = None):
+    t0 = time.perf_counter()
+    out = fn()
+    secs = time.perf_counter() - t0
+    count = count(out) if count is not None else len(out)
+    results.append({"n": n, "stage": stage, "seconds": round(secs, 4), "records": count,
+                    "records_per_s": round(count / secs, 1) if secs > 0 else None})
+    print(f"  n={n:>7} {stage:<13} {secs:8.3f}s  {count:>7} registros")
+    return out
+
+
+def bench_size(n: int, sources: List[str], tmp: Path, db: Optional[BenchDB],
+               results: List[Dict[str, Any]], query: str, fuzzy: bool) -> None:
+    from etl import ingest_service as ing
+    from etl.dedupe_index import DedupeIndex
+    from etl.records import ROW_FIELDS
+    from etl.run_csv_ingest import run_etl
+    from etl.source.crossref_source import CrossrefSource, item_to_row
+    from etl.source.sciencedirect import ScienceDirectClient, entry_to_row, iter_search
+
+    per_source = max(1, n // len(sources))
+    # fetch: paginas crudas (JSON -> dict) de cada fuente, en serie
+    def fetch():
+        raw = []
+        for s in sources:
+            if s == "sciencedirect":
+                raw += [("sd", e) for e in iter_search(ScienceDirectClient(use_cache=False), query, per_source)]
+            else:
+                cr = CrossrefSource(use_cache=False)
+                raw += [(s, it) for it in cr.iter_search(query, ing.PUBLISHER_MAP[s], max_records=per_source)]
+        return raw
+    raw = _timed(results, n, "fetch", fetch)
+    rows = _timed(results, n, "map", lambda: [entry_to_row(x) if s == "sd" else item_to_row(x, s) for s, x in raw])
+
+    def dedupe():
+        f = ing.DedupeFilter(fuzzy)
+        return [r for r in rows if not f.is_duplicate(r)]
+    kept = _timed(results, n, "dedupe", dedupe)
+
+    out_csv = tmp / f"bench_{n}.csv"
+    def write():
+        with open(out_csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=ROW_FIELDS)
+            w.writeheader()
+            w.writerows(kept)
+        return kept
+    _timed(results, n, "write", write)
+
+    if db is not None:
+        db.reset()
+        st = _timed(results, n, "load", lambda: run_etl(str(out_csv), engine=db.engine),
+                    count=lambda st: st["rows_staged"])
+        if st["inserted"] != len(kept):
+            print(f"[WARN] load: {st['inserted']} insertadas de {len(kept)}")
+
+    # run_ingest completo (streaming, fuentes en paralelo) sobre la misma busqueda
+    ing.RAW_DIR = str(tmp)
+    idx = DedupeIndex(tmp / f"ingest_index_{n}.sqlite")
+    res = _timed(results, n, "ingest_total",
+                 lambda: ing.run_ingest(query, sources, per_source=per_source, concurrent=True,
+                                        fuzzy_dedupe=fuzzy, dedupe_index=idx),
+                 count=lambda res: res["total_raw"])
+    if res["errors"]:
+        print(f"[WARN] run_ingest: {res['errors']}")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Path, tolerance: float) -> List[str]:
+    """Etapas cuyo throughput cayo mas de `tolerance` frente a la corrida base."""
+    path = baseline / "results.csv" if baseline.is_dir() else baseline
+    with open(path, newline="", encoding="utf-8") as f:
+        base = {(int(r["n"]), r["stage"]): (float(r["records_per_s"] or 0), float(r["seconds"]))
+                for r in csv.DictReader(f)}
+    out = []
+    for r in results:
+        b, secs = base.get((r["n"], r["stage"]), (0.0, 0.0))
+        if secs < MIN_COMPARE_SECONDS:
+            continue
+        if b and r["records_per_s"] and r["records_per_s"] < b * (1 - tolerance):
+            out.append(f"n={r['n']} {r['stage']}: {r['records_per_s']:.0f}/s vs {b:.0f}/s base "
+                       f"({100 * (r['records_per_s'] / b - 1):+.0f}%)")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de ingesta por etapas contra una API simulada")
+    ap.add_argument("--sizes", nargs="*", type=int, default=[1000, 10000, 100000])
+    ap.add_argument("--sources", nargs="*", default=SOURCES, choices=SOURCES)
+    ap.add_argument("--query", default="generative artificial intelligence")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--throttle-rate", type=float, default=0.0)
+    ap.add_argument("--dup-rate", type=float, default=0.02)
+    ap.add_argument("--rate", type=float, default=1000.0, help="Peticiones/s permitidas por host")
+    ap.add_argument("--concurrency", type=int, default=4, help="Peticiones simultaneas por host")
+    ap.add_argument("--fuzzy", action="store_true", help="Incluye el dedupe por similitud")
+    ap.add_argument("--no-load", action="store_true", help="Omite la etapa de carga a PostgreSQL")
+    ap.add_argument("--database-url", default=None, help="Por defecto DATABASE_URL")
+    ap.add_argument("--baseline", default=None, help="Corrida previa (directorio o results.csv) a comparar")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Caida de throughput tolerada")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    cfg = MockConfig(total=max(args.sizes), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     error_rate=args.error_rate, throttle_rate=args.throttle_rate, dup_rate=args.dup_rate)
+    server, base_url = start_in_thread(cfg)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_ingest_"))
+    configure_env(base_url, tmp, args.rate, args.concurrency)
+    print(f"[INFO] API simulada en {base_url}; temporales en {tmp}")
+
+    db = None if args.no_load else BenchDB(args.database_url)
+    results: List[Dict[str, Any]] = []
+    try:
+        for n in args.sizes:
+            bench_size(n, args.sources, tmp, db, results, args.query, args.fuzzy)
+    finally:
+        if db is not None:
+            db.drop()
+        server.shutdown()
+
+    out = Path(args.out) if args.out else BENCH_DIR / datetime.now().strftime("%Y%m%d_%H%M%S")
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / "results.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["n", "stage", "seconds", "records", "records_per_s"])
+        w.writeheader()
+        w.writerows(results)
+    manifest = {"created": datetime.now().isoformat(timespec="seconds"), "sizes": args.sizes,
+                "sources": args.sources, "mock": vars(cfg), "mock_stats": server.RequestHandlerClass.state.stats,
+                "rate": args.rate, "concurrency": args.concurrency, "fuzzy": args.fuzzy,
+                "python": platform.python_version(), "platform": platform.platform()}
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"[OK] Resultados en {out}")
+
+    if args.baseline:
+        regressions = compare(results, Path(args.baseline), args.tolerance)
+        for r in regressions:
+            print(f"[REGRESION] {r}")
+        return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
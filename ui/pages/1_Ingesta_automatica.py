@@ -13,11 +13,11 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=ROOT / ".env", override=False)
 
 import streamlit as st
-import subprocess
-import sys as _sys
 from pathlib import Path as _P
 
+from etl.db import get_engine
 from etl.ingest_service import run_ingest
+from etl.run_csv_ingest import run_etl
 
 
 def has_elsevier_key() -> bool:
@@ -39,6 +39,9 @@ default_sources = ["acm", "sage"] + (["sciencedirect"] if has_elsevier_key() els
 sources = st.multiselect("Fuentes", options, default=default_sources)
 
 per_source = st.slider("Max. registros por fuente", min_value=50, max_value=1000, value=300, step=50)
+concurrent = st.checkbox("Descarga concurrente (fuentes en paralelo)", value=True)
+fuzzy_dedupe = st.checkbox("Detectar casi-duplicados (titulos similares)", value=False)
+parquet = st.checkbox("Guardar tambien en Parquet (data/parquet)", value=False)
 
 if st.button("Buscar y cargar"):
     if not query.strip():
@@ -51,7 +54,8 @@ if st.button("Buscar y cargar"):
         st.warning("No se encontro ELSEVIER_API_KEY en .env. Se omitira ScienceDirect para esta busqueda.")
 
     with st.spinner("Descargando y unificando..."):
-        result = run_ingest(query, sources, per_source=per_source)
+        result = run_ingest(query, sources, per_source=per_source, concurrent=concurrent,
+                            fuzzy_dedupe=fuzzy_dedupe, output_format="both" if parquet else "csv")
 
     # guarda el resultado para evitar NameError en reruns
     st.session_state["last_result"] = result
@@ -71,23 +75,11 @@ if st.button("Buscar y cargar"):
     else:
         st.write("Ejecutando ETL -> BD...")
         try:
-            proc = subprocess.run(
-                [
-                    _sys.executable,
-                    "etl/run_csv_ingest.py",
-                    "--input", str(csv_path),
-                    "--source", ",".join(sources),
-                ],
-                capture_output=True,
-                text=True,
-                cwd=str(ROOT),  # asegura importar 'etl' dentro del script
-            )
-            st.code(proc.stdout or "(sin salida)")
-            if proc.returncode != 0:
-                st.error(proc.stderr or "ETL finalizo con error")
-            else:
-                st.success("ETL finalizada y datos cargados en PostgreSQL")
+            etl = run_etl(str(csv_path), engine=get_engine(), source=",".join(sources))
+            st.write(etl)
+            st.success(f"ETL finalizada: {etl['inserted']} articulos nuevos cargados en PostgreSQL")
         except Exception as e:
+            st.error("ETL finalizo con error")
             st.exception(e)
 
 # (Opcional) Mostrar el ultimo resultado si existe (solo lectura)
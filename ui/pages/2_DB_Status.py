@@ -9,58 +9,99 @@ if str(ROOT) not in sys.path:
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=ROOT / ".env", override=False)
 
+import pandas as pd
 import streamlit as st
-from sqlalchemy import text, inspect
+
 from etl.db import get_engine
+from etl.db_status import (EXACT_COUNT_TIMEOUT, STATUS_TABLES, STATUS_TTL, exact_count,
+                           latest_papers, paper_breakdown, table_estimates)
 
 st.set_page_config(page_title="DB Status")
 
 st.title("Estado de la base de datos")
+st.caption(f"Estimaciones del catalogo de PostgreSQL; se refrescan cada {STATUS_TTL:.0f} s.")
+
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def _estimates():
+    return table_estimates(get_engine())
+
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def _breakdown():
+    return paper_breakdown(get_engine())
+
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def _latest():
+    return latest_papers(get_engine())
+
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def _exact(table: str) -> int:
+    return exact_count(get_engine(), table)
+
+
+if st.button("Refrescar"):
+    for fn in (_estimates, _breakdown, _latest, _exact):
+        fn.clear()
+    st.session_state.pop("exact_counts", None)
+
+# --------- conteos ----------
+st.subheader("Conteos")
+try:
+    estimates = _estimates()
+except Exception as e:
+    st.error(f"No se pudo consultar la base: {e}")
+    st.stop()
+
+breakdown = _breakdown()
+exact = st.session_state.setdefault("exact_counts", {})
+cols = st.columns(len(STATUS_TABLES))
+for col, est in zip(cols, estimates):
+    t = est["table"]
+    with col:
+        if not est["exists"]:
+            st.metric(t, "no existe")
+            continue
+        st.metric(f"{t} (estimado)", f"{est['estimate']:,}")
+        if t == "paper" and breakdown is not None:
+            st.caption(f"Exacto segun paper_stats: {int(breakdown['n'].sum()):,}")
+        st.caption(f"{est['bytes'] / 2**20:,.1f} MiB; ANALYZE: {est['analyzed'] or 'nunca'}")
+        if t in exact:
+            st.caption(f"count(*) exacto: {exact[t]:,}")
+        elif st.button("Conteo exacto", key=f"exact_{t}",
+                       help=f"SELECT count(*) (recorre la tabla; maximo {EXACT_COUNT_TIMEOUT:.0f} s)"):
+            try:
+                with st.spinner(f"Contando {t}..."):
+                    exact[t] = _exact(t)
+                st.rerun()
+            except Exception as e:
+                st.error(f"count(*) de {t} fallo: {type(e).__name__}: {e}")
+
+# --------- desglose por fuente y anio ----------
+st.subheader("Papers por fuente y año")
+if breakdown is None:
+    st.info("Falta el agregado paper_stats: ejecuta `python etl/migrations.py` (o una carga del ETL).")
+elif breakdown.empty:
+    st.info("paper esta vacia.")
+else:
+    df = breakdown.assign(source=breakdown["source"].replace("", "?"),
+                          year=breakdown["year"].map(lambda y: str(y) if y else "sin año"))
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Por fuente")
+        st.bar_chart(df.groupby("source")["n"].sum())
+    with c2:
+        st.caption("Por año")
+        st.bar_chart(df.groupby("year")["n"].sum())
+    with st.expander("Tabla fuente x año"):
+        st.dataframe(pd.pivot_table(df, index="year", columns="source", values="n",
+                                    aggfunc="sum", fill_value=0).sort_index(ascending=False))
 
-eng = get_engine()
-insp = inspect(eng)
-
-# Conteos
-with eng.connect() as con:
-    def q(sql: str):
-        try:
-            return con.execute(text(sql)).fetchall()
-        except Exception as e:
-            return [("ERROR", str(e))]
-
-    st.subheader("Conteos")
-    st.write({"staging_papers": q("SELECT count(*) FROM staging_papers")[0][0]})
-    st.write({"paper": q("SELECT count(*) FROM paper")[0][0]})
-
-# Peek con JOIN autoajustable
-st.subheader("Muestra de 5 filas")
-with eng.connect() as con:
-    try:
-        s_cols = {c["name"] for c in insp.get_columns("source")}
-    except Exception:
-        s_cols = set()
-
-    src_pk = "id" if "id" in s_cols else ("source_id" if "source_id" in s_cols else None)
-    src_disp = "code" if "code" in s_cols else ("name" if "name" in s_cols else None)
-
-    if src_pk:
-        join_clause = f"LEFT JOIN source s ON s.{src_pk} = p.source_id"
-    else:
-        join_clause = ""
-
-    source_expr = f"COALESCE(s.{src_disp}, '?')" if src_disp else "NULL::text"
-
-    sql = f"""
-    SELECT p.title, p.doi, {source_expr} AS source, p.url
-    FROM paper p
-    {join_clause}
-    ORDER BY p.title DESC
-    LIMIT 5
-    """
-
-    try:
-        rows = con.execute(text(sql)).fetchall()
-        st.table(rows)
-    except Exception as e:
-        st.error(f"Error ejecutando peek: {e}")
-        st.code(sql)
+# --------- muestra ----------
+st.subheader("Ultimos 5 papers")
+try:
+    st.table(_latest())
+except Exception as e:
+    st.error(f"Error ejecutando peek: {e}")
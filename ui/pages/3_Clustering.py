@@ -0,0 +1,80 @@
+# ui/pages/3_Clustering.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]  # ui/pages -> ui -> root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=ROOT / ".env", override=False)
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from analysis.clustering import METHODS, REPRESENTATIONS, cluster, dendrogram_data
+from analysis.similarity import load_docs
+
+st.set_page_config(page_title="Clustering jerarquico")
+
+st.title("Clustering jerarquico de resumenes")
+st.caption("Distancia coseno sobre TF-IDF o embeddings; los linkage se guardan en data/cache/clustering.")
+
+
+@st.cache_data(ttl=600, show_spinner="Cargando documentos...")
+def _docs(source: str, limit: int):
+    return load_docs(source, limit=limit or None)
+
+
+@st.cache_data(ttl=600, show_spinner="Calculando linkage...")  # mismo ttl que _docs: no sobrevive al corpus
+def _cluster(source: str, limit: int, method: str, representation: str, k: int, sample: int):
+    docs = _docs(source, limit)
+    res = cluster(docs, method, representation, n_clusters=k, sample=sample or None)
+    titles = [docs[i].title[:80] for i in res["sample_idx"]]
+    return {
+        "dend": dendrogram_data(res["linkage"], titles, p=40),
+        "sizes": res["sizes"], "n_docs": res["n_docs"], "n_clustered": res["n_clustered"],
+        "cached": res["cached"], "seconds": res["seconds"],
+        "labels": res["labels"].tolist(), "titles": [d.title for d in docs],
+    }
+
+
+def _dendrogram_chart(d) -> alt.Chart:
+    segs = []
+    for xs, ys in zip(d["icoord"], d["dcoord"]):
+        for i in range(3):  # cada union son 3 segmentos: subida, travesano, bajada
+            segs.append({"x": xs[i], "y": ys[i], "x2": xs[i + 1], "y2": ys[i + 1]})
+    leaves = pd.DataFrame({"x": [5 + 10 * i for i in range(len(d["ivl"]))], "label": d["ivl"]})
+    lines = alt.Chart(pd.DataFrame(segs)).mark_rule().encode(
+        x=alt.X("x:Q", axis=None), x2="x2", y=alt.Y("y:Q", title="distancia"), y2="y2")
+    ticks = alt.Chart(leaves).mark_point(size=10).encode(x="x:Q", y=alt.value(0), tooltip="label")
+    return (lines + ticks).properties(height=420)
+
+
+c1, c2 = st.columns(2)
+source = c1.selectbox("Fuente", ["db", "csv"])
+method = c2.selectbox("Metodo", METHODS, index=METHODS.index("average"))
+representation = c1.selectbox("Representacion", REPRESENTATIONS)
+k = c2.slider("Numero de grupos", min_value=2, max_value=40, value=8)
+limit = c1.number_input("Max. documentos (0 = todos)", min_value=0, value=0, step=1000)
+sample = c2.number_input("Muestra para el dendrograma (0 = automatica)", min_value=0, value=0, step=1000)
+
+if st.button("Agrupar", type="primary"):
+    try:
+        st.session_state["clustering"] = _cluster(source, int(limit), method, representation, int(k), int(sample))
+    except Exception as e:
+        st.error(f"No se pudo agrupar: {e}")
+        st.stop()
+
+# el resultado se guarda en la sesion para poder explorar grupos sin recalcular
+out = st.session_state.get("clustering")
+if out:
+    took = "cache" if out["cached"] else f"{out['seconds']}s"
+    st.success(f"{out['n_docs']} documentos, {out['n_clustered']} en el dendrograma ({took})")
+    st.altair_chart(_dendrogram_chart(out["dend"]), use_container_width=True)
+    st.subheader("Tamano de los grupos")
+    st.bar_chart(pd.Series(out["sizes"], name="documentos"))
+    grp = st.selectbox("Ver titulos del grupo", list(range(len(out["sizes"]))))
+    titles = [t for t, l in zip(out["titles"], out["labels"]) if l == grp]
+    st.dataframe(pd.DataFrame({"titulo": titles[:200]}), use_container_width=True)
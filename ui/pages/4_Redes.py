@@ -0,0 +1,55 @@
+# ui/pages/4_Redes.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]  # ui/pages -> ui -> root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=ROOT / ".env", override=False)
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from analysis.networks import KINDS, VIEW_MAX_NODES, CoGraph, metrics, render_view, update_from_db
+from etl.db import get_engine
+
+st.set_page_config(page_title="Redes", layout="wide")
+
+st.title("Redes de coautoria y de palabras clave")
+st.caption("Se actualizan con cada carga del ETL; aqui se pueden poner al dia a mano.")
+
+
+@st.cache_data(show_spinner="Calculando metricas...")
+def _metrics(kind: str, version: int, updated: float):
+    # version/updated invalidan la cache cuando la red cambia
+    return metrics(CoGraph(kind).load())
+
+
+if st.button("Actualizar redes con los papers nuevos"):
+    with st.spinner("Procesando papers nuevos..."):
+        added = update_from_db(get_engine())
+    st.success(f"Papers nuevos por red: {added}")
+
+kind = st.radio("Red", KINDS, format_func={"coauthor": "Coautoria", "coword": "Palabras clave"}.get,
+                horizontal=True)
+g = CoGraph(kind)
+if not g.exists():
+    st.info("La red aun no se ha construido: usa el boton de arriba o python analysis/networks.py")
+    st.stop()
+g.load()
+
+c1, c2, c3 = st.columns(3)
+c1.metric("Nodos", g.meta["nodes"])
+c2.metric("Aristas", g.meta["edges"])
+c3.metric("Papers", g.meta["papers"])
+
+df = _metrics(kind, g.meta["version"], g.meta.get("updated", 0.0))
+max_nodes = st.slider("Nodos en la vista", min_value=20, max_value=VIEW_MAX_NODES, value=min(150, VIEW_MAX_NODES), step=10)
+min_weight = st.slider("Peso minimo de arista (papers en comun)", min_value=1, max_value=10, value=1)
+components.html(render_view(g, df, max_nodes, min_weight), height=680)
+
+st.subheader("Nodos mas centrales")
+order = st.selectbox("Ordenar por", ["betweenness", "degree", "strength", "papers"])
+st.dataframe(df.sort_values(order, ascending=False).head(100), use_container_width=True)
@@ -0,0 +1,71 @@
+# ui/pages/5_Ordenamiento.py
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]  # ui/pages -> ui -> root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=ROOT / ".env", override=False)
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from analysis.sort_bench import ALGORITHMS, DEFAULT_SEED, load_keys, run, runs
+
+st.set_page_config(page_title="Benchmark de ordenamiento", layout="wide")
+
+st.title("Benchmark de algoritmos de ordenamiento")
+st.caption("Clave: (anio de publicacion, titulo). Resultados en data/benchmarks/sorting/<fecha>/.")
+
+with st.expander("Nueva corrida"):
+    c1, c2, c3 = st.columns(3)
+    source = c1.selectbox("Datos", ["csv", "db"])
+    trials = c2.number_input("Repeticiones", min_value=1, max_value=20, value=3)
+    seed = c3.number_input("Semilla", value=DEFAULT_SEED, step=1)
+    algs = st.multiselect("Algoritmos", list(ALGORITHMS), default=list(ALGORITHMS))
+    if st.button("Ejecutar benchmark", type="primary"):
+        keys = load_keys(source)
+        if not keys:
+            st.error(f"No hay registros en {source}")
+        else:
+            log = st.empty()
+            with st.spinner(f"Ordenando {len(keys)} registros..."):
+                res = run(keys, algs, trials=int(trials), seed=int(seed), log=log.text)
+            st.success(f"Corrida guardada en {res['dir']}")
+
+saved = runs()
+if not saved:
+    st.info("Aun no hay corridas: python analysis/sort_bench.py --source csv")
+    st.stop()
+
+sel = st.selectbox("Corrida", saved, format_func=lambda p: p.name)
+manifest = json.loads((sel / "manifest.json").read_text(encoding="utf-8"))
+summary = pd.read_csv(sel / "summary.csv")
+growth = pd.read_csv(sel / "growth.csv")
+
+env = manifest["environment"]
+st.caption(f"{manifest['records']} registros · semilla {manifest['seed']} · {manifest['trials']} repeticiones · "
+           f"huella {manifest['fingerprint'][:12]} · Python {env['python']} en {env['platform']}")
+
+metric = st.radio("Medida", ["median_s", "relative", "peak_bytes"], horizontal=True,
+                  format_func={"median_s": "Tiempo (s)", "relative": "Relativo a sorted()",
+                               "peak_bytes": "Memoria pico (bytes)"}.get)
+chart = alt.Chart(summary.dropna(subset=[metric])).mark_line(point=True).encode(
+    x=alt.X("n:Q", scale=alt.Scale(type="log"), title="n"),
+    y=alt.Y(f"{metric}:Q", scale=alt.Scale(type="log")),
+    color="algorithm:N", strokeDash="category:N",
+    tooltip=["algorithm", "category", "n", "median_s", "min_s", "relative", "peak_bytes"],
+).properties(height=450)
+st.altair_chart(chart, use_container_width=True)
+
+st.subheader("Crecimiento empirico")
+st.caption("exponent = pendiente log-log del tiempo frente a n; best_model = modelo con menor error.")
+st.dataframe(growth.sort_values("exponent"), use_container_width=True)
+
+n_max = summary.groupby("algorithm")["n"].max().min()
+st.subheader(f"Comparacion con n = {n_max}")
+st.bar_chart(summary[summary["n"] == n_max].set_index("algorithm")["median_s"].sort_values())